@@ -0,0 +1,85 @@
+"""Appointment slot availability and atomic booking.
+
+Free slots for a date are computed from the ``appointments`` collection with
+a single aggregation over the ``(date, time, status)`` index and cached per
+date until a booking for that date invalidates them. Booking relies on the
+unique partial ``(date, time)`` index over documents flagged ``slot_held``,
+so concurrent requests for the same slot race inside MongoDB and exactly one
+insert wins. Cancelling an appointment must ``$unset`` that flag as well as
+changing its status, or the slot stays claimed.
+"""
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+# Statuses that occupy a slot; anything else (e.g. "cancelled") frees it.
+HOLDING_STATUSES = ["pending", "confirmed"]
+
+
+class SlotUnavailableError(Exception):
+    """Raised when a booking targets a slot that is already taken."""
+
+
+class AvailabilityEngine:
+    """Free slots per date; ``version`` (e.g. a shared appointments counter)
+    lets bookings made by other workers retire this worker's cached dates."""
+
+    def __init__(
+        self,
+        collection,
+        slots: List[str],
+        ttl: float = 30.0,
+        max_dates: int = 1024,
+        version: Optional[Callable[[], int]] = None,
+    ):
+        self.collection = collection
+        self.slots = list(slots)
+        self.ttl = ttl
+        self.max_dates = max_dates
+        self.version = version or (lambda: 0)
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def _booked_times(self, date: str) -> set:
+        pipeline = [
+            {"$match": {"date": date, "status": {"$in": HOLDING_STATUSES}}},
+            {"$group": {"_id": None, "times": {"$addToSet": "$time"}}},
+        ]
+        result = await self.collection.aggregate(pipeline).to_list(1)
+        return set(result[0]["times"]) if result else set()
+
+    async def free_slots(self, date: str) -> List[str]:
+        cached = self._cache.get(date)
+        now = time.monotonic()
+        version = self.version()
+        if cached and cached[0] > now and cached[1] == version:
+            self._cache.move_to_end(date)
+            return cached[2]
+        booked = await self._booked_times(date)
+        free = [slot for slot in self.slots if slot not in booked]
+        self._cache[date] = (now + self.ttl, version, free)
+        self._cache.move_to_end(date)
+        while len(self._cache) > self.max_dates:
+            self._cache.popitem(last=False)
+        return free
+
+    def invalidate(self, date: Optional[str] = None):
+        if date is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(date, None)
+
+    async def book(self, doc: dict, insert=None):
+        """Insert ``doc`` as a slot-holding appointment or raise ``SlotUnavailableError``.
+
+        ``insert`` overrides the coroutine used for the write (defaults to
+        ``collection.insert_one``); it must surface ``DuplicateKeyError``.
+        """
+        doc["slot_held"] = True
+        try:
+            await (insert or self.collection.insert_one)(doc)
+        except DuplicateKeyError:
+            raise SlotUnavailableError(f"{doc['date']} {doc['time']} is already booked")
+        finally:
+            self.invalidate(doc["date"])
@@ -0,0 +1,30 @@
+"""Shared setup for the benchmark scripts.
+
+Importing this module puts ``backend/`` on ``sys.path`` and supplies default
+connection settings so ``server`` can be imported without a ``.env`` file.
+"""
+import logging
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "lumis_bench")
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def bench_db(name="lumis_bench"):
+    """Return a Motor database for benchmarks.
+
+    Uses ``BENCH_MONGO_URL`` when set; otherwise falls back to an in-memory
+    mongomock-motor database, which is fine for relative comparisons but does
+    not reflect real BSON decode or network costs.
+    """
+    url = os.environ.get("BENCH_MONGO_URL")
+    if url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        return AsyncIOMotorClient(url, tz_aware=True)[name]
+    from mongomock_motor import AsyncMongoMockClient
+    return AsyncMongoMockClient(tz_aware=True)[name]
@@ -0,0 +1,145 @@
+"""Cold start: what importing the app costs, and time from spawn to the first 200.
+
+First runs ``python -X importtime -c "import server"`` ``--runs`` times and
+prints, as medians, the modules ``server`` imports directly by cumulative
+time and the slowest single modules by their own time. Then starts
+``uvicorn server:app`` ``--runs`` times on a loopback port and times each from
+spawning the process to the first ``200`` on ``/api/``, which is what scaling
+from zero pays, and reads the app's own lifespan startup time from
+``lumis_startup_seconds``. MongoDB is ``BENCH_MONGO_URL`` when set, otherwise
+each process gets the in-memory stand-in (no pool warm-up, no plan check).
+
+``--budget-ms`` makes the run exit non-zero when the median time to first
+200 is over budget, so the number can be tracked between commits.
+
+    python benchmarks/bench_cold_start.py --runs 5 --top 12 --budget-ms 1500
+"""
+import argparse
+import collections
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import _common  # noqa: F401
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_env():
+    env = dict(os.environ, MONGO_URL=os.environ.get("BENCH_MONGO_URL", "mongomock://"))
+    if env["MONGO_URL"].startswith("mongomock://"):
+        env["INDEX_PLAN_CHECK"] = "off"
+    return env
+
+
+def import_times(env):
+    """(own us, cumulative us) of ``server`` and of every module imported under it, from one run."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    modules, direct = {}, []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        if depth == 0 and name != "server":
+            modules, direct = {}, []  # imported by the interpreter before server
+            continue
+        modules[name] = (int(own), int(cumulative))
+        if depth == 1:
+            direct.append(name)
+        if name == "server":
+            break
+    return modules, direct
+
+
+def import_report(args, env):
+    samples = collections.defaultdict(list)
+    for _ in range(args.runs):
+        modules, direct = import_times(env)
+        for name, times in modules.items():
+            samples[name].append(times)
+
+    def median(name, index):
+        return statistics.median(times[index] for times in samples[name]) / 1000
+
+    print(f"import server: {median('server', 1):.1f} ms, {median('server', 0):.1f} ms of it in server.py itself")
+    print("\nimported by server, by cumulative ms:")
+    for name in sorted(direct, key=lambda name: -median(name, 1))[:args.top]:
+        print(f"  {name:<32} {median(name, 1):>8.1f}")
+    print("\nslowest modules, by own ms:")
+    for name in sorted(samples, key=lambda name: -median(name, 0))[:args.top]:
+        print(f"  {name:<32} {median(name, 0):>8.1f}")
+
+
+def first_200(env):
+    """Seconds from spawn to the first 200 on /api/, and the app's lifespan startup seconds."""
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=base_url, timeout=1) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+                if time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not answer within 60s")
+                try:
+                    if client.get("/api/").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.005)
+            elapsed = time.perf_counter() - started
+            metrics = client.get("/api/metrics").text
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    startup = next((float(line.split()[1]) for line in metrics.splitlines() if line.startswith("lumis_startup_seconds ")), float("nan"))
+    return elapsed, startup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="modules listed per table")
+    parser.add_argument("--budget-ms", type=float, help="fail when the median time to first 200 is above this")
+    args = parser.parse_args()
+
+    env = server_env()
+    import_report(args, env)
+
+    print(f"\n{'run':>3} {'first 200 ms':>13} {'startup ms':>11}")
+    runs = []
+    for run in range(1, args.runs + 1):
+        elapsed, startup = first_200(env)
+        runs.append(elapsed * 1000)
+        print(f"{run:>3} {elapsed * 1000:>13.1f} {startup * 1000:>11.1f}")
+    median = statistics.median(runs)
+    print(f"median time to first 200: {median:.1f} ms")
+    if args.budget_ms is not None and median > args.budget_ms:
+        sys.exit(f"over the cold-start budget of {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
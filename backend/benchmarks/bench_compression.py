@@ -0,0 +1,70 @@
+"""Bytes on the wire versus compression CPU per request, per payload.
+
+For the precomputed content payloads (compressed once at startup, so serving
+them costs no compression CPU) and a dynamic contacts list of ``--contacts``
+rows (compressed on the fly by ``CompressionMiddleware``), prints the
+identity size, the size and per-request CPU at the middleware's on-the-fly
+settings, and the size of the maximum-effort precompressed body.
+
+    python benchmarks/bench_compression.py --contacts 100 1000 --rounds 200
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime, timezone
+
+import _common  # noqa: F401
+import orjson
+
+import server
+from compression import CODINGS, _Compressor, compress
+from content_store import load_seed, validate
+
+
+def contacts_body(count):
+    now = datetime.now(timezone.utc)
+    return orjson.dumps([
+        {
+            "id": str(uuid.uuid4()),
+            "name": f"Contact {n}",
+            "email": f"contact{n}@example.com",
+            "message": f"I would like to talk about project number {n} and a possible retainer.",
+            "created_at": now,
+        }
+        for n in range(count)
+    ])
+
+
+def on_the_fly(body, coding, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        data = _Compressor(coding, gzip_level=6, brotli_quality=4).chunk(body, last=True)
+    return len(data), (time.perf_counter() - start) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--contacts", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    server.install_content(validate(server.CONTENT_MODELS, load_seed()))
+    payloads = [
+        ("landing", server.content.landing.body),
+        ("case-studies", server.content.case_studies.all.body),
+        ("blog-posts", server.content.blog_posts.all.body),
+        ("services", server.content.services.all.body),
+    ]
+    payloads += [(f"contacts x{count}", contacts_body(count)) for count in args.contacts]
+
+    print(f"{'payload':<16} {'identity':>9} {'coding':>6} {'fly B':>8} {'fly us':>8} {'pre B':>8} {'saved':>6}")
+    for name, body in payloads:
+        for coding in CODINGS:
+            size, cpu = on_the_fly(body, coding, args.rounds)
+            precompressed = len(compress(body, coding))
+            saved = 1 - precompressed / len(body)
+            print(f"{name:<16} {len(body):>9} {coding:>6} {size:>8} {cpu:>8.1f} {precompressed:>8} {saved:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Egress and server CPU per read, with and without If-None-Match revalidation.
+
+Runs the app in-process over httpx's ASGI transport with ``--rows`` contacts
+and appointments stored, and requests each read endpoint ``--rounds`` times
+the way a returning browser would (``Accept-Encoding: gzip, br``): once
+unconditionally, once revalidating with the ETag of the first response.
+Prints the bytes on the wire (HTTP/1.1 head included) and the CPU time per request for both. CPU is
+measured in-process, so it includes the client's share, which is the same
+for both columns. ``--no-cache`` turns the response cache off so the plain
+column shows the handlers' full cost, MongoDB queries included.
+
+    python benchmarks/bench_conditional_get.py --rows 500 --rounds 200
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import _common  # noqa: F401
+
+os.environ["MONGO_URL"] = os.environ.get("BENCH_MONGO_URL", "mongomock://")
+if os.environ["MONGO_URL"].startswith("mongomock://"):
+    os.environ["INDEX_PLAN_CHECK"] = "off"
+
+PATHS = [
+    "/api/landing",
+    "/api/testimonials",
+    "/api/case-studies",
+    "/api/services",
+    "/api/available-times",
+    "/api/available-times?date=2030-01-02",
+    "/api/contacts?limit=100",
+    "/api/appointments?limit=100",
+    "/api/contacts/export?format=ndjson",
+]
+if not os.environ["MONGO_URL"].startswith("mongomock://"):
+    # mongomock has no $text
+    PATHS.append("/api/search?q=project&scope=contacts")
+BROWSER = {"Accept-Encoding": "gzip, br"}
+
+
+async def seed(db, rows):
+    now = datetime.now(timezone.utc)
+    contacts, appointments = [], []
+    for n in range(rows):
+        created_at = now - timedelta(minutes=n)
+        contacts.append({"id": str(uuid.uuid4()), "name": f"Contact {n}", "email": f"c{n}@example.com", "phone": None,
+                         "services": ["DevOps & Cloud"], "reason": None, "created_at": created_at,
+                         "message": f"We would like to discuss project {n} and a longer engagement."})
+        appointments.append({"id": str(uuid.uuid4()), "name": f"Client {n}", "email": f"a{n}@example.com", "phone": None,
+                             "date": f"2030-{n // 28 % 12 + 1:02d}-{n % 28 + 1:02d}", "time": f"{n // 336 % 8 + 9:02d}:00 AM", "services": [], "reason": None,
+                             "message": None, "status": "pending", "created_at": created_at})
+    await db.contacts.insert_many(contacts)
+    await db.appointments.insert_many(appointments)
+
+
+async def measure(client, path, rounds, headers):
+    wire = 0
+    start = time.process_time()
+    for _ in range(rounds):
+        response = await client.get(path, headers=headers)
+        assert response.status_code in (200, 304), (path, response.status_code)
+        # Body as sent (still compressed) plus the status line and headers
+        wire += response.num_bytes_downloaded + 17 + sum(len(name) + len(value) + 4 for name, value in response.headers.raw)
+    return wire / rounds, (time.process_time() - start) / rounds * 1e6
+
+
+async def main(args):
+    import httpx
+    import server
+
+    app = server.app
+    async with app.router.lifespan_context(app):
+        await seed(server.db, args.rows)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            rows = []
+            for path in PATHS:
+                first = await client.get(path, headers=BROWSER)
+                assert first.status_code == 200, (path, first.status_code)
+                plain = await measure(client, path, args.rounds, BROWSER)
+                revalidated = await measure(client, path, args.rounds, {**BROWSER, "If-None-Match": first.headers["etag"]})
+                rows.append((path, plain, revalidated))
+
+    print(f"{'path':<40} {'200 B':>7} {'304 B':>6} {'200 us':>8} {'304 us':>8}")
+    totals = [0.0, 0.0, 0.0, 0.0]
+    for path, (plain_bytes, plain_cpu), (revalidated_bytes, revalidated_cpu) in rows:
+        print(f"{path:<40} {plain_bytes:>7.0f} {revalidated_bytes:>6.0f} {plain_cpu:>8.0f} {revalidated_cpu:>8.0f}")
+        for index, value in enumerate((plain_bytes, revalidated_bytes, plain_cpu, revalidated_cpu)):
+            totals[index] += value
+    print(f"egress cut {1 - totals[1] / totals[0]:.1%}, CPU per request cut {1 - totals[3] / totals[2]:.1%} across these reads")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--no-cache", action="store_true", help="run with RESPONSE_CACHE_BACKEND=off")
+    args = parser.parse_args()
+    if args.no_cache:
+        os.environ["RESPONSE_CACHE_BACKEND"] = "off"
+    asyncio.run(main(args))
@@ -0,0 +1,128 @@
+"""Content snapshot reload latency, and read throughput while snapshots swap.
+
+Runs the app in-process over httpx's ASGI transport. Times ``--reloads``
+publish-then-refresh cycles (load from MongoDB, validate, build the registry
+and landing bundle, swap), then drives the content endpoints for
+``--seconds`` with no swaps and again while a new version is published every
+``--swap-interval`` seconds, and compares the two. Snapshots are built off
+the event loop; the longest stretch each swap kept the loop from serving
+reads is reported too.
+
+    python benchmarks/bench_content_reload.py --seconds 5 --concurrency 16 --swap-interval 0.1
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import time
+
+import _common  # noqa: F401
+
+os.environ["MONGO_URL"] = os.environ.get("BENCH_MONGO_URL", "mongomock://")
+if os.environ["MONGO_URL"].startswith("mongomock://"):
+    os.environ["INDEX_PLAN_CHECK"] = "off"
+# Swaps are driven by the benchmark itself, not by the background poller.
+os.environ["CONTENT_POLL_INTERVAL"] = "3600"
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+from content_store import load_seed  # noqa: E402
+
+PATHS = ["/api/landing", "/api/testimonials", "/api/case-studies", "/api/blog-posts/blog1", "/api/services"]
+
+
+def edited(revision):
+    lists = load_seed()
+    lists["testimonials"][0]["content"] += f" (revision {revision})"
+    return lists
+
+
+async def publish_and_refresh(revision):
+    await server.content_store.publish(edited(revision))
+    await server.content_watcher.refresh()
+
+
+async def longest_stall(coro):
+    """Run ``coro`` and return the longest the event loop went without getting back to other tasks."""
+    done = False
+    worst = 0.0
+
+    async def ticker():
+        nonlocal worst
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            worst, last = max(worst, now - last), now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    await coro
+    done = True
+    await task
+    return worst
+
+
+async def drive(client, seconds, concurrency):
+    latencies = []
+    paths = itertools.cycle(PATHS)
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.get(next(paths))
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.status_code
+            # Cached responses complete without suspending over the ASGI
+            # transport; yield as a socket would so the swapper gets to run.
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    latencies.sort()
+    return len(latencies) / seconds, latencies[int(len(latencies) * 0.99)] * 1000
+
+
+async def main(args):
+    app = server.app
+    async with app.router.lifespan_context(app):
+        revisions = itertools.count(1)
+        timings = []
+        for _ in range(args.reloads):
+            start = time.perf_counter()
+            await publish_and_refresh(next(revisions))
+            timings.append((time.perf_counter() - start) * 1000)
+        refresh = server.content_watcher.last_reload_seconds * 1000
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            steady_rate, steady_p99 = await drive(client, args.seconds, args.concurrency)
+
+            stalls = []
+
+            async def swapper():
+                while True:
+                    await asyncio.sleep(args.swap_interval)
+                    stalls.append(await longest_stall(publish_and_refresh(next(revisions))) * 1000)
+
+            task = asyncio.create_task(swapper())
+            swap_rate, swap_p99 = await drive(client, args.seconds, args.concurrency)
+            task.cancel()
+
+    print(f"publish + reload, median of {args.reloads}: {statistics.median(timings):7.2f} ms "
+          f"(load, validate and install alone: {refresh:.2f} ms)")
+    print(f"{'':<22} {'req/s':>10} {'p99 ms':>8}")
+    print(f"{'steady':<22} {steady_rate:>10.1f} {steady_p99:>8.2f}")
+    print(f"{f'{len(stalls)} swaps':<22} {swap_rate:>10.1f} {swap_p99:>8.2f}")
+    print(f"throughput during swaps: {swap_rate / steady_rate:.1%} of steady")
+    print(f"event loop stall per swap: median {statistics.median(stalls):.2f} ms, max {max(stalls):.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reloads", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--swap-interval", type=float, default=0.1)
+    asyncio.run(main(parser.parse_args()))
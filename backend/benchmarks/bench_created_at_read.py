@@ -0,0 +1,88 @@
+"""Read latency for 10k submissions: ISO-string vs native BSON ``created_at``.
+
+"before" reproduces the old read path (string storage, a per-row
+``datetime.fromisoformat`` loop, then response-model validation); "after"
+reads BSON dates and hands the documents straight to validation.
+
+    BENCH_MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_created_at_read.py
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import _common
+from pydantic import TypeAdapter
+
+from server import ContactSubmission
+
+CONTACTS = TypeAdapter(List[ContactSubmission])
+
+
+def make_docs(rows, as_string):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    docs = []
+    for i in range(rows):
+        created_at = start + timedelta(seconds=i)
+        docs.append({
+            "id": str(uuid.uuid4()),
+            "name": f"Contact {i}",
+            "email": f"contact{i}@example.com",
+            "phone": None,
+            "services": ["AI Agent Building"],
+            "reason": "New Project Inquiry",
+            "message": "Benchmark message",
+            "created_at": created_at.isoformat() if as_string else created_at,
+        })
+    return docs
+
+
+async def read_before(collection, rows):
+    docs = await collection.find({}, {"_id": 0}).to_list(rows)
+    for doc in docs:
+        if isinstance(doc.get('created_at'), str):
+            doc['created_at'] = datetime.fromisoformat(doc['created_at'])
+    return CONTACTS.validate_python(docs)
+
+
+async def read_after(collection, rows):
+    docs = await collection.find({}, {"_id": 0}).to_list(rows)
+    return CONTACTS.validate_python(docs)
+
+
+async def measure(read, collection, rows, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await read(collection, rows)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def main(rows, repeat):
+    db = _common.bench_db("lumis_bench_created_at")
+    await db.contacts_iso.drop()
+    await db.contacts_bson.drop()
+    await db.contacts_iso.insert_many(make_docs(rows, as_string=True))
+    await db.contacts_bson.insert_many(make_docs(rows, as_string=False))
+    try:
+        before = await measure(read_before, db.contacts_iso, rows, repeat)
+        after = await measure(read_after, db.contacts_bson, rows, repeat)
+    finally:
+        await db.contacts_iso.drop()
+        await db.contacts_bson.drop()
+    print(f"rows: {rows}, median of {repeat} runs")
+    print(f"before (ISO strings + fromisoformat loop): {before:8.1f} ms")
+    print(f"after  (BSON dates, no conversion loop):   {after:8.1f} ms")
+    print(f"saved: {before - after:8.1f} ms ({(1 - after / before) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
@@ -0,0 +1,78 @@
+"""POST /api/contact with Idempotency-Key: fresh requests, replays, and concurrent bursts.
+
+Runs the app in-process over httpx's ASGI transport and reports latency for
+submissions without a key, with a new key, repeated with a used key (answered
+from the in-process LRU) and repeated after the LRU is dropped (answered from
+MongoDB). Then fires ``--burst`` concurrent copies of one submission under
+one key, ``--bursts`` times, and counts the contacts actually written.
+
+    python benchmarks/bench_idempotency.py --requests 300 --burst 20 --bursts 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import _common  # noqa: F401
+
+os.environ["MONGO_URL"] = os.environ.get("BENCH_MONGO_URL", "mongomock://")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["SUBMISSION_DEDUPE_SECONDS"] = "0"
+if os.environ["MONGO_URL"].startswith("mongomock://"):
+    os.environ["INDEX_PLAN_CHECK"] = "off"
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+
+
+def contact(n):
+    return {"name": "Bench", "email": f"bench{n}@example.com", "message": f"Idempotency bench {n}"}
+
+
+async def timed(client, body, key=None, forget=False):
+    if forget:
+        server.idempotency._finished.clear()
+    headers = {"Idempotency-Key": key} if key else None
+    start = time.perf_counter()
+    response = await client.post("/api/contact", json=body, headers=headers)
+    elapsed = (time.perf_counter() - start) * 1000
+    assert response.status_code == 200, response.text
+    return elapsed
+
+
+async def main(args):
+    app = server.app
+    async with app.router.lifespan_context(app):
+        await server.db.contacts.delete_many({})
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            rows = [
+                ("no key", [await timed(client, contact(f"plain{n}")) for n in range(args.requests)]),
+                ("new key", [await timed(client, contact(n), key=f"key-{n}") for n in range(args.requests)]),
+                ("replay, in memory", [await timed(client, contact(n), key=f"key-{n}") for n in range(args.requests)]),
+                ("replay, from MongoDB", [await timed(client, contact(n), key=f"key-{n}", forget=True) for n in range(args.requests)]),
+            ]
+            before = await server.db.contacts.count_documents({})
+            for burst in range(args.bursts):
+                body = contact(f"burst{burst}")
+                responses = await asyncio.gather(*(
+                    client.post("/api/contact", json=body, headers={"Idempotency-Key": f"burst-{burst}"})
+                    for _ in range(args.burst)
+                ))
+                assert len({response.json()["id"] for response in responses}) == 1
+            written = await server.db.contacts.count_documents({}) - before
+
+    print(f"{'request':<22} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, latencies in rows:
+        latencies.sort()
+        print(f"{name:<22} {statistics.median(latencies):>8.2f} {latencies[int(len(latencies) * 0.99) - 1]:>8.2f}")
+    print(f"{args.bursts} bursts of {args.burst} concurrent requests per key: {written} contact(s) written")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--burst", type=int, default=20)
+    parser.add_argument("--bursts", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,71 @@
+"""Per-request overhead of MetricsMiddleware, checked against a budget.
+
+Drives a trivial FastAPI route directly through ASGI (no HTTP client in the
+loop) with and without the middleware and reports the mean difference.
+Exits non-zero when the overhead exceeds ``--budget-us``.
+
+    python benchmarks/bench_instrumentation.py --requests 20000 --budget-us 25
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+import _common  # noqa: F401
+from fastapi import FastAPI
+
+from metrics import MetricsMiddleware
+
+
+def build_app(instrumented):
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    async def ping():
+        return {"ok": True}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def drive(app, requests):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/api/ping", "raw_path": b"/api/ping", "root_path": "",
+        "query_string": b"", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--budget-us", type=float, default=25.0)
+    args = parser.parse_args()
+
+    bare = asyncio.run(drive(build_app(False), args.requests))
+    instrumented = asyncio.run(drive(build_app(True), args.requests))
+    overhead = instrumented - bare
+    print(f"bare:         {bare:7.1f} us/request")
+    print(f"instrumented: {instrumented:7.1f} us/request")
+    print(f"overhead:     {overhead:7.1f} us/request (budget {args.budget_us:.1f} us)")
+    if overhead > args.budget_us:
+        print("over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
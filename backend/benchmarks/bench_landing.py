@@ -0,0 +1,67 @@
+"""Compare the /api/landing bundle against the five-call landing fan-out.
+
+Runs the app in-process over httpx's ASGI transport, so the numbers measure
+handler + serialization cost without network noise.
+
+    python benchmarks/bench_landing.py --seconds 5 --concurrency 16
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import _common  # noqa: F401
+
+os.environ["MONGO_URL"] = os.environ.get("BENCH_MONGO_URL", "mongomock://")
+if os.environ["MONGO_URL"].startswith("mongomock://"):
+    os.environ["INDEX_PLAN_CHECK"] = "off"
+
+import httpx  # noqa: E402
+
+from server import app  # noqa: E402
+
+FAN_OUT = ["/api/testimonials", "/api/case-studies", "/api/blog-posts", "/api/services", "/api/available-times"]
+
+
+async def fan_out(client):
+    responses = await asyncio.gather(*(client.get(path) for path in FAN_OUT))
+    assert all(r.status_code == 200 for r in responses)
+
+
+async def bundle(client):
+    response = await client.get("/api/landing")
+    assert response.status_code == 200
+
+
+async def run(scenario, seconds, concurrency):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        views = 0
+        deadline = time.perf_counter() + seconds
+
+        async def worker():
+            nonlocal views
+            while time.perf_counter() < deadline:
+                await scenario(client)
+                views += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return views / (time.perf_counter() - start)
+
+
+async def main(args):
+    # The lifespan loads the content snapshot the handlers serve.
+    async with app.router.lifespan_context(app):
+        fan_out_rate = await run(fan_out, args.seconds, args.concurrency)
+        bundle_rate = await run(bundle, args.seconds, args.concurrency)
+    print(f"five-call fan-out: {fan_out_rate:10.1f} landing views/sec ({fan_out_rate * len(FAN_OUT):.1f} req/sec)")
+    print(f"/api/landing:      {bundle_rate:10.1f} landing views/sec")
+    print(f"speedup:           {bundle_rate / fan_out_rate:10.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,93 @@
+"""POST /api/contact latency with and without a slow notification webhook.
+
+Runs the app in-process twice: once with no sinks, once with
+``NOTIFY_WEBHOOK_URL`` pointing at a local receiver that takes
+``--sink-delay`` seconds per call. The handler only writes the outbox, so the
+two latency profiles should match however slow the receiver is; the run then
+waits for every webhook to arrive.
+
+    python benchmarks/bench_notifications.py --requests 200 --sink-delay 0.5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import _common  # noqa: F401
+
+os.environ["MONGO_URL"] = os.environ.get("BENCH_MONGO_URL", "mongomock://")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+if os.environ["MONGO_URL"].startswith("mongomock://"):
+    os.environ["INDEX_PLAN_CHECK"] = "off"
+
+import httpx  # noqa: E402
+
+received = []
+
+
+def start_receiver(delay):
+    class Receiver(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            time.sleep(delay)
+            received.append(self.headers["X-Lumis-Event"])
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    receiver = ThreadingHTTPServer(("127.0.0.1", 0), Receiver)
+    threading.Thread(target=receiver.serve_forever, daemon=True).start()
+    return receiver
+
+
+async def post_contacts(app, requests, tag):
+    latencies = []
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            for n in range(requests):
+                body = {"name": "Bench", "email": f"bench{n}@example.com", "message": f"{tag} {n}"}
+                start = time.perf_counter()
+                response = await client.post("/api/contact", json=body)
+                latencies.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200, response.text
+            deadline = time.monotonic() + 60
+            while tag == "notify" and len(received) < requests and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+    return latencies
+
+
+def summarize(name, latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{name:<28} p50 {statistics.median(latencies):7.2f} ms   p99 {p99:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--sink-delay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    from server import app
+
+    os.environ.pop("NOTIFY_WEBHOOK_URL", None)
+    quiet = asyncio.run(post_contacts(app, args.requests, "quiet"))
+    receiver = start_receiver(args.sink_delay)
+    os.environ["NOTIFY_WEBHOOK_URL"] = f"http://127.0.0.1:{receiver.server_address[1]}/hook"
+    started = time.perf_counter()
+    notify = asyncio.run(post_contacts(app, args.requests, "notify"))
+    drained = time.perf_counter() - started
+    receiver.shutdown()
+
+    summarize("no sinks", quiet)
+    summarize(f"webhook ({args.sink_delay:.2f}s per call)", notify)
+    print(f"webhooks received: {len(received)}/{args.requests} in {drained:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
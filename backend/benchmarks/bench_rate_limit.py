@@ -0,0 +1,66 @@
+"""Per-submission cost of the rate limiter and duplicate check, against a budget.
+
+Times what ``guarded_submission`` adds in front of every public write with
+the in-memory store: an IP bucket, a fingerprint and dedupe claim, and an
+email bucket. Keys cycle through ``--keys`` distinct clients so the LRUs are
+exercised at realistic sizes. Exits non-zero when the cost exceeds
+``--budget-us``.
+
+    python benchmarks/bench_rate_limit.py --requests 200000 --keys 50000 --budget-us 10
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+import _common  # noqa: F401
+
+from rate_limit import Deduplicator, MemoryStore, RateLimit
+
+IP_LIMIT = RateLimit.parse("ip", "30/60")
+EMAIL_LIMIT = RateLimit.parse("email", "5/600")
+
+
+async def guard(store, dedupe, n, keys):
+    client = n % keys
+    payload = {"name": "Bench", "email": f"client{client}@example.com", "message": f"message {n}"}
+    await store.take(IP_LIMIT, f"10.0.{client // 256 % 256}.{client % 256}")
+    fingerprint = Deduplicator.fingerprint("contacts", payload)
+    if await dedupe.claim(fingerprint, b"{}") is None:
+        await store.take(EMAIL_LIMIT, payload["email"])
+
+
+async def no_guard(store, dedupe, n, keys):
+    client = n % keys
+    {"name": "Bench", "email": f"client{client}@example.com", "message": f"message {n}"}
+
+
+async def drive(step, requests, keys):
+    store = MemoryStore()
+    dedupe = Deduplicator(store, window=300)
+    for n in range(min(requests, keys)):
+        await step(store, dedupe, n, keys)
+    start = time.perf_counter()
+    for n in range(requests):
+        await step(store, dedupe, n, keys)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--keys", type=int, default=50000)
+    parser.add_argument("--budget-us", type=float, default=10.0)
+    args = parser.parse_args()
+
+    bare = asyncio.run(drive(no_guard, args.requests, args.keys))
+    guarded = asyncio.run(drive(guard, args.requests, args.keys))
+    overhead = guarded - bare
+    print(f"rate limit + dedupe: {overhead:6.2f} us/submission (budget {args.budget_us:.1f} us)")
+    if overhead > args.budget_us:
+        print("over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
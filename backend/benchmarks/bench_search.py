@@ -0,0 +1,137 @@
+"""Search latency: indexed search vs a case-insensitive regex scan.
+
+Submissions: seeds ``--submissions`` contacts (1M by default; kept between
+runs while the count matches) and times ``search_submissions`` on the text
+index against the ``$regex`` ``$or`` scan over the same fields that a search
+without the index would need. This part needs a real server in
+``BENCH_MONGO_URL``; mongomock has no ``$text``.
+
+Content: times ``ContentIndex.search`` against a regex scan over the seed
+records, which always runs.
+
+    BENCH_MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_search.py --submissions 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import _common
+from pymongo import IndexModel
+
+import server
+from content import SEARCH_FIELDS
+from content_store import load_seed, validate
+from indexes import TEXT_SEARCH_INDEX, TEXT_SEARCH_WEIGHTS
+from search import search_submissions
+
+# Rare, medium and common terms plus a multi-term query.
+QUERIES = ["kubernetes", "migration", "automation", "cloud cost reduction"]
+COMMON = ["project", "automation", "help", "team", "support", "data", "workflow", "platform", "business"]
+MEDIUM = ["migration", "database", "pipeline", "chatbot", "analytics", "security", "reporting", "integration"]
+RARE = ["kubernetes", "terraform", "snowflake", "airflow", "graphql", "kafka", "cost", "reduction", "cloud"]
+
+
+def make_message(rng):
+    words = rng.choices(COMMON, k=6) + rng.choices(MEDIUM, k=2)
+    if rng.random() < 0.01:
+        words.append(rng.choice(RARE))
+    rng.shuffle(words)
+    return " ".join(words)
+
+
+async def seed(collection, count, batch=10000):
+    if await collection.estimated_document_count() == count:
+        return
+    await collection.drop()
+    rng = random.Random(7)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for first in range(0, count, batch):
+        await collection.insert_many([
+            {
+                "id": str(uuid.uuid4()),
+                "name": f"Contact {n}",
+                "email": f"contact{n}@example.com",
+                "services": [],
+                "reason": "New Project Inquiry",
+                "message": make_message(rng),
+                "created_at": start + timedelta(seconds=n),
+            }
+            for n in range(first, min(first + batch, count))
+        ], ordered=False)
+    await collection.create_indexes([TEXT_SEARCH_INDEX, IndexModel([("email", 1)], name="email")])
+
+
+def regex_filter(query):
+    pattern = "|".join(re.escape(word) for word in query.split())
+    return {"$or": [{field: {"$regex": pattern, "$options": "i"}} for field in TEXT_SEARCH_WEIGHTS]}
+
+
+async def timed(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def bench_submissions(count, repeat):
+    db = _common.bench_db("lumis_bench_search")
+    collection = db.contacts
+    await seed(collection, count)
+    print(f"submissions: {count}, median of {repeat} runs, first page of 20")
+    print(f"{'query':<24} {'text index ms':>14} {'regex scan ms':>14}")
+    for query in QUERIES:
+        indexed = await timed(lambda: search_submissions(collection, query, 20, 0, server.READ_PROJECTION), repeat)
+        scan = await timed(lambda: collection.find(regex_filter(query), server.READ_PROJECTION).limit(21).to_list(21), repeat)
+        print(f"{query:<24} {indexed:>14.2f} {scan:>14.2f}")
+
+
+def bench_content(repeat):
+    # The server loads its snapshot in the lifespan; build one from the seed.
+    content = server.build_content(validate(server.CONTENT_MODELS, load_seed()))
+    records = [
+        (kind, record, fields)
+        for kind, fields in SEARCH_FIELDS.items()
+        for record in getattr(content, kind.replace("-", "_")).records
+    ]
+
+    def scan(query):
+        pattern = re.compile("|".join(re.escape(word) for word in query.split()), re.I)
+        return [record for _, record, fields in records if any(pattern.search(str(record.get(field, ""))) for field in fields)]
+
+    print(f"content: {len(records)} records, mean of {repeat} runs")
+    print(f"{'query':<24} {'index us':>14} {'regex scan us':>14}")
+    for query in QUERIES:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            content.search.search(query, 20)
+        indexed = (time.perf_counter() - start) / repeat * 1e6
+        start = time.perf_counter()
+        for _ in range(repeat):
+            scan(query)
+        scanned = (time.perf_counter() - start) / repeat * 1e6
+        print(f"{query:<24} {indexed:>14.1f} {scanned:>14.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--submissions", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    bench_content(args.repeat * 1000)
+    if os.environ.get("BENCH_MONGO_URL"):
+        asyncio.run(bench_submissions(args.submissions, args.repeat))
+    else:
+        print("submissions: skipped, set BENCH_MONGO_URL (mongomock has no $text)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Encode cost of a submissions list: response_model + stdlib JSON vs orjson.
+
+"default" is what FastAPI does for ``response_model=List[ContactSubmission]``
+with ``JSONResponse``: validate every row, ``jsonable_encoder`` the result,
+then ``json.dumps``. "fast" is the trusted-read path: the stored documents go
+straight to ``FastJSONResponse``. Reports best-of-N wall time and the peak
+memory allocated while encoding (tracemalloc).
+
+    python benchmarks/bench_serialization.py
+"""
+import argparse
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import _common  # noqa: F401
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from server import ContactSubmission, FastJSONResponse
+
+CONTACTS = TypeAdapter(List[ContactSubmission])
+
+
+def make_docs(rows):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "name": f"Contact {i}",
+            "email": f"contact{i}@example.com",
+            "phone": "+1234567890",
+            "services": ["AI Agent Building", "Web Development"],
+            "reason": "New Project Inquiry",
+            "message": "I would like to discuss a project with your team. " * 3,
+            "created_at": start + timedelta(seconds=i),
+        }
+        for i in range(rows)
+    ]
+
+
+def encode_default(docs):
+    return JSONResponse(jsonable_encoder(CONTACTS.validate_python(docs))).body
+
+
+def encode_fast(docs):
+    return FastJSONResponse(docs).body
+
+
+def measure(encode, docs, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encode(docs)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    encode(docs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>6} {'default ms':>11} {'fast ms':>9} {'speedup':>8} {'default KiB':>12} {'fast KiB':>9}")
+    for rows in args.sizes:
+        docs = make_docs(rows)
+        default_ms, default_kib = measure(encode_default, docs, args.repeat)
+        fast_ms, fast_kib = measure(encode_fast, docs, args.repeat)
+        print(
+            f"{rows:>6} {default_ms:>11.2f} {fast_ms:>9.2f} {default_ms / fast_ms:>7.1f}x "
+            f"{default_kib:>12.0f} {fast_kib:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Stats latency: incremental counters vs aggregating the submissions.
+
+Seeds ``--rows`` contacts spread over ``--days`` days, builds the counters
+with ``SubmissionStats.rebuild`` and times the 30-day report both ways. The
+counter read stays flat as ``--rows`` grows; the pipeline grows with it.
+Also reports what ``record`` adds to each insert.
+
+    BENCH_MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_stats.py --rows 1000000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import _common
+
+from stats import SubmissionStats, daily_counts, known_values, report, window_start
+
+SERVICES = ["AI Agent Building", "Automation Software", "DevOps", "Cloud Migration", "Database Optimization"]
+REASONS = ["New Project Inquiry", "Support", "Partnership", None]
+KNOWN = known_values(SERVICES)
+
+
+def make_docs(first, count, days, rng):
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "name": f"Contact {n}",
+            "email": f"contact{n}@example.com",
+            "services": rng.sample(SERVICES, rng.randint(0, 2)),
+            "reason": rng.choice(REASONS),
+            "message": "Benchmark message",
+            "created_at": now - timedelta(seconds=rng.randrange(days * 86400)),
+        }
+        for n in range(first, first + count)
+    ]
+
+
+async def timed(run, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def main(rows, days, repeat):
+    db = _common.bench_db("lumis_bench_stats")
+    await db.contacts.drop()
+    await db.submission_stats.drop()
+    rng = random.Random(3)
+    for first in range(0, rows, 10000):
+        await db.contacts.insert_many(make_docs(first, min(10000, rows - first), days, rng), ordered=False)
+    stats = SubmissionStats(db.submission_stats, lambda: KNOWN)
+    try:
+        await stats.rebuild(db)
+        since = window_start(30)
+        counters = await timed(lambda: stats.summary("contacts", since), repeat)
+        pipeline = await timed(lambda: daily_counts(db.contacts, "contacts", since, known=KNOWN), repeat)
+        assert await stats.summary("contacts", since) == report("contacts", await daily_counts(db.contacts, "contacts", since, known=KNOWN))
+
+        docs = make_docs(rows, 200, 1, rng)
+        start = time.perf_counter()
+        for doc in docs:
+            await stats.record("contacts", [doc])
+        record_ms = (time.perf_counter() - start) / len(docs) * 1000
+    finally:
+        await db.contacts.drop()
+        await db.submission_stats.drop()
+    print(f"rows: {rows} over {days} days, 30-day report, median of {repeat} runs")
+    print(f"counters (one doc per day): {counters:8.2f} ms")
+    print(f"aggregation pipeline:       {pipeline:8.2f} ms")
+    print(f"record() per insert:        {record_ms:8.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.days, args.repeat))
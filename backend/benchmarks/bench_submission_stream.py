@@ -0,0 +1,143 @@
+"""Idle cost and fanout latency of /api/submissions/stream against polling /api/contacts.
+
+Opens ``--clients`` event streams on one in-process app (driven through the
+ASGI interface directly, since httpx's ASGI transport buffers whole bodies)
+and reports the memory each idle stream holds. Then submits ``--posts``
+contacts and measures how long each takes to reach every stream. One extra
+stream never reads; once the posts outnumber its buffer
+(``SUBMISSION_STREAM_BUFFER``) it is disconnected rather than buffered. Finally it prices the alternative: each of those dashboards
+polling ``GET /api/contacts?limit=100`` every ``--poll-every`` seconds, at the
+CPU and bytes one uncached poll costs here.
+
+    python benchmarks/bench_submission_stream.py --clients 5000 --posts 300
+"""
+import argparse
+import asyncio
+import gc
+import os
+import statistics
+import time
+import tracemalloc
+
+import _common  # noqa: F401
+
+os.environ["MONGO_URL"] = os.environ.get("BENCH_MONGO_URL", "mongomock://")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["SUBMISSION_DEDUPE_SECONDS"] = "0"
+os.environ.setdefault("SUBMISSION_STREAM_MAX_CLIENTS", "1000000")
+if os.environ["MONGO_URL"].startswith("mongomock://"):
+    os.environ["INDEX_PLAN_CHECK"] = "off"
+
+STREAM_PATH = "/api/submissions/stream"
+
+
+class StreamClient:
+    """One open stream: records when each event frame arrives."""
+
+    def __init__(self, app, stalled=False):
+        self.arrivals = []
+        self.stalled = stalled
+        self.closed = asyncio.Event()
+        self.task = asyncio.create_task(app(self.scope(), self.receive, self.send))
+
+    @staticmethod
+    def scope():
+        return {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": STREAM_PATH, "raw_path": STREAM_PATH.encode(), "query_string": b"", "root_path": "",
+            "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+        }
+
+    async def receive(self):
+        if not hasattr(self, "_requested"):
+            self._requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self.closed.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        if message["type"] == "http.response.body" and message.get("body", b"").startswith(b"id:"):
+            if self.stalled:
+                await self.closed.wait()  # a client that stopped reading
+            self.arrivals.append(time.perf_counter())
+
+
+def rss_mb():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def until(condition, timeout=120.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError
+        await asyncio.sleep(0.001)
+
+
+async def main(args):
+    import httpx
+    import server
+
+    app = server.app
+    async with app.router.lifespan_context(app):
+        feed = server.submission_feed
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            gc.collect()
+            rss_before = rss_mb()
+            tracemalloc.start()
+            traced_before = tracemalloc.get_traced_memory()[0]
+            clients = [StreamClient(app) for _ in range(args.clients)]
+            await until(lambda: len(feed.subscribers) == args.clients)
+            gc.collect()
+            traced = (tracemalloc.get_traced_memory()[0] - traced_before) / args.clients
+            tracemalloc.stop()
+            rss = (rss_mb() - rss_before) * 1024 / args.clients
+            stalled = StreamClient(app, stalled=True)
+            await until(lambda: len(feed.subscribers) == args.clients + 1)
+
+            to_all, to_median = [], []
+            for n in range(args.posts):
+                start = time.perf_counter()
+                response = await client.post("/api/contact", json={"name": "Stream", "email": f"stream{n}@example.com", "message": f"Stream bench {n}"})
+                assert response.status_code == 200, response.text
+                await until(lambda: all(len(c.arrivals) > n for c in clients))
+                arrivals = sorted(c.arrivals[n] - start for c in clients)
+                to_all.append(arrivals[-1] * 1000)
+                to_median.append(arrivals[len(arrivals) // 2] * 1000)
+
+            polls = 200
+            cpu = time.process_time()
+            poll_bytes = 0
+            for _ in range(polls):
+                await server.response_cache.invalidate("contacts")  # as after a new submission
+                poll = await client.get("/api/contacts?limit=100", headers={"Accept-Encoding": "gzip, br"})
+                poll_bytes += poll.num_bytes_downloaded
+            poll_cpu = (time.process_time() - cpu) / polls
+
+            for c in clients + [stalled]:
+                c.closed.set()
+            await asyncio.gather(*(c.task for c in clients + [stalled]), return_exceptions=True)
+            dropped = feed.dropped
+
+    to_all.sort()
+    print(f"{args.clients} idle streams: {traced / 1024:.1f} KiB traced, {rss:.1f} KiB RSS per stream")
+    print(f"fanout of {args.posts} submissions (POST start to frame sent):")
+    print(f"  to the median stream p50 {statistics.median(to_median):.2f} ms")
+    print(f"  to every stream      p50 {statistics.median(to_all):.2f} ms  p99 {to_all[int(len(to_all) * 0.99) - 1]:.2f} ms")
+    print(f"stalled streams disconnected: {dropped} (buffer {feed.buffer} events)")
+    rate = args.clients / args.poll_every
+    print(f"polling instead: {args.clients} dashboards every {args.poll_every:g}s = {rate:.0f} req/s, "
+          f"{poll_cpu * 1000:.2f} ms CPU and {poll_bytes / polls / 1024:.1f} KiB per poll "
+          f"= {rate * poll_cpu:.1f} cores, {rate * poll_bytes / polls / 1024 / 1024:.1f} MiB/s, {rate:.0f} queries/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--posts", type=int, default=300)
+    parser.add_argument("--poll-every", type=float, default=5.0, help="seconds between polls of a dashboard")
+    asyncio.run(main(parser.parse_args()))
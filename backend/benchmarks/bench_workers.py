@@ -0,0 +1,123 @@
+"""Read-endpoint throughput of gunicorn with 1..N uvicorn workers.
+
+Starts ``gunicorn -c gunicorn.conf.py server:app`` once per worker count on a
+loopback port and drives the read endpoints from ``--clients`` separate
+load-generator processes (a single asyncio client saturates one core long
+before several workers do). MongoDB is ``BENCH_MONGO_URL`` when set,
+otherwise each worker gets its own in-memory stand-in, which is fine here as
+the read endpoints serve static content.
+
+    python benchmarks/bench_workers.py --workers 1 2 4 --seconds 10 --clients 4
+"""
+import argparse
+import asyncio
+import itertools
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import _common  # noqa: F401
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+READ_PATHS = [
+    "/api/landing",
+    "/api/testimonials",
+    "/api/case-studies",
+    "/api/blog-posts",
+    "/api/services",
+    "/api/available-times",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _drive(base_url, seconds, concurrency):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies = []
+    paths = itertools.cycle(READ_PATHS)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + seconds
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.get(next(paths))
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.status_code
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def load_client(args):
+    return asyncio.run(_drive(*args))
+
+
+def wait_until_ready(base_url, server, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {server.returncode}")
+        try:
+            if httpx.get(base_url + "/api/ready", timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("gunicorn did not become ready")
+
+
+def measure(workers, args):
+    port = _free_port()
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}", METRICS_ENABLED="false")
+    env["MONGO_URL"] = os.environ.get("BENCH_MONGO_URL", "mongomock://")
+    if env["MONGO_URL"].startswith("mongomock://"):
+        env["INDEX_PLAN_CHECK"] = "off"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--log-level", "warning", "server:app"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(base_url, server)
+        with multiprocessing.Pool(args.clients) as pool:
+            pool.map(load_client, [(base_url, 1.0, args.concurrency)] * args.clients)  # warm up every worker
+            results = pool.map(load_client, [(base_url, args.seconds, args.concurrency)] * args.clients)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    latencies = sorted(itertools.chain.from_iterable(results))
+    return len(latencies) / args.seconds, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000
+
+
+def main():
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, cpus} | {n for n in (2, 4, 8) if n < cpus}))
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=max(cpus, 2), help="load-generator processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight per client")
+    args = parser.parse_args()
+
+    print(f"{cpus} CPU(s) available; {args.clients} client processes x {args.concurrency} in flight")
+    print(f"{'workers':>7} {'req/s':>10} {'speedup':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    baseline = None
+    for workers in args.workers:
+        rate, p50, p99 = measure(workers, args)
+        baseline = baseline or rate
+        print(f"{workers:>7} {rate:>10.1f} {rate / baseline:>7.2f}x {p50:>8.2f} {p99:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""POST-path write latency and insert throughput: insert_one vs write-behind.
+
+Each simulated request builds a ``ContactSubmission`` document and either
+awaits ``insert_one`` (current path) or hands it to ``WriteBehindQueue``.
+Latency is what the request handler waits for; inserts/sec counts until the
+data is actually in MongoDB, so the queue's drain time is included.
+
+    BENCH_MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_write_behind.py
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import _common
+
+from server import ContactSubmission
+from write_behind import WriteBehindQueue
+
+
+def make_doc(n):
+    return ContactSubmission(
+        name=f"Contact {n}",
+        email=f"contact{n}@example.com",
+        services=["AI Agent Building"],
+        message="Benchmark message",
+    ).model_dump()
+
+
+async def drive(write, total, concurrency):
+    latencies = []
+    counter = iter(range(total))
+
+    async def worker():
+        for n in counter:
+            doc = make_doc(n)
+            start = time.perf_counter()
+            await write(doc)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(label, latencies, elapsed):
+    print(
+        f"{label:<14} p50 {statistics.median(latencies):7.3f} ms   "
+        f"p99 {percentile(latencies, 99):7.3f} ms   {len(latencies) / elapsed:9.0f} inserts/sec"
+    )
+
+
+async def main(total, concurrency):
+    db = _common.bench_db("lumis_bench_write_behind")
+    await db.contacts.drop()
+    try:
+        start = time.perf_counter()
+        latencies = await drive(db.contacts.insert_one, total, concurrency)
+        report("insert_one", latencies, time.perf_counter() - start)
+
+        await db.contacts.drop()
+        queue = WriteBehindQueue(db)
+        queue.start()
+
+        async def enqueue(doc):
+            queue.put("contacts", doc)
+
+        start = time.perf_counter()
+        latencies = await drive(enqueue, total, concurrency)
+        await queue.drain()
+        report("write-behind", latencies, time.perf_counter() - start)
+        assert await db.contacts.count_documents({}) == total
+    finally:
+        await db.contacts.drop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--total", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(main(args.total, args.concurrency))
@@ -0,0 +1,408 @@
+"""Load test every /api route against a local stack and report JSON per scenario.
+
+The app runs in-process over httpx's ASGI transport (``--mode asgi``, the
+default) or as ``uvicorn server:app`` in a child process on a loopback port
+(``--mode uvicorn``). MongoDB is ``BENCH_MONGO_URL`` when set, otherwise the
+in-memory mongomock-motor stand-in (``MONGO_URL=mongomock://``); use a
+throwaway ``DB_NAME`` against a real mongod, since the run inserts
+submissions. Each scenario sends ``--requests`` requests with
+``--concurrency`` in flight and reports throughput, p50/p95/p99 latency and
+the server process's resident memory. Read scenarios vary their query across
+requests, and for routes behind the response cache the latencies of cache
+hits and misses (``X-Cache``) are also reported apart, since the overall
+percentiles mostly measure hits. ``--no-cache`` turns the cache off so every
+request pays for its queries.
+
+    python benchmarks/loadtest.py --requests 2000 --concurrency 32 --output results.json
+    python benchmarks/loadtest.py --save-baseline baseline.json
+    python benchmarks/loadtest.py --baseline baseline.json --threshold 0.25
+
+With ``--baseline`` the run exits non-zero when a scenario's ``--metric``
+(p95 by default) is more than ``--threshold`` slower than the baseline and
+by at least ``--min-delta-ms``, so sub-millisecond routes do not flap.
+"""
+import argparse
+import asyncio
+import fnmatch
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+os.environ["MONGO_URL"] = os.environ.get("BENCH_MONGO_URL", "mongomock://")
+os.environ.setdefault("DB_NAME", "lumis_loadtest")
+# Every request comes from one client IP, so the submission limits would
+# turn the write scenarios into 429 measurements.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("BULK_IMPORT_TOKEN", "loadtest")
+if os.environ["MONGO_URL"].startswith("mongomock://"):
+    # mongomock cannot explain() query plans.
+    os.environ["INDEX_PLAN_CHECK"] = "off"
+
+import _common  # noqa: F401,E402
+import httpx  # noqa: E402
+
+PERCENTILES = (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99))
+SEARCH_TERMS = ["cloud automation", "web development", "data pipeline", "mobile app", "security audit", "devops"]
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    route: str
+    url: Callable[[int], str]
+    body: Optional[Callable[[int], dict]] = None
+    expected: Tuple[int, ...] = (200,)
+    ndjson: Optional[Callable[[int], bytes]] = None
+    # Server-sent events: time to the first frame, then hang up. Needs
+    # --mode uvicorn, since the ASGI transport waits for the whole body.
+    stream: bool = False
+
+
+def build_scenarios(ids: Dict[str, dict]) -> List[Scenario]:
+    """One scenario per /api route (plus filtered variants), numbered by request index ``i``."""
+    slots = ids["times"]
+    # A random far-future start keeps repeated runs against a real mongod
+    # from colliding on already-booked slots.
+    first_day = date(2100, 1, 1) + timedelta(days=random.randrange(2_000_000))
+
+    def contact(i):
+        return {
+            "name": f"Load Test {i}",
+            "email": f"load{i}@example.com",
+            "phone": "+1234567890",
+            "services": ["Web Development"],
+            "reason": "New Project Inquiry",
+            "message": "Load test submission.",
+        }
+
+    def appointment(i):
+        return {
+            **contact(i),
+            "date": (first_day + timedelta(days=i // len(slots))).isoformat(),
+            "time": slots[i % len(slots)],
+        }
+
+    def bulk(make_row, rows=100):
+        # Request i imports rows i*rows .. i*rows+rows-1, so booked slots never repeat.
+        return lambda i: b"".join(json.dumps(make_row(i * rows + n)).encode() + b"\n" for n in range(rows))
+
+    def fixed(path):
+        return lambda i: path
+
+    def page_sizes(path):
+        # Distinct query strings, so the response cache does not answer every request
+        return lambda i: f"{path}?limit={100 - i % 100}"
+
+    testimonial, case_study, post, service = ids["testimonial"], ids["case_study"], ids["blog_post"], ids["service"]
+    return [
+        Scenario("root", "GET", "/api/", fixed("/api/")),
+        Scenario("ready", "GET", "/api/ready", fixed("/api/ready")),
+        Scenario("landing", "GET", "/api/landing", fixed("/api/landing")),
+        Scenario("contact_create", "POST", "/api/contact", fixed("/api/contact"), contact),
+        Scenario("contacts_list", "GET", "/api/contacts", page_sizes("/api/contacts")),
+        Scenario("contacts_bulk", "POST", "/api/contacts/bulk", fixed("/api/contacts/bulk"), ndjson=bulk(contact)),
+        Scenario("contacts_export", "GET", "/api/contacts/export", fixed("/api/contacts/export?format=ndjson")),
+        Scenario("appointment_create", "POST", "/api/appointments", fixed("/api/appointments"), appointment),
+        Scenario("appointments_list", "GET", "/api/appointments", page_sizes("/api/appointments")),
+        Scenario("appointments_bulk", "POST", "/api/appointments/bulk", fixed("/api/appointments/bulk"),
+                 ndjson=bulk(lambda n: appointment(1_000_000 + n))),
+        Scenario("appointments_export", "GET", "/api/appointments/export", fixed("/api/appointments/export?format=csv")),
+        Scenario("submissions_stream", "GET", "/api/submissions/stream", fixed("/api/submissions/stream"), stream=True),
+        Scenario("testimonials", "GET", "/api/testimonials", fixed("/api/testimonials")),
+        Scenario("testimonial_detail", "GET", "/api/testimonials/{testimonial_id}", fixed(f"/api/testimonials/{testimonial['id']}")),
+        Scenario("case_studies", "GET", "/api/case-studies", fixed("/api/case-studies")),
+        Scenario("case_studies_by_industry", "GET", "/api/case-studies", fixed(f"/api/case-studies?industry={case_study['industry']}")),
+        Scenario("case_study_detail", "GET", "/api/case-studies/{case_study_id}", fixed(f"/api/case-studies/{case_study['id']}")),
+        Scenario("case_study_pdf", "GET", "/api/case-studies/{case_study_id}/pdf", fixed(f"/api/case-studies/{case_study['id']}/pdf")),
+        Scenario("blog_posts", "GET", "/api/blog-posts", fixed("/api/blog-posts")),
+        Scenario("blog_posts_by_category", "GET", "/api/blog-posts", fixed(f"/api/blog-posts?category={post['category']}")),
+        Scenario("blog_post_detail", "GET", "/api/blog-posts/{post_id}", fixed(f"/api/blog-posts/{post['id']}")),
+        Scenario("services", "GET", "/api/services", fixed("/api/services")),
+        Scenario("service_detail", "GET", "/api/services/{service_id}", fixed(f"/api/services/{service['id']}")),
+        Scenario("available_times", "GET", "/api/available-times", fixed("/api/available-times")),
+        Scenario("available_times_for_date", "GET", "/api/available-times",
+                 lambda i: f"/api/available-times?date={(first_day + timedelta(days=i % 30)).isoformat()}"),
+        Scenario("search", "GET", "/api/search",
+                 lambda i: f"/api/search?q={SEARCH_TERMS[i % len(SEARCH_TERMS)].replace(' ', '+')}&limit={20 - i // len(SEARCH_TERMS) % 10}"),
+        Scenario("stats", "GET", "/api/stats", lambda i: f"/api/stats?days={30 - i % 30}"),
+        Scenario("stats_pipeline", "GET", "/api/stats", lambda i: f"/api/stats?days={30 - i % 30}&source=pipeline"),
+        Scenario("metrics_pool", "GET", "/api/metrics/pool", fixed("/api/metrics/pool")),
+        Scenario("metrics_cache", "GET", "/api/metrics/cache", fixed("/api/metrics/cache")),
+        Scenario("metrics", "GET", "/api/metrics", fixed("/api/metrics")),
+    ]
+
+
+def uncovered_routes(scenarios: List[Scenario]) -> List[str]:
+    """``METHOD /path`` of every ``api_router`` route no scenario exercises."""
+    from server import api_router
+
+    covered = {(s.method, s.route) for s in scenarios}
+    missing = []
+    for route in api_router.routes:
+        for method in sorted(getattr(route, "methods", None) or ()):
+            if (method, route.path) not in covered:
+                missing.append(f"{method} {route.path}")
+    return missing
+
+
+def write_sample_pdfs():
+    """Point ``CASE_STUDY_PDF_DIR`` at generated PDFs unless a real directory is configured."""
+    if "CASE_STUDY_PDF_DIR" in os.environ:
+        return
+    # server reads the directory at import time, so set it first.
+    pdf_dir = Path(tempfile.mkdtemp(prefix="lumis-loadtest-"))
+    os.environ["CASE_STUDY_PDF_DIR"] = str(pdf_dir)
+    from content_store import load_seed
+
+    for case_study in load_seed()["case_studies"]:
+        if case_study.get("pdf_filename"):
+            (pdf_dir / case_study["pdf_filename"]).write_bytes(b"%PDF-1.4\n" + os.urandom(256 * 1024))
+
+
+def process_memory(pid: int) -> Dict[str, Optional[float]]:
+    """Current and peak resident set size in MiB, read from /proc (None elsewhere)."""
+    fields = {"VmRSS": "rss_mb", "VmHWM": "peak_rss_mb"}
+    memory: Dict[str, Optional[float]] = dict.fromkeys(fields.values())
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                key, _, value = line.partition(":")
+                if key in fields:
+                    memory[fields[key]] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return memory
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))]
+
+
+def cache_breakdown(by_cache: Dict[str, List[float]]) -> dict:
+    """Counts and percentiles of cache hits and misses apart, for routes behind the response cache."""
+    if not by_cache:
+        return {}
+    breakdown = {}
+    for outcome, count in (("hit", "cache_hits"), ("miss", "cache_misses")):
+        ordered = sorted(by_cache.get(outcome.upper(), []))
+        breakdown[count] = len(ordered)
+        for name, q in PERCENTILES:
+            breakdown[f"{outcome}_{name}"] = round(percentile(ordered, q) * 1000, 3) if ordered else None
+    return breakdown
+
+
+async def run_scenario(client, scenario: Scenario, requests: int, concurrency: int, warmup: int, pid: int) -> dict:
+    latencies: List[float] = []
+    by_cache: Dict[str, List[float]] = {}
+    statuses: Counter = Counter()
+    next_index = 0
+
+    async def worker(limit, record):
+        nonlocal next_index
+        while next_index < limit:
+            i = next_index
+            next_index += 1
+            body = scenario.body(i) if scenario.body else None
+            content = scenario.ndjson(i) if scenario.ndjson else None
+            headers = None
+            if content is not None:
+                headers = {"content-type": "application/x-ndjson", "x-import-token": os.environ["BULK_IMPORT_TOKEN"]}
+            start = time.perf_counter()
+            if scenario.stream:
+                async with client.stream(scenario.method, scenario.url(i)) as response:
+                    async for _ in response.aiter_raw():
+                        break
+            else:
+                response = await client.request(scenario.method, scenario.url(i), json=body, content=content, headers=headers)
+                await response.aread()
+            if record:
+                latency = time.perf_counter() - start
+                latencies.append(latency)
+                statuses[response.status_code] += 1
+                if "x-cache" in response.headers:
+                    by_cache.setdefault(response.headers["x-cache"], []).append(latency)
+
+    await asyncio.gather(*(worker(warmup, False) for _ in range(concurrency)))
+    next_index, total = warmup, warmup + requests
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(total, True) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ordered = sorted(latencies)
+    result = {
+        "route": f"{scenario.method} {scenario.route}",
+        "requests": len(ordered),
+        "errors": sum(count for status, count in statuses.items() if status not in scenario.expected),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput_rps": round(len(ordered) / elapsed, 1),
+        **{name: round(percentile(ordered, q) * 1000, 3) for name, q in PERCENTILES},
+        "max_ms": round(ordered[-1] * 1000, 3),
+        **cache_breakdown(by_cache),
+    }
+    result.update(process_memory(pid))
+    return result
+
+
+async def discover(client) -> Dict[str, dict]:
+    """Pick the ids and filter values the parameterised scenarios request."""
+    paths = {
+        "testimonial": "/api/testimonials",
+        "case_study": "/api/case-studies",
+        "blog_post": "/api/blog-posts",
+        "service": "/api/services",
+    }
+    ids = {}
+    for key, path in paths.items():
+        response = await client.get(path)
+        response.raise_for_status()
+        ids[key] = response.json()[0]
+    response = await client.get("/api/available-times")
+    response.raise_for_status()
+    ids["times"] = response.json()["times"]
+    return ids
+
+
+async def run_all(client, args, pid: int) -> Dict[str, dict]:
+    scenarios = build_scenarios(await discover(client))
+    missing = uncovered_routes(scenarios)
+    if missing:
+        print(f"warning: no scenario for {', '.join(missing)}", file=sys.stderr)
+    if args.scenarios:
+        scenarios = [s for s in scenarios if any(fnmatch.fnmatch(s.name, pattern) for pattern in args.scenarios)]
+    if args.mode == "asgi" and any(s.stream for s in scenarios):
+        print(f"skipping {', '.join(s.name for s in scenarios if s.stream)}: streams need --mode uvicorn", file=sys.stderr)
+        scenarios = [s for s in scenarios if not s.stream]
+
+    results = {}
+    for scenario in scenarios:
+        results[scenario.name] = await run_scenario(client, scenario, args.requests, args.concurrency, args.warmup, pid)
+        print(_summary_line(scenario.name, results[scenario.name]), file=sys.stderr)
+    return results
+
+
+async def run_asgi(args) -> Dict[str, dict]:
+    from server import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+            return await run_all(client, args, os.getpid())
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_uvicorn(args) -> Dict[str, dict]:
+    port = _free_port()
+    command = [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=os.environ.copy())
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+                try:
+                    if (await client.get("/api/")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    if time.monotonic() > deadline:
+                        raise
+                await asyncio.sleep(0.1)
+            return await run_all(client, args, server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def compare(report: dict, baseline: dict, metric: str, threshold: float, min_delta_ms: float) -> List[str]:
+    """Describe every scenario whose ``metric`` regressed past the threshold."""
+    regressions = []
+    for name, current in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None or previous.get(metric) is None or current.get(metric) is None:
+            continue
+        before, after = previous[metric], current[metric]
+        if after > before * (1 + threshold) and after - before >= min_delta_ms:
+            regressions.append(f"{name} ({current['route']}): {metric} {before:.3f} -> {after:.3f} ms (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def _summary_line(name: str, result: dict) -> str:
+    line = (
+        f"{name:<26} {result['throughput_rps']:>9.1f} rps  p50 {result['p50_ms']:>8.2f}  p95 {result['p95_ms']:>8.2f}"
+        f"  p99 {result['p99_ms']:>8.2f} ms  errors {result['errors']}"
+    )
+    if "cache_hits" in result:
+        misses = f"{result['miss_p50_ms']:.2f}" if result["miss_p50_ms"] is not None else "-"
+        line += f"  cache {result['cache_hits']} hit / {result['cache_misses']} miss, miss p50 {misses} ms"
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--scenarios", nargs="+", metavar="GLOB", help="only run matching scenarios")
+    parser.add_argument("--output", type=Path, help="also write the JSON report here")
+    parser.add_argument("--save-baseline", type=Path, metavar="PATH")
+    parser.add_argument("--baseline", type=Path, metavar="PATH", help="fail on regressions against this report")
+    parser.add_argument("--metric", choices=[prefix + name for prefix in ("", "miss_") for name, _ in PERCENTILES], default="p95_ms",
+                        help="miss_* compares response-cache misses only")
+    parser.add_argument("--threshold", type=float, default=0.20, help="allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    parser.add_argument("--no-cache", action="store_true", help="run with RESPONSE_CACHE_BACKEND=off")
+    args = parser.parse_args()
+    if args.no_cache:
+        os.environ["RESPONSE_CACHE_BACKEND"] = "off"
+
+    write_sample_pdfs()
+    runner = run_uvicorn if args.mode == "uvicorn" else run_asgi
+    report = {
+        "mode": args.mode,
+        "mongo": "mongomock" if os.environ["MONGO_URL"].startswith("mongomock://") else "mongod",
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "response_cache": not args.no_cache,
+        "python": platform.python_version(),
+        "scenarios": asyncio.run(runner(args)),
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        args.output.write_text(text + "\n")
+    if args.save_baseline:
+        args.save_baseline.write_text(text + "\n")
+
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.metric, args.threshold, args.min_delta_ms)
+        for line in regressions:
+            print(f"regression: {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
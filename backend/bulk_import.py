@@ -0,0 +1,227 @@
+"""Streamed bulk import of submissions from NDJSON or CSV uploads.
+
+The request body is consumed chunk by chunk: complete records are parsed as
+they arrive, validated ``chunk_size`` rows at a time and written with one
+unordered ``insert_many`` per chunk, so memory stays bounded by the chunk
+size and ``max_record_size`` however large the upload is. A bad row (parse
+error, validation error, duplicate key) is reported by its 1-based row
+number and never aborts the rest of the import; only the first
+``max_errors`` errors found are listed, in row order.
+
+CSV input uses the export format: a header row naming the fields, list
+fields joined with ``;``, and empty cells treated as missing.
+"""
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Awaitable, Callable, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+from pymongo.errors import BulkWriteError
+
+# A parsed record, or the error message for a row that could not be parsed.
+Record = Tuple[int, Optional[dict], Optional[str]]
+
+
+class BulkImportError(Exception):
+    """Raised for uploads that cannot be imported at all (e.g. a missing CSV header)."""
+
+
+async def _split_records(stream: AsyncIterator[bytes], max_record_size: int, quoted: bool = False):
+    """Yield the text of each newline-terminated record in ``stream``.
+
+    With ``quoted`` a record runs on until its double quotes balance, as a
+    CSV field may contain newlines. A record longer than ``max_record_size``
+    characters is dropped as it streams in and yielded as ``None``.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    parts: Optional[List[str]] = []
+    size = quotes = 0
+
+    def add(text):
+        nonlocal parts, size, quotes
+        size += len(text)
+        quotes += text.count('"')
+        if parts is not None:
+            parts.append(text)
+            if size > max_record_size:
+                parts = None
+
+    def finish():
+        nonlocal parts, size, quotes
+        text = None if parts is None else "".join(parts)
+        parts, size, quotes = [], 0, 0
+        return text
+
+    async for chunk in stream:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            add(line + "\n")
+            if not quoted or quotes % 2 == 0:
+                yield finish()
+        if len(pending) > max_record_size:
+            add(pending)
+            pending = ""
+    add(pending + decoder.decode(b"", final=True))
+    if size:
+        yield finish()
+
+
+async def ndjson_records(stream: AsyncIterator[bytes], max_record_size: int) -> AsyncIterator[Record]:
+    row = 0
+    async for text in _split_records(stream, max_record_size):
+        if text is not None and not text.strip():
+            continue
+        row += 1
+        if text is None:
+            yield row, None, f"Row exceeds {max_record_size} characters"
+            continue
+        try:
+            value = json.loads(text)
+        except ValueError as exc:
+            yield row, None, f"Invalid JSON: {exc}"
+            continue
+        if isinstance(value, dict):
+            yield row, value, None
+        else:
+            yield row, None, "Row is not a JSON object"
+
+
+async def csv_records(stream: AsyncIterator[bytes], max_record_size: int, list_fields: Iterable[str] = ()) -> AsyncIterator[Record]:
+    list_fields = set(list_fields)
+    header = None
+    row = 0
+    async for text in _split_records(stream, max_record_size, quoted=True):
+        if text is not None and not text.strip():
+            continue
+        if text is None:
+            if header is None:
+                raise BulkImportError(f"CSV header exceeds {max_record_size} characters")
+            row += 1
+            yield row, None, f"Row exceeds {max_record_size} characters"
+            continue
+        cells = next(csv.reader([text.rstrip("\r\n")]))
+        if header is None:
+            header = [name.strip() for name in cells]
+            continue
+        row += 1
+        if len(cells) > len(header):
+            yield row, None, f"Row has {len(cells)} fields, header has {len(header)}"
+            continue
+        record = {}
+        for name, cell in zip(header, cells):
+            if cell == "":
+                continue
+            record[name] = [item.strip() for item in cell.split(";") if item.strip()] if name in list_fields else cell
+        yield row, record, None
+    if header is None:
+        raise BulkImportError("CSV upload has no header row")
+
+
+class BulkImporter:
+    """Validates records with ``model`` and inserts ``build_doc(validated)`` in chunks.
+
+    ``build_doc`` turns a validated model into the stored document and may
+    raise ``ValueError`` to reject the row; ``duplicate_message`` is what a
+    duplicate-key write error is reported as. ``claim``, if given, is awaited
+    with each valid row and its document and returns false to reject the row
+    as a repeat of a recent submission; ``release`` is then awaited with each
+    claimed row whose insert failed.
+    """
+
+    def __init__(
+        self,
+        collection,
+        model: type,
+        build_doc: Callable[[BaseModel], dict],
+        chunk_size: int = 1000,
+        max_errors: int = 1000,
+        duplicate_message: str = "Duplicate record",
+        claim: Optional[Callable[[BaseModel, dict], Awaitable[bool]]] = None,
+        release: Optional[Callable[[BaseModel], Awaitable[None]]] = None,
+    ):
+        self.collection = collection
+        self.model = model
+        self.build_doc = build_doc
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.duplicate_message = duplicate_message
+        self.claim = claim
+        self.release = release
+        self.received = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def _error(self, row: int, message: str):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "error": message})
+
+    async def _write(self, rows: List[int], inputs: List[BaseModel], docs: List[dict], on_chunk) -> None:
+        if not docs:
+            return
+        failed = set()
+        try:
+            await self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as exc:
+            for error in exc.details.get("writeErrors", []):
+                index = error["index"]
+                failed.add(index)
+                message = self.duplicate_message if error.get("code") == 11000 else error.get("errmsg", "Write failed")
+                self._error(rows[index], message)
+        if self.release is not None:
+            for index in failed:
+                await self.release(inputs[index])
+        inputs.clear()  # written or released; nothing left for run() to release
+        self.inserted += len(docs) - len(failed)
+        if on_chunk is not None and len(failed) < len(docs):
+            await on_chunk([doc for index, doc in enumerate(docs) if index not in failed])
+
+    async def run(self, records: AsyncIterator[Record], on_chunk: Optional[Callable[[List[dict]], object]] = None) -> dict:
+        """Import every record; ``on_chunk`` is awaited with the documents each chunk inserted."""
+        rows: List[int] = []
+        inputs: List[BaseModel] = []
+        docs: List[dict] = []
+        try:
+            async for row, record, parse_error in records:
+                self.received += 1
+                if parse_error is not None:
+                    self._error(row, parse_error)
+                    continue
+                try:
+                    input = self.model.model_validate(record)
+                    doc = self.build_doc(input)
+                except ValidationError as exc:
+                    self._error(row, "; ".join(
+                        f"{'.'.join(map(str, e['loc'])) or 'row'}: {e['msg']}" for e in exc.errors(include_url=False)
+                    ))
+                    continue
+                except ValueError as exc:
+                    self._error(row, str(exc))
+                    continue
+                if self.claim is not None and not await self.claim(input, doc):
+                    self._error(row, "Duplicate of a recent submission")
+                    continue
+                rows.append(row)
+                inputs.append(input)
+                docs.append(doc)
+                if len(docs) >= self.chunk_size:
+                    await self._write(rows, inputs, docs, on_chunk)
+                    rows, inputs, docs = [], [], []
+            await self._write(rows, inputs, docs, on_chunk)
+        except BaseException:
+            # Claimed rows that were never written (an aborted upload, a lost connection)
+            if self.release is not None:
+                for input in inputs:
+                    await self.release(input)
+            raise
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+            "errors_truncated": self.failed > len(self.errors),
+        }
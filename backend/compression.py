@@ -0,0 +1,181 @@
+"""Negotiated gzip/brotli response compression.
+
+``CompressionMiddleware`` compresses compressible responses of at least
+``minimum_size`` bytes (streamed responses are compressed chunk by chunk and
+flushed as they go) with whichever coding the client prefers, brotli first on
+ties. It leaves alone anything that already has a ``Content-Encoding``, so
+handlers that serve precompressed bodies (``precompress`` at startup, see
+``content.PrecomputedPayload``) pay no compression CPU per request. A strong
+``ETag`` on a response compressed on the fly is weakened, since the bytes
+differ from the identity representation it names.
+
+Brotli needs the optional ``brotli`` package; without it only gzip is
+offered.
+"""
+import gzip
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_MIN_SIZE = 1024
+COMPRESSIBLE_TYPES = (
+    b"application/json",
+    b"application/x-ndjson",
+    b"application/javascript",
+    b"application/xml",
+    b"image/svg+xml",
+    b"text/",
+)
+CODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: str, available: Iterable[str] = CODINGS) -> Optional[str]:
+    """Pick the coding from ``available`` with the highest q-value; ties go to the earlier one."""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    best, best_q = None, 0.0
+    for coding in available:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, coding: str, level: Optional[int] = None) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=11 if level is None else level)
+    return gzip.compress(body, compresslevel=9 if level is None else level, mtime=0)
+
+
+def precompress(body: bytes) -> Dict[str, bytes]:
+    """Every available coding of ``body`` at maximum effort, keeping those that shrink it."""
+    encoded = {}
+    for coding in CODINGS:
+        compressed = compress(body, coding)
+        if len(compressed) < len(body):
+            encoded[coding] = compressed
+    return encoded
+
+
+class _Compressor:
+    def __init__(self, coding: str, gzip_level: int, brotli_quality: int):
+        if coding == "br":
+            self._impl = brotli.Compressor(quality=brotli_quality)
+            self._flush = self._impl.flush
+            self._finish = self._impl.finish
+            self.compress = self._impl.process
+        else:
+            self._impl = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+            self._flush = lambda: self._impl.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._impl.flush
+            self.compress = self._impl.compress
+
+    def chunk(self, data: bytes, last: bool) -> bytes:
+        return self.compress(data) + (self._finish() if last else self._flush())
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = DEFAULT_MIN_SIZE,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = b""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value
+                break
+        coding = negotiate(accept_encoding.decode("latin-1")) if accept_encoding else None
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def compressing_send(message: Message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                content_type = (_header(headers, b"content-type") or b"").lower()
+                passthrough = (
+                    _header(headers, b"content-encoding") is not None
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or b"no-transform" in (_header(headers, b"cache-control") or b"")
+                    or message["status"] < 200
+                    or message["status"] in (204, 206, 304)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(coding, self.gzip_level, self.brotli_quality)
+                headers = [(k, v) for k, v in start["headers"] if k.lower() not in (b"content-length", b"etag")]
+                etag = _header(start["headers"], b"etag")
+                if etag is not None:
+                    headers.append((b"etag", etag if etag.startswith(b"W/") else b"W/" + etag))
+                headers.append((b"content-encoding", coding.encode()))
+                vary = _header(headers, b"vary")
+                if vary is None:
+                    headers.append((b"vary", b"Accept-Encoding"))
+                elif b"accept-encoding" not in vary.lower():
+                    headers = [(k, v + b", Accept-Encoding" if k.lower() == b"vary" else v) for k, v in headers]
+                data = compressor.chunk(body, last=not more_body)
+                if not more_body:
+                    headers.append((b"content-length", str(len(data)).encode()))
+                await send({**start, "headers": headers})
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+                return
+            await send({"type": "http.response.body", "body": compressor.chunk(body, last=not more_body), "more_body": more_body})
+
+        await self.app(scope, receive, compressing_send)
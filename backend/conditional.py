@@ -0,0 +1,110 @@
+"""Conditional GET for reads derived from versioned data.
+
+``ConditionalGetMiddleware`` gives ``GET``/``HEAD`` responses on the paths of
+its rules a strong ``ETag`` computed from the request (path, query string,
+``Accept-Encoding``) and the current versions of the rule's tags, the
+``SharedCounters`` that writes already bump through
+``ResponseCache.invalidate``. Until a write moves one of those versions the
+same request gets the same ETag, so a matching ``If-None-Match`` is answered
+``304`` right here: the route handler never runs and MongoDB is not queried.
+The versions are read before the request is handled, so a response that
+raced a write carries the older ETag and is refetched next time instead of
+being revalidated.
+
+Counters start from zero in every process group, so the ETag also carries an
+``epoch`` and validators from before a restart never match. Pick it where the
+counters are created, before workers fork, and pass it in: Starlette builds
+the middleware in each worker on its first request, so a default picked here
+would differ between workers sharing the counters. As with the response
+cache, a write is seen by the workers sharing the counters (see
+``shared_state.py``) and not by other hosts.
+
+Tags in ``local`` take their version from a callable instead of the shared
+counters, for data each worker installs on its own schedule (the content
+snapshot): the counter moves as soon as one worker has the new data, and a
+worker still serving the old data would then answer under the new ETag.
+
+Responses that already have an ``ETag`` (the precomputed content payloads
+hash their bodies) keep it. Validated responses get ``Cache-Control:
+no-cache`` unless they set their own, so browsers and CDNs store them and
+revalidate on every use, and ``Vary: Accept-Encoding`` since the ETag names
+one encoding.
+"""
+import hashlib
+import re
+import secrets
+from typing import Callable, Iterable, List, Mapping, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from shared_state import SharedCounters
+
+
+def _etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    tags = [tag.strip().removeprefix(b"W/") for tag in if_none_match.split(b",")]
+    return b"*" in tags or etag.removeprefix(b"W/") in tags
+
+
+class ConditionalGetMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        versions: SharedCounters,
+        rules: Mapping[str, Iterable[str]],
+        epoch: Optional[str] = None,
+        local: Optional[Mapping[str, Callable[[], object]]] = None,
+    ):
+        self.app = app
+        self.versions = versions
+        self.rules: List[Tuple[re.Pattern, Tuple[str, ...]]] = [(re.compile(pattern), tuple(tags)) for pattern, tags in rules.items()]
+        self.epoch = epoch or secrets.token_hex(4)
+        self.local = dict(local or {})
+
+    def tags_for(self, path: str) -> Optional[Tuple[str, ...]]:
+        for pattern, tags in self.rules:
+            if pattern.match(path):
+                return tags
+        return None
+
+    def etag(self, scope: Scope, tags: Tuple[str, ...]) -> bytes:
+        accept_encoding = b""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value
+                break
+        versions = ".".join(str(self.local[tag]() if tag in self.local else self.versions.get(tag)) for tag in tags)
+        request = b"%s?%s %s" % (scope["path"].encode(), scope.get("query_string", b""), accept_encoding)
+        digest = hashlib.blake2b(request, digest_size=12).hexdigest()
+        return f'"{self.epoch}-{versions}-{digest}"'.encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        tags = self.tags_for(scope["path"])
+        if tags is None:
+            await self.app(scope, receive, send)
+            return
+
+        etag = self.etag(scope, tags)
+        if_none_match = dict(scope["headers"]).get(b"if-none-match")
+        if if_none_match is not None and _etag_matches(if_none_match, etag):
+            headers = [(b"etag", etag), (b"cache-control", b"no-cache"), (b"vary", b"Accept-Encoding")]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def validated(message: Message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = list(message.get("headers", []))
+                names = {name.lower() for name, _ in headers}
+                if b"etag" not in names:
+                    headers.append((b"etag", etag))
+                    if b"cache-control" not in names:
+                        headers.append((b"cache-control", b"no-cache"))
+                    if b"vary" not in names:
+                        headers.append((b"vary", b"Accept-Encoding"))
+                    message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, validated)
@@ -0,0 +1,112 @@
+"""In-memory registry for the static site content.
+
+Each ``ContentCollection`` is built once from its seed list and keeps
+id -> record and facet value -> records dicts, plus the JSON bytes for the
+whole list, every record and every facet value (and their gzip/brotli
+encodings), so handlers never filter, serialize or compress per request.
+The registry also builds the search index over every collection. Collections
+are immutable after construction; changing content means building a new
+registry and swapping it in; passing the one it replaces as ``previous``
+reuses the compressed bodies of every payload whose bytes did not change,
+so a swap only compresses what was edited.
+"""
+import hashlib
+import json
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, Mapping, Optional, Sequence
+
+from compression import DEFAULT_MIN_SIZE, precompress
+from search import ContentIndex
+
+# Searchable fields per collection and their weights, keyed by the route
+# segment that serves the collection (the ``type`` of a search hit).
+SEARCH_FIELDS = {
+    "case-studies": {"title": 5, "company": 3, "industry": 3, "challenge": 1, "solution": 1, "results": 1},
+    "blog-posts": {"title": 5, "category": 3, "excerpt": 1, "author": 1},
+    "services": {"name": 5, "description": 1},
+    "testimonials": {"company": 3, "name": 3, "role": 1, "content": 1},
+}
+
+
+class PrecomputedPayload:
+    """JSON body serialized once, together with a strong ETag over its bytes.
+
+    Bodies of at least ``DEFAULT_MIN_SIZE`` bytes are also compressed once;
+    ``encoded`` maps each coding to its body and its own strong ETag; when
+    ``known`` (ETag -> payload) already has these bytes, its encodings are
+    reused instead.
+    """
+
+    def __init__(self, data, known: Optional[Mapping[str, "PrecomputedPayload"]] = None):
+        self.body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.encoded = {}
+        same = known.get(self.etag) if known else None
+        if same is not None:
+            self.encoded = same.encoded
+        elif len(self.body) >= DEFAULT_MIN_SIZE:
+            self.encoded = {coding: (body, f'"{digest}-{coding}"') for coding, body in precompress(self.body).items()}
+
+
+EMPTY_LIST = PrecomputedPayload([])
+
+
+def facet_key(value: str) -> str:
+    return value.strip().casefold()
+
+
+class ContentCollection:
+    def __init__(self, records: Sequence[dict], facets: Iterable[str] = (), known=None):
+        self.records = tuple(MappingProxyType(dict(record)) for record in records)
+        self.by_id = MappingProxyType({record["id"]: record for record in self.records})
+        self.all = PrecomputedPayload([dict(record) for record in self.records], known)
+        self.record_payloads = MappingProxyType({
+            record["id"]: PrecomputedPayload(dict(record), known) for record in self.records
+        })
+
+        grouped: Dict[str, Dict[str, list]] = {field: {} for field in facets}
+        for record in self.records:
+            for field, groups in grouped.items():
+                if record.get(field) is not None:
+                    groups.setdefault(facet_key(record[field]), []).append(dict(record))
+        self.facet_payloads = MappingProxyType({
+            field: MappingProxyType({value: PrecomputedPayload(items, known) for value, items in groups.items()})
+            for field, groups in grouped.items()
+        })
+
+    def get(self, record_id: str) -> Optional[PrecomputedPayload]:
+        return self.record_payloads.get(record_id)
+
+    def filtered(self, field: str, value: str) -> PrecomputedPayload:
+        return self.facet_payloads[field].get(facet_key(value), EMPTY_LIST)
+
+    def payloads(self) -> Iterator[PrecomputedPayload]:
+        yield self.all
+        yield from self.record_payloads.values()
+        for groups in self.facet_payloads.values():
+            yield from groups.values()
+
+
+class ContentRegistry:
+    """The full set of static content collections served by the API."""
+
+    def __init__(self, testimonials, case_studies, blog_posts, services, previous: Optional["ContentRegistry"] = None):
+        known = {payload.etag: payload for payload in previous.payloads()} if previous is not None else {}
+        self.testimonials = ContentCollection(testimonials, known=known)
+        self.case_studies = ContentCollection(case_studies, facets=("industry",), known=known)
+        self.blog_posts = ContentCollection(blog_posts, facets=("category",), known=known)
+        self.services = ContentCollection(services, known=known)
+        # Names this snapshot: equal exactly when every collection's bytes are.
+        collections = (self.testimonials, self.case_studies, self.blog_posts, self.services)
+        self.digest = hashlib.blake2b("".join(collection.all.etag for collection in collections).encode(), digest_size=8).hexdigest()
+        self.search = ContentIndex({
+            "case-studies": (self.case_studies.records, SEARCH_FIELDS["case-studies"]),
+            "blog-posts": (self.blog_posts.records, SEARCH_FIELDS["blog-posts"]),
+            "services": (self.services.records, SEARCH_FIELDS["services"]),
+            "testimonials": (self.testimonials.records, SEARCH_FIELDS["testimonials"]),
+        })
+
+    def payloads(self) -> Iterator[PrecomputedPayload]:
+        for collection in (self.testimonials, self.case_studies, self.blog_posts, self.services):
+            yield from collection.payloads()
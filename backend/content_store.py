@@ -0,0 +1,229 @@
+"""Site content kept in MongoDB and served from an in-memory snapshot.
+
+Testimonials, case studies, blog posts and services are documents in
+``content_records``, each tagged with its ``kind``, its ``position`` in the
+list and the content ``version`` it belongs to. ``content_meta`` holds the
+live version. ``publish`` validates a complete set of lists, writes them as
+a new version, moves the live stamp forward and then drops older versions,
+so a reader that loads "the records of the live version" always gets one
+consistent set, never a half-written one.
+
+``ContentWatcher`` loads the live version, validates every record with its
+pydantic model and awaits ``install`` with the lists (the server builds a
+``ContentRegistry`` and swaps it in with one assignment), so requests never
+read MongoDB. It follows a change stream on ``content_meta`` where the
+deployment has one (replica sets) and otherwise polls the version stamp
+every ``interval`` seconds. A version that fails validation is logged and
+skipped; the previous snapshot keeps serving.
+
+``seed_content.json`` is the initial content, published on first boot. To
+change copy without a redeploy, export, edit and publish::
+
+    python content_store.py export > content.json
+    python content_store.py publish content.json
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+
+from pydantic import ValidationError
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+SEED_PATH = Path(__file__).parent / "seed_content.json"
+META_ID = "content"
+
+
+class ContentValidationError(ValueError):
+    """Raised when content records do not match their models."""
+
+
+def load_seed(path: Path = SEED_PATH) -> Dict[str, List[dict]]:
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def validate(models: Mapping[str, type], lists: Mapping[str, List[dict]]) -> Dict[str, List[dict]]:
+    """Every list checked against its model, as plain JSON-ready dicts of the fields given.
+
+    Unknown fields are dropped (the models ignore extras); records without an
+    ``id`` or with a repeated one are errors, since lookups are by id.
+    """
+    errors = []
+    validated = {}
+    for kind, model in models.items():
+        records, seen = [], set()
+        for position, record in enumerate(lists.get(kind, [])):
+            where = f"{kind}[{position}]"
+            if not isinstance(record, dict) or not record.get("id"):
+                errors.append(f"{where}: missing id")
+                continue
+            if record["id"] in seen:
+                errors.append(f"{where}: duplicate id {record['id']!r}")
+                continue
+            seen.add(record["id"])
+            try:
+                records.append(model.model_validate(record).model_dump(mode="json", exclude_unset=True))
+            except ValidationError as exc:
+                errors.extend(f"{where} ({record['id']}): {'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors())
+        validated[kind] = records
+    if errors:
+        raise ContentValidationError("; ".join(errors))
+    return validated
+
+
+class ContentStore:
+    def __init__(self, db, models: Mapping[str, type]):
+        self.models = models
+        self.records = db.content_records
+        self.meta = db.content_meta
+
+    async def version(self) -> int:
+        doc = await self.meta.find_one({"_id": META_ID}, {"version": 1})
+        return doc["version"] if doc else 0
+
+    async def load(self) -> Tuple[int, Dict[str, List[dict]]]:
+        """The live version and its validated lists."""
+        while True:
+            version = await self.version()
+            docs = await self.records.find({"version": version}, {"_id": 0}).sort([("kind", 1), ("position", 1)]).to_list(None)
+            # A publish finishing in between drops this version's records;
+            # the stamp has moved on by then, so read again.
+            if await self.version() == version:
+                break
+        if version and not docs:
+            raise ContentValidationError(f"content version {version} has no records")
+        lists: Dict[str, List[dict]] = {kind: [] for kind in self.models}
+        for doc in docs:
+            kind = doc.pop("kind")
+            doc.pop("version")
+            doc.pop("position")
+            lists.setdefault(kind, []).append(doc)
+        # Off the event loop, like the snapshot the server builds from it
+        return version, await asyncio.to_thread(validate, self.models, lists)
+
+    async def publish(self, lists: Mapping[str, List[dict]]) -> int:
+        """Validate and store ``lists`` (every kind) as the new live version; returns it."""
+        validated = await asyncio.to_thread(validate, self.models, lists)
+        reserved = await self.meta.find_one_and_update(
+            {"_id": META_ID},
+            {"$inc": {"reserved": 1}, "$setOnInsert": {"version": 0}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        version = reserved["reserved"]
+        docs = [
+            {**record, "kind": kind, "position": position, "version": version}
+            for kind, records in validated.items()
+            for position, record in enumerate(records)
+        ]
+        if docs:
+            await self.records.insert_many(docs)
+        # Only ever forward: a slower concurrent publish must not roll back a newer one.
+        await self.meta.update_one(
+            {"_id": META_ID, "version": {"$lt": version}},
+            {"$set": {"version": version, "updated_at": datetime.now(timezone.utc)}},
+        )
+        await self.records.delete_many({"version": {"$lt": await self.version()}})
+        return version
+
+    async def ensure_seeded(self, lists: Mapping[str, List[dict]]) -> bool:
+        """Publish ``lists`` when no content has been published yet."""
+        if await self.version():
+            return False
+        await self.publish(lists)
+        return True
+
+
+class ContentWatcher:
+    """Keeps the installed snapshot at the live content version."""
+
+    def __init__(self, store: ContentStore, install: Callable[[Dict[str, List[dict]]], Awaitable[None]], interval: float = 5.0):
+        self.store = store
+        self.install = install
+        self.interval = interval
+        self.version: Optional[int] = None
+        self.mode = "polling"
+        self.reloads = 0
+        self.last_reload_seconds = 0.0
+        self._rejected: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh(self) -> bool:
+        """Install the live version if it is new and valid; returns whether it did."""
+        version = await self.store.version()
+        if version == self.version or version == self._rejected:
+            return False
+        started = asyncio.get_running_loop().time()
+        try:
+            version, lists = await self.store.load()
+        except ContentValidationError as exc:
+            self._rejected = version
+            logger.error("Content version %d rejected, still serving version %s: %s", version, self.version, exc)
+            return False
+        await self.install(lists)
+        self.version = version
+        self.reloads += 1
+        self.last_reload_seconds = asyncio.get_running_loop().time() - started
+        logger.info("Content version %d installed in %.1f ms", version, self.last_reload_seconds * 1000)
+        return True
+
+    async def _refresh_logged(self):
+        try:
+            await self.refresh()
+        except Exception:
+            logger.exception("Content reload failed, still serving version %s", self.version)
+
+    async def _run(self):
+        try:
+            async with self.store.meta.watch([{"$match": {"documentKey._id": META_ID}}]) as stream:
+                self.mode = "change_stream"
+                await self._refresh_logged()  # anything published before the stream opened
+                async for _ in stream:
+                    await self._refresh_logged()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            # Standalone servers (and the in-memory stand-in) have no change streams.
+            logger.info("Content change stream unavailable (%s); polling every %.1fs", exc, self.interval)
+        self.mode = "polling"
+        while True:
+            await asyncio.sleep(self.interval)
+            await self._refresh_logged()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="content-watcher")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+async def _cli(command: str, path: Optional[str]):
+    from server import CONTENT_MODELS, create_client
+
+    client = create_client(os.environ["MONGO_URL"])
+    store = ContentStore(client[os.environ["DB_NAME"]], CONTENT_MODELS)
+    try:
+        if command == "export":
+            version, lists = await store.load()
+            json.dump(lists, sys.stdout, indent=2, ensure_ascii=False)
+            print()
+        else:
+            print(f"published content version {await store.publish(load_seed(Path(path)))}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("export", "publish") or (sys.argv[1] == "publish") != (len(sys.argv) == 3):
+        sys.exit("usage: python content_store.py export | publish <content.json>")
+    asyncio.run(_cli(sys.argv[1], sys.argv[2] if len(sys.argv) == 3 else None))
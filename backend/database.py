@@ -0,0 +1,148 @@
+"""Motor client factory, connection pool settings and pool metrics.
+
+Nothing here connects at import time: ``create_client`` is called from the
+app's lifespan handler, which then ``warm_pool``s the client so the first
+requests do not pay for TCP/TLS handshakes.
+"""
+import asyncio
+import bisect
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+from metrics import command_metrics
+
+logger = logging.getLogger(__name__)
+
+# Environment variable -> MongoClient keyword, for the pool tunables.
+POOL_OPTIONS = {
+    "MONGO_MAX_POOL_SIZE": ("maxPoolSize", int),
+    "MONGO_MIN_POOL_SIZE": ("minPoolSize", int),
+    "MONGO_MAX_IDLE_TIME_MS": ("maxIdleTimeMS", int),
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": ("waitQueueTimeoutMS", int),
+    "MONGO_COMPRESSORS": ("compressors", str),
+}
+
+
+def pool_options_from_env(environ=os.environ) -> Dict[str, object]:
+    """Read the ``MONGO_*`` pool settings that are set; unset ones keep driver defaults."""
+    options = {}
+    for env_name, (option, cast) in POOL_OPTIONS.items():
+        value = environ.get(env_name)
+        if value:
+            options[option] = cast(value)
+    return options
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Tracks connections in use and how long checkouts wait for a connection.
+
+    PyMongo runs each checkout on a single executor thread, so the start time
+    is kept in a thread-local between the ``started`` and ``checked_out``
+    events.
+    """
+
+    WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.in_use = 0
+        self.open = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.wait_bucket_counts = [0] * (len(self.WAIT_BUCKETS) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "in_use": self.in_use,
+                "open": self.open,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "wait_seconds_total": self.wait_seconds_total,
+                "wait_seconds_max": self.wait_seconds_max,
+                "wait_buckets": dict(zip([*map(str, self.WAIT_BUCKETS), "+Inf"], self.wait_bucket_counts)),
+            }
+
+    def _finish_wait(self) -> float:
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        waited = self._finish_wait()
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            self.wait_bucket_counts[bisect.bisect_left(self.WAIT_BUCKETS, waited)] += 1
+
+    def connection_check_out_failed(self, event):
+        self._finish_wait()
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
+pool_metrics = PoolMetrics()
+
+# MONGO_URL scheme that swaps the driver for an in-process mongomock-motor
+# database; used by the load-test harness, which needs no running mongod.
+STAND_IN_SCHEME = "mongomock://"
+
+
+def create_client(mongo_url: str, **overrides) -> AsyncIOMotorClient:
+    """Build the Motor client; ``mongomock://`` selects an in-memory stand-in for benchmarks."""
+    if mongo_url.startswith(STAND_IN_SCHEME):
+        from mongomock_motor import AsyncMongoMockClient
+        logger.info("Using in-memory mongomock-motor stand-in")
+        return AsyncMongoMockClient(tz_aware=True)
+    options = {"tz_aware": True, **pool_options_from_env(), **overrides}
+    logger.info("Creating MongoDB client with %s", {k: v for k, v in options.items() if k != "tz_aware"})
+    return AsyncIOMotorClient(mongo_url, event_listeners=[pool_metrics, command_metrics], **options)
+
+
+async def warm_pool(client: AsyncIOMotorClient, connections: Optional[int] = None):
+    """Open ``connections`` pooled connections (default: ``minPoolSize`` or 1) before serving."""
+    connections = connections or client.options.pool_options.min_pool_size or 1
+    start = time.perf_counter()
+    await asyncio.gather(*(client.admin.command("ping") for _ in range(connections)))
+    logger.info("Warmed MongoDB pool with %d connection(s) in %.1f ms", connections, (time.perf_counter() - start) * 1000)
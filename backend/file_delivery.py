@@ -0,0 +1,163 @@
+"""Streaming file responses with Range, conditional GET and precompressed variants.
+
+``file_response`` picks the representation to send (a ``.br``/``.gz``
+sibling when the client accepts it, otherwise the file itself), answers
+``If-None-Match``/``If-Modified-Since`` with ``304`` and single-range
+``Range`` requests with ``206``. ``RangeFileResponse`` then streams the
+selected byte span in fixed-size chunks, handing the file to the server
+(``pathsend``/``zerocopysend`` ASGI extensions) when it can do the copy
+itself, so a file is never read into memory whole.
+"""
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional, Tuple
+
+import anyio
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+CHUNK_SIZE = 64 * 1024
+
+# Checked in order of preference against Accept-Encoding.
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeFileResponse(Response):
+    def __init__(self, path: Path, start: int, end: int, status_code: int, headers: dict, media_type: str):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        extensions = scope.get("extensions") or {}
+        length = self.end - self.start + 1
+        if scope["method"].upper() == "HEAD" or length <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.pathsend" in extensions and self.start == 0 and self.status_code == 200:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+        elif "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.fileno(),
+                    "offset": self.start,
+                    "count": length,
+                    "more_body": False,
+                })
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(self.start)
+                remaining = length
+                while remaining > 0:
+                    chunk = await file.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+                if remaining > 0:
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Return ``(start, end)`` for a single satisfiable byte range.
+
+    Raises ``ValueError`` for an unsatisfiable range; returns ``None`` for
+    headers this module does not serve partially (e.g. multiple ranges).
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError("empty suffix range")
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("range not satisfiable")
+    return start, end
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _if_range_matches(request: Request, etag: str, last_modified: str) -> bool:
+    if_range = request.headers.get("if-range")
+    return if_range is None or if_range.strip() in (etag, last_modified)
+
+
+def _accepts(request: Request, coding: str) -> bool:
+    for item in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() == coding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def file_response(request: Request, path: Path, media_type: str, filename: Optional[str] = None) -> Response:
+    """Build the response for ``path``; raises ``FileNotFoundError`` if it is missing."""
+    wants_range = "range" in request.headers
+    selected, encoding = path, None
+    if not wants_range:
+        for coding, suffix in PRECOMPRESSED:
+            candidate = path.with_name(path.name + suffix)
+            if _accepts(request, coding) and candidate.is_file():
+                selected, encoding = candidate, coding
+                break
+
+    stat_result = os.stat(selected)
+    size = stat_result.st_size
+    etag = f'"{stat_result.st_mtime_ns:x}-{size:x}{"-" + encoding if encoding else ""}"'
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept-Encoding",
+    }
+    if filename:
+        headers["Content-Disposition"] = f'inline; filename="{filename}"'
+
+    if _not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    start, end, status_code = 0, size - 1, 200
+    if wants_range and _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = _parse_range(request.headers["range"], size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    headers["Content-Length"] = str(end - start + 1)
+    return RangeFileResponse(selected, start, end, status_code, headers, media_type)
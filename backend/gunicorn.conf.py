@@ -0,0 +1,28 @@
+"""gunicorn settings for serving the API from several uvicorn workers.
+
+    cd backend && gunicorn -c gunicorn.conf.py server:app
+
+The master imports ``server`` once (``preload_app``), so the seed content,
+precomputed payloads and ``SharedCounters`` exist before the workers fork
+and are shared copy-on-write. Each worker then runs the app's lifespan and
+opens its own MongoDB client and pool; ``MONGO_MAX_POOL_SIZE`` is therefore
+per worker.
+"""
+import os
+
+
+def default_workers() -> int:
+    """One worker per CPU this process may run on (async workers do not need 2n+1)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = os.environ.get("BIND", f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+workers = int(os.environ.get("WEB_CONCURRENCY") or default_workers())
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+keepalive = 5
+graceful_timeout = 30
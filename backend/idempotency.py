@@ -0,0 +1,181 @@
+"""Idempotency keys for public submissions.
+
+A client that may retry a POST sends ``Idempotency-Key: <unique string>``
+and reuses it for every retry of that submission. ``IdempotencyStore.run``
+executes the first request with a key and stores its status and body in
+``idempotency_keys``; a repeat gets the stored response back without the
+handler, and so the insert, running again. Records expire ``ttl`` seconds
+after the first request through a TTL index.
+
+The first request claims its key by inserting the record under ``_id``, so
+the unique ``_id`` index settles a race between workers: exactly one insert
+wins and the others wait for the winner's response. Within a process,
+concurrent repeats wait on the request already running instead of querying
+MongoDB, and finished responses stay in a bounded LRU so retries are
+answered from memory. A claim is held until ``locked_until``; if its owner
+dies mid-request, the first repeat after that takes the key over.
+
+A key is bound to the request it was first used with: a repeat with a
+different request raises ``IdempotencyKeyReused`` rather than being handed
+another request's response. If the handler raises, the claim is dropped so
+the client's retry runs afresh.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+Outcome = Tuple[int, bytes]
+
+
+class IdempotencyKeyReused(Exception):
+    """Raised when a key comes back with a different request than it was first used for."""
+
+
+class IdempotencyInProgress(Exception):
+    """Raised when the request holding a key is still running after ``max_wait``."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class IdempotencyStore:
+    def __init__(
+        self,
+        collection,
+        ttl: float = 24 * 3600,
+        lock_timeout: float = 30.0,
+        max_wait: float = 10.0,
+        poll_interval: float = 0.05,
+        max_keys: int = 10_000,
+    ):
+        self.collection = collection
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self.max_keys = max_keys
+        # record id -> (monotonic expiry, request hash, status, body)
+        self._finished: "OrderedDict[str, Tuple[float, str, int, bytes]]" = OrderedDict()
+        self._running: Dict[str, asyncio.Future] = {}
+        self.executed = 0
+        self.replayed = 0
+
+    async def run(self, scope: str, key: str, request_hash: str, handler: Callable[[], Awaitable[Outcome]]) -> Tuple[int, bytes, bool]:
+        """``(status, body, replayed)`` for the request, running ``handler`` only for a new key."""
+        record_id = f"{scope}:{key}"
+        while True:
+            finished = self._remembered(record_id)
+            if finished is not None:
+                if finished[1] != request_hash:
+                    raise IdempotencyKeyReused(key)
+                self.replayed += 1
+                return finished[2], finished[3], True
+            running = self._running.get(record_id)
+            if running is None:
+                break
+            # Remembered once it succeeds; if it fails, the loop claims the key.
+            await asyncio.wait([running])
+
+        done = asyncio.get_running_loop().create_future()
+        self._running[record_id] = done
+        owner = uuid.uuid4().hex
+        try:
+            stored = await self._claim(record_id, request_hash, owner)
+            if stored is not None:
+                self._remember(record_id, request_hash, *stored)
+                self.replayed += 1
+                return stored[0], stored[1], True
+            try:
+                status, body = await handler()
+            except BaseException:
+                await self._release(record_id, owner)
+                raise
+            self.executed += 1
+            await self._complete(record_id, owner, status, body)
+            self._remember(record_id, request_hash, status, body)
+            return status, body, False
+        finally:
+            del self._running[record_id]
+            done.set_result(None)
+
+    async def _claim(self, record_id: str, request_hash: str, owner: str) -> Optional[Outcome]:
+        """``None`` once this request owns the key, or the response stored for it by another."""
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            now = _now()
+            try:
+                await self.collection.insert_one({
+                    "_id": record_id,
+                    "request_hash": request_hash,
+                    "status": "pending",
+                    "owner": owner,
+                    "locked_until": now + timedelta(seconds=self.lock_timeout),
+                    "expires_at": now + timedelta(seconds=self.ttl),
+                })
+                return None
+            except DuplicateKeyError:
+                pass
+            record = await self.collection.find_one({"_id": record_id})
+            if record is None:
+                continue  # released or expired since the insert
+            if record["request_hash"] != request_hash:
+                raise IdempotencyKeyReused(record_id.partition(":")[2])
+            if record["status"] == "done":
+                return record["response_status"], bytes(record["response_body"])
+            if record["locked_until"] <= now:
+                taken = await self.collection.find_one_and_update(
+                    {"_id": record_id, "status": "pending", "owner": record["owner"]},
+                    {"$set": {"owner": owner, "locked_until": now + timedelta(seconds=self.lock_timeout)}},
+                )
+                if taken is not None:
+                    logger.warning("Took over idempotency key %s from a request that did not finish", record_id)
+                    return None
+                continue
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgress(record_id.partition(":")[2])
+            await asyncio.sleep(self.poll_interval)
+
+    async def _complete(self, record_id: str, owner: str, status: int, body: bytes):
+        try:
+            result = await self.collection.update_one(
+                {"_id": record_id, "owner": owner},
+                {"$set": {"status": "done", "response_status": status, "response_body": body}},
+            )
+        except Exception:
+            # The write behind the response happened; an unrecorded key only
+            # means a later retry after the lock expires runs again.
+            logger.exception("Recording the response for idempotency key %s failed", record_id)
+            return
+        if not result.matched_count:
+            logger.warning("Idempotency key %s was taken over before its response was recorded", record_id)
+
+    async def _release(self, record_id: str, owner: str):
+        try:
+            await self.collection.delete_one({"_id": record_id, "owner": owner, "status": "pending"})
+        except Exception:
+            logger.exception("Releasing idempotency key %s failed; it frees up when its lock expires", record_id)
+
+    def _remembered(self, record_id: str) -> Optional[Tuple[float, str, int, bytes]]:
+        finished = self._finished.get(record_id)
+        if finished is None:
+            return None
+        if finished[0] <= time.monotonic():
+            del self._finished[record_id]
+            return None
+        self._finished.move_to_end(record_id)
+        return finished
+
+    def _remember(self, record_id: str, request_hash: str, status: int, body: bytes):
+        self._finished[record_id] = (time.monotonic() + self.ttl, request_hash, status, body)
+        self._finished.move_to_end(record_id)
+        while len(self._finished) > self.max_keys:
+            self._finished.popitem(last=False)
@@ -0,0 +1,147 @@
+"""MongoDB index bootstrap and query plan verification.
+
+Every query shape the API issues against MongoDB is
+registered in ``QUERY_SHAPES``; ``ensure_indexes`` creates the indexes those
+shapes need and ``verify_query_plans`` asks the server to ``explain()`` each
+one so a missing index shows up at startup instead of as a slow COLLSCAN.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+logger = logging.getLogger(__name__)
+
+# Submissions are paged newest-first on (created_at, id) so every page is a
+# bounded index range scan instead of a skip over everything before it.
+PAGE_SORT = [("created_at", DESCENDING), ("id", DESCENDING)]
+
+# Submission fields covered by the text index behind /api/search, with their
+# relative weights in the relevance score. MongoDB allows one text index per
+# collection, so this is the whole searchable surface.
+TEXT_SEARCH_WEIGHTS = {"name": 5, "email": 5, "reason": 2, "message": 1}
+TEXT_SEARCH_INDEX = IndexModel(
+    [(field, TEXT) for field in TEXT_SEARCH_WEIGHTS],
+    name="text_search",
+    weights=TEXT_SEARCH_WEIGHTS,
+    default_language="english",
+)
+
+INDEX_SPECS: Dict[str, List[IndexModel]] = {
+    "contacts": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(PAGE_SORT, name="created_at_id"),
+        IndexModel([("email", ASCENDING)], name="email"),
+        TEXT_SEARCH_INDEX,
+    ],
+    "appointments": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(PAGE_SORT, name="created_at_id"),
+        IndexModel([("email", ASCENDING)], name="email"),
+        TEXT_SEARCH_INDEX,
+        IndexModel([("date", ASCENDING), ("time", ASCENDING), ("status", ASCENDING)], name="date_time_status"),
+        # One held booking per slot; see availability.py.
+        IndexModel(
+            [("date", ASCENDING), ("time", ASCENDING)],
+            name="date_time_held_unique",
+            unique=True,
+            partialFilterExpression={"slot_held": True},
+        ),
+    ],
+    # Loads of the live content version (see content_store.py)
+    "content_records": [
+        IndexModel([("version", ASCENDING), ("kind", ASCENDING), ("position", ASCENDING)], name="version_kind_position"),
+    ],
+    # Due-job claims (see notifications.py); delivered jobs expire after a week.
+    "notification_outbox": [
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt"),
+        IndexModel([("delivered_at", ASCENDING)], name="delivered_ttl", expireAfterSeconds=7 * 24 * 3600),
+    ],
+    # Looked up by _id only (see idempotency.py); each record carries its own expiry.
+    "idempotency_keys": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_ttl", expireAfterSeconds=0),
+    ],
+}
+
+_SAMPLE_CREATED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# (collection, filter, sort) for every query the API runs.
+QUERY_SHAPES: List[Tuple[str, dict, list]] = [
+    ("contacts", {}, PAGE_SORT),
+    ("contacts", {"$or": [
+        {"created_at": {"$lt": _SAMPLE_CREATED_AT}},
+        {"created_at": _SAMPLE_CREATED_AT, "id": {"$lt": "id"}},
+    ]}, PAGE_SORT),
+    ("contacts", {"id": "id"}, None),
+    ("contacts", {"email": "user@example.com"}, None),
+    ("contacts", {"$text": {"$search": "automation"}}, None),
+    ("contacts", {"created_at": {"$gte": _SAMPLE_CREATED_AT}}, None),
+    ("contacts", {"created_at": {"$gte": _SAMPLE_CREATED_AT}}, [("created_at", ASCENDING), ("id", ASCENDING)]),
+    ("appointments", {}, PAGE_SORT),
+    ("appointments", {"$or": [
+        {"created_at": {"$lt": _SAMPLE_CREATED_AT}},
+        {"created_at": _SAMPLE_CREATED_AT, "id": {"$lt": "id"}},
+    ]}, PAGE_SORT),
+    ("appointments", {"id": "id"}, None),
+    ("appointments", {"email": "user@example.com"}, None),
+    ("appointments", {"$text": {"$search": "automation"}}, None),
+    ("appointments", {"created_at": {"$gte": _SAMPLE_CREATED_AT}}, None),
+    ("appointments", {"created_at": {"$gte": _SAMPLE_CREATED_AT}}, [("created_at", ASCENDING), ("id", ASCENDING)]),
+    ("appointments", {"date": "2024-01-01", "time": "09:00 AM", "status": "pending"}, None),
+    ("appointments", {"date": "2024-01-01", "status": {"$in": ["pending", "confirmed"]}}, None),
+    ("content_records", {"version": 1}, [("kind", ASCENDING), ("position", ASCENDING)]),
+    ("notification_outbox", {"status": "pending", "next_attempt_at": {"$lte": _SAMPLE_CREATED_AT}}, [("next_attempt_at", ASCENDING)]),
+]
+
+
+class QueryPlanError(RuntimeError):
+    """Raised when a registered query shape is planned as a collection scan."""
+
+
+async def ensure_indexes(db):
+    """Create every index in ``INDEX_SPECS``; a no-op when they already exist."""
+    for collection_name, indexes in INDEX_SPECS.items():
+        await db[collection_name].create_indexes(indexes)
+    logger.info("MongoDB indexes ensured for %s", ", ".join(INDEX_SPECS))
+
+
+def plan_stages(plan: dict) -> List[str]:
+    """Flatten an explain() plan tree into the list of its stage names."""
+    stages = []
+    pending = [plan]
+    while pending:
+        node = pending.pop()
+        if not isinstance(node, dict):
+            continue
+        if "stage" in node:
+            stages.append(node["stage"])
+        for key in ("inputStage", "queryPlan", "winningPlan"):
+            if key in node:
+                pending.append(node[key])
+        pending.extend(node.get("inputStages", []))
+    return stages
+
+
+async def verify_query_plans(db, mode: str = "warn") -> List[str]:
+    """Explain every registered query shape and report the ones that COLLSCAN.
+
+    ``mode`` is ``"off"``, ``"warn"`` (log) or ``"fail"`` (raise
+    ``QueryPlanError``). Returns a description of each offending shape.
+    """
+    if mode == "off":
+        return []
+    offenders = []
+    for collection_name, query, sort in QUERY_SHAPES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explanation = await cursor.explain()
+        winning_plan = explanation.get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in plan_stages(winning_plan):
+            offenders.append(f"{collection_name}: find({query}) sort({sort})")
+    for offender in offenders:
+        logger.warning("Query falls back to COLLSCAN: %s", offender)
+    if offenders and mode == "fail":
+        raise QueryPlanError(f"{len(offenders)} query shape(s) fall back to COLLSCAN")
+    return offenders
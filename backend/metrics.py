@@ -0,0 +1,245 @@
+"""Request, MongoDB and event-loop instrumentation in Prometheus text format.
+
+The metric types are deliberately tiny (a dict update and a bisect per
+observation) so that ``MetricsMiddleware`` stays within its per-request
+overhead budget; ``benchmarks/bench_instrumentation.py`` measures it.
+"""
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import monitoring
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def samples(self):
+        for labels, value in list(self.values.items()):
+            yield self.name + _format_labels(self.labels, labels), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels: str, value: float):
+        self.values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) - amount
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self.values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self):
+        for labels, (counts, total, count) in list(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*map(str, self.buckets), "+Inf"), counts):
+                cumulative += bucket_count
+                yield self.name + "_bucket" + _format_labels(self.labels, labels, f'le="{bound}"'), cumulative
+            yield self.name + "_sum" + _format_labels(self.labels, labels), total
+            yield self.name + "_count" + _format_labels(self.labels, labels), count
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """Register a callable returning ``(name, kind, help, value)`` tuples at scrape time."""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name} {value}" for name, value in list(metric.samples()))
+        for collector in self.collectors:
+            for name, kind, help, value in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "lumis_http_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status")))
+http_latency = registry.register(Histogram(
+    "lumis_http_request_duration_seconds", "HTTP request latency by route.", ("route", "method")))
+http_in_flight = registry.register(Gauge(
+    "lumis_http_requests_in_flight", "HTTP requests currently being served."))
+http_request_size = registry.register(Histogram(
+    "lumis_http_request_size_bytes", "Request body size by route.", ("route",), SIZE_BUCKETS))
+http_response_size = registry.register(Histogram(
+    "lumis_http_response_size_bytes", "Response body size by route.", ("route",), SIZE_BUCKETS))
+mongo_latency = registry.register(Histogram(
+    "lumis_mongo_command_duration_seconds", "MongoDB command latency by collection and command.",
+    ("collection", "command")))
+mongo_failures = registry.register(Counter(
+    "lumis_mongo_command_failures_total", "Failed MongoDB commands by collection and command.",
+    ("collection", "command")))
+loop_lag = registry.register(Histogram(
+    "lumis_event_loop_lag_seconds", "Delay between when the event loop was due to wake a timer and when it did."))
+
+
+class MetricsMiddleware:
+    """Records latency, status, in-flight count and payload sizes per route."""
+
+    def __init__(self, app: ASGIApp, exclude: Iterable[str] = ()):
+        self.app = app
+        self.exclude = frozenset(exclude)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+        request_bytes = 0
+        response_bytes = 0
+
+        async def counting_receive() -> Message:
+            nonlocal request_bytes
+            message = await receive()
+            request_bytes += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message: Message):
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        http_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_flight.dec()
+            # Cache hits never reach the router; the cache leaves the route
+            # template in "route_path". Unmatched paths share one label so
+            # scanners cannot explode cardinality.
+            route_label = getattr(scope.get("route"), "path", None) or scope.get("route_path") or "unmatched"
+            method = scope["method"]
+            http_requests.inc(route_label, method, status)
+            http_latency.observe(elapsed, route_label, method)
+            http_request_size.observe(request_bytes, route_label)
+            http_response_size.observe(response_bytes, route_label)
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Times every MongoDB command, labelled with its collection.
+
+    Events arrive on driver threads, so the started-command lookup table and
+    the histogram updates are guarded by a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[object, int], Tuple[str, str]] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        label = collection if isinstance(collection, str) else ""
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (label, event.command_name)
+
+    def _finish(self, event) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            return self._pending.pop((event.connection_id, event.request_id), None)
+
+    def succeeded(self, event):
+        labels = self._finish(event)
+        if labels is not None:
+            with self._lock:
+                mongo_latency.observe(event.duration_micros / 1e6, *labels)
+
+    def failed(self, event):
+        labels = self._finish(event)
+        if labels is not None:
+            with self._lock:
+                mongo_latency.observe(event.duration_micros / 1e6, *labels)
+                mongo_failures.inc(*labels)
+
+
+command_metrics = CommandMetrics()
+
+
+class LoopLagMonitor:
+    """Samples event-loop lag by timing how late a periodic sleep wakes up."""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            loop_lag.observe(max(time.perf_counter() - expected, 0.0))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,194 @@
+"""One-time data migrations, applied at startup before indexes are built.
+
+Each migration runs once per database; completion is recorded in the
+``_migrations`` collection so later boots skip it with a single lookup.
+Every worker calls ``run_migrations`` as it starts, so a migration is first
+claimed by inserting its record as ``running``: one worker wins the insert
+and runs it while the others wait for the record to become ``applied``. The
+claimant renews a lease on the record while it works, and a worker that died
+mid-migration is taken over once its lease lapses, so migrations must be safe
+to re-run from the start.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from availability import HOLDING_STATUSES
+from content_store import load_seed
+from stats import SubmissionStats, known_values
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_BATCH_SIZE = 1000
+MIGRATION_LEASE_SECONDS = 60.0
+
+
+def parse_created_at(value: str) -> datetime:
+    """An ISO ``created_at`` as stored by older releases, as an aware UTC datetime."""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+async def created_at_to_bson_dates(db):
+    """Rewrite ``created_at`` ISO strings on submissions as native BSON dates."""
+    for collection_name in ("contacts", "appointments"):
+        collection = db[collection_name]
+        cursor = collection.find({"created_at": {"$type": "string"}}, {"_id": 1, "created_at": 1})
+        batch = []
+        migrated = 0
+        async for doc in cursor.batch_size(MIGRATION_BATCH_SIZE):
+            batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"created_at": parse_created_at(doc["created_at"])}}))
+            if len(batch) >= MIGRATION_BATCH_SIZE:
+                await collection.bulk_write(batch, ordered=False)
+                migrated += len(batch)
+                batch = []
+        if batch:
+            await collection.bulk_write(batch, ordered=False)
+            migrated += len(batch)
+        logger.info("Migrated %d %s created_at values to BSON dates", migrated, collection_name)
+
+
+async def backfill_submission_stats(db):
+    """Build the daily analytics counters from the submissions already stored."""
+    # Content is not loaded yet; count the seed's services by name
+    known = known_values(service["name"] for service in load_seed()["services"])
+    await SubmissionStats(db.submission_stats, lambda: known).rebuild(db)
+    logger.info("Backfilled submission_stats counters")
+
+
+async def _hold_slots(collection, holders) -> int:
+    """Flag ``holders`` as holding their slot; returns how many were flagged."""
+    try:
+        result = await collection.bulk_write(
+            [UpdateOne({"_id": _id, "slot_held": {"$ne": True}}, {"$set": {"slot_held": True}}) for _id in holders],
+            ordered=False,
+        )
+        return result.modified_count
+    except BulkWriteError as exc:
+        # A booking taken by a new worker during a rolling deploy already holds the slot.
+        conflicts = [error for error in exc.details["writeErrors"] if error["code"] == 11000]
+        if len(conflicts) < len(exc.details["writeErrors"]):
+            raise
+        for error in conflicts:
+            logger.warning("Appointment %s lost its slot to a booking made during the deploy", error["op"]["q"]["_id"])
+        return exc.details["nModified"]
+
+
+async def backfill_slot_held(db):
+    """Flag the existing pending and confirmed appointments as holding their slot.
+
+    Older releases did not set ``slot_held``, so the unique partial index did
+    not see their bookings. Where an old double booking exists, the booking
+    that already holds the slot keeps it, otherwise the earliest one does; the
+    others are left unflagged and logged for someone to reschedule.
+    """
+    collection = db.appointments
+    cursor = collection.find(
+        {"status": {"$in": HOLDING_STATUSES}},
+        {"_id": 1, "id": 1, "date": 1, "time": 1, "slot_held": 1},
+    ).sort([("date", ASCENDING), ("time", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)])
+    holders, slot, group = [], None, []
+    flagged = duplicates = 0
+
+    def settle():
+        nonlocal duplicates
+        if not group:
+            return
+        holder = next((doc for doc in group if doc.get("slot_held")), group[0])
+        if not holder.get("slot_held"):
+            holders.append(holder["_id"])
+        for doc in group:
+            if doc is not holder:
+                duplicates += 1
+                logger.warning("Appointment %s double-books %s %s held by %s", doc["id"], doc["date"], doc["time"], holder["id"])
+
+    async for doc in cursor.batch_size(MIGRATION_BATCH_SIZE):
+        if (doc["date"], doc["time"]) != slot:
+            settle()
+            slot, group = (doc["date"], doc["time"]), []
+            if len(holders) >= MIGRATION_BATCH_SIZE:
+                flagged += await _hold_slots(collection, holders)
+                holders = []
+        group.append(doc)
+    settle()
+    if holders:
+        flagged += await _hold_slots(collection, holders)
+    logger.info("Flagged %d appointments as holding their slot; %d double bookings left unflagged", flagged, duplicates)
+
+
+MIGRATIONS = [
+    ("0001_created_at_to_bson_dates", created_at_to_bson_dates),
+    ("0002_backfill_submission_stats", backfill_submission_stats),
+    ("0003_backfill_slot_held", backfill_slot_held),
+]
+
+
+async def _claim(db, name: str, owner: str, lease: float) -> Optional[bool]:
+    """True once ``owner`` holds ``name``, False if it is applied, None while another worker runs it."""
+    now = datetime.now(timezone.utc)
+    try:
+        await db._migrations.insert_one({"_id": name, "state": "running", "owner": owner, "lease_until": now + timedelta(seconds=lease)})
+        return True
+    except DuplicateKeyError:
+        pass
+    lapsed = await db._migrations.find_one_and_update(
+        {"_id": name, "state": "running", "lease_until": {"$lt": now}},
+        {"$set": {"owner": owner, "lease_until": now + timedelta(seconds=lease)}},
+    )
+    if lapsed is not None:
+        logger.warning("Taking over migration %s from a worker whose lease lapsed", name)
+        return True
+    record = await db._migrations.find_one({"_id": name}, {"state": 1})
+    # Records written before claims existed have no state; they are applied.
+    if record is None or record.get("state") == "running":
+        return None
+    return False
+
+
+async def _renew(db, name: str, owner: str, lease: float):
+    while True:
+        await asyncio.sleep(lease / 3)
+        try:
+            await db._migrations.update_one(
+                {"_id": name, "owner": owner},
+                {"$set": {"lease_until": datetime.now(timezone.utc) + timedelta(seconds=lease)}},
+            )
+        except Exception:
+            logger.exception("Renewing the lease on migration %s failed", name)
+
+
+async def run_migrations(db, lease: float = MIGRATION_LEASE_SECONDS, poll_interval: float = 1.0):
+    """Apply every migration in ``MIGRATIONS`` that has not run on ``db`` yet.
+
+    Returns once all of them are applied, whichever worker ran them.
+    """
+    owner = uuid.uuid4().hex
+    for name, migration in MIGRATIONS:
+        while True:
+            claimed = await _claim(db, name, owner, lease)
+            if claimed is not None:
+                break
+            await asyncio.sleep(poll_interval)
+        if not claimed:
+            continue
+        logger.info("Running migration %s", name)
+        renewal = asyncio.create_task(_renew(db, name, owner, lease))
+        try:
+            await migration(db)
+        except BaseException:
+            # Released, so the next worker to start retries it
+            await db._migrations.delete_one({"_id": name, "owner": owner})
+            raise
+        finally:
+            renewal.cancel()
+        await db._migrations.update_one(
+            {"_id": name, "owner": owner},
+            {"$set": {"state": "applied", "applied_at": datetime.now(timezone.utc)}, "$unset": {"owner": "", "lease_until": ""}},
+        )
@@ -0,0 +1,252 @@
+"""Asynchronous notifications for new submissions through a MongoDB outbox.
+
+``Notifier.enqueue`` stores one job per sink and submission in the
+``notification_outbox`` collection (a single ``insert_many``) and hands the
+jobs to in-process worker tasks, so a request never waits on a sink. Workers
+deliver each job to its sink; a failure is retried with exponential backoff
+and jitter until ``max_attempts``, after which the job stays in the outbox
+as ``failed`` for inspection.
+
+The outbox is also the schedule. ``next_attempt_at`` is when a pending job
+may next be picked up: a job being delivered is leased by pushing it
+``lease`` seconds ahead, a failed attempt pushes it to the retry time. A
+poller claims due jobs with ``find_one_and_update``, which picks up retries,
+jobs left behind by a restart or crash, and jobs another worker process
+dropped. Every claim stores a fresh ``lease`` token. A job can wait in the
+local queue longer than its lease, so a worker takes the lease again, from
+the token it queued the job with, when it starts on the job. It drops the
+job if another claim got there first, and records the outcome only while its
+token is still the job's. Delivery is therefore at least once; sinks get a
+stable event ``id`` to drop repeats.
+
+Sinks implement ``async send(event)`` and raise on failure:
+``SmtpSink`` (stdlib ``smtplib`` in a thread, e.g. to a local debug server)
+and ``WebhookSink`` (JSON POST, optionally HMAC-signed). httpx is imported
+when a webhook sink is built, not with this module, so a deployment without
+one never pays for it at startup.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import random
+import smtplib
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import orjson
+from pymongo import ASCENDING, ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPES = {"contacts": "contact.created", "appointments": "appointment.created"}
+
+# Internal fields of a stored submission that are not part of the event
+_HIDDEN_FIELDS = ("_id", "slot_held")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class SmtpSink:
+    name = "smtp"
+
+    def __init__(self, host: str, port: int, sender: str, recipients: Sequence[str], timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = list(recipients)
+        self.timeout = timeout
+
+    def message(self, event: dict) -> EmailMessage:
+        data = event["data"]
+        message = EmailMessage()
+        message["Subject"] = f"New {event['type'].split('.')[0]} from {data.get('name', 'unknown')}"
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.recipients)
+        message["Message-ID"] = f"<{event['id']}@lumis>"
+        lines = [f"{field}: {', '.join(value) if isinstance(value, list) else value}" for field, value in data.items() if value not in (None, [])]
+        message.set_content("\n".join(lines))
+        return message
+
+    def _send(self, message: EmailMessage):
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            smtp.send_message(message)
+
+    async def send(self, event: dict):
+        await asyncio.to_thread(self._send, self.message(event))
+
+
+class WebhookSink:
+    name = "webhook"
+
+    def __init__(self, url: str, secret: Optional[str] = None, timeout: float = 10.0):
+        import httpx
+
+        self.url = url
+        self.secret = secret.encode() if secret else None
+        self.client = httpx.AsyncClient(timeout=timeout)
+
+    async def send(self, event: dict):
+        body = orjson.dumps(event)
+        headers = {"Content-Type": "application/json", "X-Lumis-Event": event["type"]}
+        if self.secret:
+            headers["X-Lumis-Signature"] = "sha256=" + hmac.new(self.secret, body, hashlib.sha256).hexdigest()
+        response = await self.client.post(self.url, content=body, headers=headers)
+        response.raise_for_status()
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class Notifier:
+    def __init__(
+        self,
+        collection,
+        sinks: Iterable,
+        workers: int = 4,
+        max_attempts: int = 8,
+        backoff: float = 2.0,
+        max_backoff: float = 3600.0,
+        lease: float = 60.0,
+        poll_interval: float = 5.0,
+        queue_size: int = 1000,
+    ):
+        self.collection = collection
+        self.sinks: Dict[str, object] = {sink.name: sink for sink in sinks}
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+
+    @property
+    def backlog(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._poll(), name="notification-poller")]
+        self._tasks += [asyncio.create_task(self._work(), name=f"notification-worker-{n}") for n in range(self.workers)]
+
+    async def stop(self):
+        """Stop the tasks; jobs still in flight are redelivered once their lease expires."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for sink in self.sinks.values():
+            if hasattr(sink, "close"):
+                await sink.close()
+
+    async def enqueue(self, kind: str, docs: Iterable[dict]):
+        """Persist a job per sink for each new ``kind`` submission and start delivering them."""
+        now = _now()
+        jobs = []
+        for doc in docs:
+            data = {field: value for field, value in doc.items() if field not in _HIDDEN_FIELDS}
+            for sink in self.sinks:
+                jobs.append({
+                    "_id": str(uuid.uuid4()),
+                    "sink": sink,
+                    "type": EVENT_TYPES.get(kind, f"{kind}.created"),
+                    "data": data,
+                    "status": "pending",
+                    "attempts": 0,
+                    "created_at": now,
+                    # Leased to this process from the start; the poller only
+                    # takes it if it is not delivered within the lease.
+                    "lease": uuid.uuid4().hex,
+                    "next_attempt_at": now + timedelta(seconds=self.lease),
+                })
+        if not jobs:
+            return
+        await self.collection.insert_many(jobs, ordered=False)
+        if self._queue is None:
+            return
+        for job in jobs:
+            try:
+                self._queue.put_nowait(job)
+            except asyncio.QueueFull:
+                break  # left for the poller once the lease runs out
+
+    async def _claim(self) -> Optional[dict]:
+        now = _now()
+        return await self.collection.find_one_and_update(
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"$set": {"lease": uuid.uuid4().hex, "next_attempt_at": now + timedelta(seconds=self.lease)}},
+            sort=[("next_attempt_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _renew(self, job: dict) -> Optional[dict]:
+        """``job`` under a new lease from now, or None if another claim has replaced the one it was queued with."""
+        now = _now()
+        return await self.collection.find_one_and_update(
+            {"_id": job["_id"], "status": "pending", "lease": job["lease"]},
+            {"$set": {"lease": uuid.uuid4().hex, "next_attempt_at": now + timedelta(seconds=self.lease)}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _poll(self):
+        while True:
+            try:
+                while not self._queue.full():
+                    job = await self._claim()
+                    if job is None:
+                        break
+                    self._queue.put_nowait(job)
+            except Exception:
+                logger.exception("Claiming due notifications failed")
+            await asyncio.sleep(self.poll_interval)
+
+    def retry_delay(self, attempts: int) -> float:
+        """Full-jitter exponential backoff after the ``attempts``-th failure."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempts - 1)))
+
+    async def deliver(self, job: dict):
+        sink = self.sinks.get(job["sink"])
+        attempts = job["attempts"] + 1
+        try:
+            if sink is None:
+                raise LookupError(f"no sink named {job['sink']!r} is configured")
+            await sink.send({"id": job["_id"], "type": job["type"], "created_at": job["created_at"], "data": job["data"]})
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            if attempts >= self.max_attempts:
+                self.failed += 1
+                logger.error("Notification %s to %s failed for good after %d attempts: %s", job["_id"], job["sink"], attempts, error)
+                update = {"status": "failed", "attempts": attempts, "last_error": error}
+            else:
+                self.retried += 1
+                delay = self.retry_delay(attempts)
+                update = {"attempts": attempts, "last_error": error, "next_attempt_at": _now() + timedelta(seconds=delay)}
+            await self.collection.update_one({"_id": job["_id"], "lease": job["lease"]}, {"$set": update})
+            return
+        self.delivered += 1
+        await self.collection.update_one(
+            {"_id": job["_id"], "lease": job["lease"]},
+            {"$set": {"status": "delivered", "attempts": attempts, "delivered_at": _now()}},
+        )
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                job = await self._renew(job)
+                if job is not None:
+                    await self.deliver(job)
+            except Exception:
+                logger.exception("Recording the outcome of notification %s failed", job["_id"])
+            finally:
+                self._queue.task_done()
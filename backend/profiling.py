@@ -0,0 +1,81 @@
+"""On-demand profiling of individual requests.
+
+A request carrying ``X-Profile: <PROFILE_TOKEN>`` is profiled, and a random
+``sample_rate`` fraction of all requests is too; a profile is kept only when
+the request took at least ``slow_ms``. pyinstrument is used when installed
+(it follows ``await`` correctly and writes an HTML report); otherwise
+cProfile writes a ``.prof`` file for ``snakeviz``/``pstats``. cProfile sees
+everything the event loop runs while the request is in flight, so read its
+output with concurrent traffic in mind. Only one request is profiled at a
+time.
+"""
+import cProfile
+import logging
+import random
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+try:
+    from pyinstrument import Profiler as _Pyinstrument
+except ImportError:
+    _Pyinstrument = None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp, output_dir: Path, token: Optional[str] = None, sample_rate: float = 0.0, slow_ms: float = 0.0):
+        self.app = app
+        self.output_dir = Path(output_dir)
+        self.token = token.encode() if token else None
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self._active = False
+
+    def _wanted(self, scope: Scope) -> bool:
+        if self._active:
+            return False
+        if self.token is not None:
+            for name, value in scope["headers"]:
+                if name == b"x-profile" and value == self.token:
+                    return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+
+        async def tagged_send(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        self._active = True
+        profiler = _Pyinstrument(async_mode="enabled") if _Pyinstrument else cProfile.Profile()
+        start = time.perf_counter()
+        profiler.start() if _Pyinstrument else profiler.enable()
+        try:
+            await self.app(scope, receive, tagged_send)
+        finally:
+            profiler.stop() if _Pyinstrument else profiler.disable()
+            self._active = False
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if elapsed_ms >= self.slow_ms:
+                self._save(profiler, profile_id, scope, elapsed_ms)
+
+    def _save(self, profiler, profile_id: str, scope: Scope, elapsed_ms: float):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        if _Pyinstrument:
+            path = self.output_dir / f"{profile_id}.html"
+            path.write_text(profiler.output_html())
+        else:
+            path = self.output_dir / f"{profile_id}.prof"
+            profiler.dump_stats(path)
+        logger.info("Profiled %s %s in %.1f ms -> %s", scope["method"], scope["path"], elapsed_ms, path)
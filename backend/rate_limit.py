@@ -0,0 +1,163 @@
+"""Token-bucket rate limits and duplicate-submission shedding for public writes.
+
+A ``RateLimit`` allows a burst of ``capacity`` requests per key and refills
+at ``capacity / period`` tokens per second; ``take`` returns how long the
+caller must wait, 0 when a token was available. ``Deduplicator`` remembers a
+fingerprint of each accepted submission for ``window`` seconds so an
+identical resubmission (double click, replaying bot) is answered with the
+original response instead of another write.
+
+``MemoryStore`` keeps buckets and fingerprints in bounded per-process LRUs,
+so with several workers each enforces its own share of the limit.
+``RedisStore`` keeps them in a Redis-compatible server, shared by every
+worker; it needs the optional ``redis`` package.
+"""
+import hashlib
+import math
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import orjson
+
+
+class RateLimit:
+    """``capacity`` requests per ``period`` seconds for each key, e.g. ``RateLimit.parse("ip", "20/60")``."""
+
+    def __init__(self, name: str, capacity: int, period: float):
+        self.name = name
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+
+    @classmethod
+    def parse(cls, name: str, spec: str) -> "RateLimit":
+        capacity, _, period = spec.partition("/")
+        return cls(name, int(capacity), float(period or 1))
+
+
+class MemoryStore:
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._seen: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    def _bound(self, entries: OrderedDict):
+        # The least recently touched bucket has refilled the longest, so it
+        # is the cheapest to forget.
+        while len(entries) > self.max_keys:
+            entries.popitem(last=False)
+
+    async def take(self, limit: RateLimit, key: str, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        key = f"{limit.name}:{key}"
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = limit.capacity
+        else:
+            tokens = min(limit.capacity, bucket[0] + (now - bucket[1]) * limit.rate)
+            self._buckets.move_to_end(key)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / limit.rate
+        self._buckets[key] = (tokens, now)
+        self._bound(self._buckets)
+        return wait
+
+    async def claim(self, key: str, value: bytes, ttl: float) -> Optional[bytes]:
+        now = time.monotonic()
+        seen = self._seen.get(key)
+        if seen is not None and seen[0] > now:
+            return seen[1]
+        self._seen[key] = (now + ttl, value)
+        self._seen.move_to_end(key)
+        self._bound(self._seen)
+        return None
+
+    async def release(self, key: str):
+        self._seen.pop(key, None)
+
+    async def close(self):
+        pass
+
+
+# KEYS[1] bucket; ARGV capacity, rate (tokens/s), now (s). Returns the wait in seconds.
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisStore:
+    def __init__(self, url: str, prefix: str = "lumis:ratelimit:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from exc
+        self.redis = redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.redis.register_script(_TAKE_SCRIPT)
+
+    async def take(self, limit: RateLimit, key: str, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        wait = await self._take(keys=[f"{self.prefix}{limit.name}:{key}"], args=[limit.capacity, limit.rate, now])
+        return float(wait)
+
+    async def claim(self, key: str, value: bytes, ttl: float) -> Optional[bytes]:
+        name = self.prefix + "seen:" + key
+        if await self.redis.set(name, value, nx=True, px=max(int(ttl * 1000), 1)):
+            return None
+        existing = await self.redis.get(name)
+        if existing is None:  # expired between SET and GET
+            return await self.claim(key, value, ttl)
+        return existing
+
+    async def release(self, key: str):
+        await self.redis.delete(self.prefix + "seen:" + key)
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+def retry_after(wait: float) -> str:
+    """``Retry-After`` header value (whole seconds, at least 1) for a wait."""
+    return str(max(math.ceil(wait), 1))
+
+
+class Deduplicator:
+    """Claims a submission's fingerprint for ``window`` seconds.
+
+    ``claim`` returns ``None`` for the first submission and the stored
+    response body for identical ones within the window; ``release`` drops the
+    claim when the first submission ends up not being written.
+    """
+
+    def __init__(self, store, window: float):
+        self.store = store
+        self.window = window
+
+    @staticmethod
+    def fingerprint(kind: str, payload: dict) -> str:
+        canonical = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+        return kind + ":" + hashlib.blake2b(canonical, digest_size=16).hexdigest()
+
+    async def claim(self, fingerprint: str, response_body: bytes) -> Optional[bytes]:
+        if self.window <= 0:
+            return None
+        return await self.store.claim(fingerprint, response_body, self.window)
+
+    async def release(self, fingerprint: str):
+        if self.window > 0:
+            await self.store.release(fingerprint)
@@ -0,0 +1,347 @@
+"""ASGI response cache for read endpoints.
+
+``ResponseCacheMiddleware`` serves ``GET``/``HEAD`` requests whose path
+matches a ``CacheRule`` from a pluggable backend, keyed on method, path,
+query string and ``Accept-Encoding``. Each rule sets the route's TTL and the
+tags its entries carry; write handlers call ``ResponseCache.invalidate`` with
+a tag to drop everything derived from the data they changed.
+
+``MemoryBackend`` is an in-process LRU bounded by total body bytes. Its
+entries remember the tag versions they were computed at, and the versions
+live in ``SharedCounters`` so an invalidation in one forked worker also
+retires the entries cached by the others. ``RedisBackend`` stores entries
+in a Redis-compatible server so several workers share one cache; it needs
+the optional ``redis`` package.
+"""
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from shared_state import SharedCounters
+
+logger = logging.getLogger(__name__)
+
+
+class CacheRule:
+    """TTL and invalidation tags for the paths matching ``pattern``."""
+
+    def __init__(self, pattern: str, ttl: float, tags: Iterable[str] = ()):
+        self.pattern = re.compile(pattern)
+        self.ttl = ttl
+        self.tags = tuple(tags)
+
+
+@dataclass
+class CacheEntry:
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    stored_at: float
+    expires_at: float
+    tags: Tuple[str, ...] = ()
+    route: str = ""
+    # Tag versions at store time; not persisted by RedisBackend, whose
+    # invalidation is already visible to every worker.
+    generation: Optional[Tuple[int, ...]] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers)
+
+    def header(self, name: bytes) -> Optional[bytes]:
+        for key, value in self.headers:
+            if key == name:
+                return value
+        return None
+
+
+class MemoryBackend:
+    """In-process LRU bounded by ``max_bytes`` of cached headers and bodies."""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry):
+        if entry.size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = entry
+        self.size += entry.size
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def invalidate(self, tags: Sequence[str]) -> int:
+        keys = set()
+        for tag in tags:
+            keys |= self._tags.get(tag, set())
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    async def close(self):
+        pass
+
+
+class RedisBackend:
+    """Entries stored in Redis with native expiry; tags kept as Redis sets.
+
+    A tag set expires with the longest-lived entry it lists, so keys whose
+    tag is never invalidated do not pile up (``PEXPIRE NX``/``GT``, Redis 7).
+    """
+
+    def __init__(self, url: str, prefix: str = "lumis:cache:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the 'redis' package") from exc
+        self.redis = redis.from_url(url)
+        self.prefix = prefix
+        self.evictions = 0
+
+    @staticmethod
+    def _encode(entry: CacheEntry) -> bytes:
+        meta = {
+            "status": entry.status,
+            "headers": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in entry.headers],
+            "stored_at": entry.stored_at,
+            "expires_at": entry.expires_at,
+            "tags": list(entry.tags),
+            "route": entry.route,
+        }
+        return json.dumps(meta).encode("utf-8") + b"\n" + entry.body
+
+    @staticmethod
+    def _decode(raw: bytes) -> CacheEntry:
+        meta, _, body = raw.partition(b"\n")
+        meta = json.loads(meta)
+        return CacheEntry(
+            status=meta["status"],
+            headers=[(k.encode("latin-1"), v.encode("latin-1")) for k, v in meta["headers"]],
+            body=body,
+            stored_at=meta["stored_at"],
+            expires_at=meta["expires_at"],
+            tags=tuple(meta["tags"]),
+            route=meta.get("route", ""),
+        )
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        raw = await self.redis.get(self.prefix + key)
+        return self._decode(raw) if raw is not None else None
+
+    async def set(self, key: str, entry: CacheEntry):
+        ttl_ms = max(int((entry.expires_at - entry.stored_at) * 1000), 1)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(self.prefix + key, self._encode(entry), px=ttl_ms)
+            for tag in entry.tags:
+                tag_key = self.prefix + "tag:" + tag
+                pipe.sadd(tag_key, key)
+                # Set an expiry on a new set, only ever extend an existing one
+                pipe.pexpire(tag_key, ttl_ms, nx=True)
+                pipe.pexpire(tag_key, ttl_ms, gt=True)
+            await pipe.execute()
+
+    async def invalidate(self, tags: Sequence[str]) -> int:
+        removed = 0
+        for tag in tags:
+            tag_key = self.prefix + "tag:" + tag
+            keys = await self.redis.smembers(tag_key)
+            if keys:
+                removed += await self.redis.delete(*(self.prefix + k.decode() for k in keys))
+            await self.redis.delete(tag_key)
+        return removed
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        backend,
+        rules: Sequence[CacheRule],
+        max_body_bytes: int = 1024 * 1024,
+        versions: Optional[SharedCounters] = None,
+    ):
+        self.backend = backend
+        self.rules = list(rules)
+        self.max_body_bytes = max_body_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+        # Bumped per tag on invalidation so a response computed before a
+        # write is not stored after it, nor served by another worker.
+        self.versions = versions or SharedCounters(tag for rule in self.rules for tag in rule.tags)
+
+    def rule_for(self, path: str) -> Optional[CacheRule]:
+        for rule in self.rules:
+            if rule.pattern.match(path):
+                return rule
+        return None
+
+    @staticmethod
+    def key(scope: Scope) -> str:
+        accept_encoding = b""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value
+                break
+        query = scope.get("query_string", b"").decode("latin-1")
+        return f'{scope["method"]} {scope["path"]}?{query} {accept_encoding.decode("latin-1")}'
+
+    def generation(self, tags: Sequence[str]) -> Tuple[int, ...]:
+        return self.versions.snapshot(tags)
+
+    def is_current(self, entry: CacheEntry) -> bool:
+        return entry.generation is None or entry.generation == self.generation(entry.tags)
+
+    async def invalidate(self, *tags: str) -> int:
+        """Drop every entry carrying any of ``tags``; safe to call from handlers."""
+        for tag in tags:
+            self.versions.bump(tag)
+        try:
+            removed = await self.backend.invalidate(tags)
+        except Exception:
+            logger.exception("Response cache invalidation failed for %s", tags)
+            return 0
+        self.invalidations += removed
+        return removed
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        stats = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "invalidations": self.invalidations,
+            "evictions": self.backend.evictions,
+        }
+        if isinstance(self.backend, MemoryBackend):
+            stats["bytes"] = self.backend.size
+            stats["max_bytes"] = self.backend.max_bytes
+        return stats
+
+
+def _etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    tags = [tag.strip().removeprefix(b"W/") for tag in if_none_match.split(b",")]
+    return b"*" in tags or etag.removeprefix(b"W/") in tags
+
+
+class ResponseCacheMiddleware:
+    def __init__(self, app: ASGIApp, cache: ResponseCache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        rule = self.cache.rule_for(scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = self.cache.key(scope)
+        try:
+            entry = await self.cache.backend.get(key)
+        except Exception:
+            logger.exception("Response cache lookup failed")
+            entry = None
+        if entry is not None and self.cache.is_current(entry):
+            self.cache.hits += 1
+            scope["route_path"] = entry.route
+            await self._send_entry(scope, send, entry)
+            return
+        self.cache.misses += 1
+        generation = self.cache.generation(rule.tags)
+
+        status = 0
+        headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+        size = 0
+        cacheable = True
+
+        async def capture(message: Message):
+            nonlocal status, headers, size, cacheable
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                cache_control = dict(headers).get(b"cache-control", b"")
+                cacheable = (
+                    status == 200
+                    and all(name != b"set-cookie" for name, _ in headers)
+                    and b"no-store" not in cache_control
+                    and b"private" not in cache_control
+                )
+                message["headers"] = headers + [(b"x-cache", b"MISS")]
+            elif message["type"] == "http.response.body" and cacheable:
+                body = message.get("body", b"")
+                size += len(body)
+                if size > self.cache.max_body_bytes:
+                    cacheable = False
+                    chunks.clear()
+                else:
+                    chunks.append(body)
+                    if not message.get("more_body", False) and self.cache.generation(rule.tags) == generation:
+                        now = time.time()
+                        route = getattr(scope.get("route"), "path", "")
+                        entry = CacheEntry(status, headers, b"".join(chunks), now, now + rule.ttl, rule.tags, route, generation)
+                        try:
+                            await self.cache.backend.set(key, entry)
+                            self.cache.stores += 1
+                        except Exception:
+                            logger.exception("Response cache store failed")
+            await send(message)
+
+        await self.app(scope, receive, capture)
+
+    @staticmethod
+    async def _send_entry(scope: Scope, send: Send, entry: CacheEntry):
+        age = str(max(int(time.time() - entry.stored_at), 0)).encode()
+        headers = entry.headers + [(b"age", age), (b"x-cache", b"HIT")]
+        etag = entry.header(b"etag")
+        if_none_match = dict(scope["headers"]).get(b"if-none-match")
+        if etag is not None and if_none_match is not None and _etag_matches(if_none_match, etag):
+            not_modified = [(k, v) for k, v in headers if k not in (b"content-length", b"content-type")]
+            await send({"type": "http.response.start", "status": 304, "headers": not_modified})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({"type": "http.response.start", "status": entry.status, "headers": headers})
+        body = b"" if scope["method"] == "HEAD" else entry.body
+        await send({"type": "http.response.body", "body": body})
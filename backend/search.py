@@ -0,0 +1,121 @@
+"""Ranked full-text search over the static content and the submissions.
+
+``ContentIndex`` is an inverted index over the seed content, built once with
+the ``ContentRegistry``. Each posting stores the term's precomputed BM25
+score for that document (field weights applied to the term frequency), so a
+query costs one dict lookup per term and a partial sort of the matches.
+
+Submissions are searched through MongoDB's text index (``TEXT_SEARCH_INDEX``
+in indexes.py), ranked by ``textScore``. The text index splits an email
+address into its common parts, so an address-shaped query is matched exactly
+against the ``email`` index instead.
+"""
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+from pymongo import ASCENDING
+
+from indexes import PAGE_SORT
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or our that the their to was "
+    "we were will with you your".split()
+)
+
+
+def _stem(token: str) -> str:
+    # Plural folding only (Porter step 1a), enough for "agents" to find "agent".
+    if token.endswith("sses"):
+        return token[:-2]
+    if token.endswith("ies") and len(token) > 4:
+        return token[:-3] + "y"
+    if token.endswith("s") and not token.endswith(("ss", "us")) and len(token) > 3:
+        return token[:-1]
+    return token
+
+
+def terms(text: str) -> List[str]:
+    """Lower-cased, stemmed tokens of ``text`` without stop words."""
+    return [_stem(token) for token in _TOKEN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def _field_text(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(item) for item in value)
+    return "" if value is None else str(value)
+
+
+class ContentIndex:
+    """BM25-ranked search over ``{kind: (records, {field: weight})}``.
+
+    Hits are ``{"type": kind, "id", "score", "item": record}``, best first;
+    equal scores keep the order the records were given in.
+    """
+
+    def __init__(self, sources: Mapping[str, Tuple[Sequence[Mapping], Mapping[str, float]]], k1: float = 1.2, b: float = 0.75):
+        self.documents: List[Tuple[str, dict]] = []
+        frequencies: List[Counter] = []
+        lengths: List[int] = []
+        for kind, (records, weights) in sources.items():
+            for record in records:
+                frequency: Counter = Counter()
+                length = 0
+                for field, weight in weights.items():
+                    for term in terms(_field_text(record.get(field))):
+                        frequency[term] += weight
+                        length += 1
+                self.documents.append((kind, dict(record)))
+                frequencies.append(frequency)
+                lengths.append(length)
+
+        average = sum(lengths) / len(lengths) if lengths else 1.0
+        document_frequency = Counter(term for frequency in frequencies for term in frequency)
+        total = len(self.documents)
+        self.postings: Dict[str, Dict[int, float]] = {}
+        for doc, (frequency, length) in enumerate(zip(frequencies, lengths)):
+            norm = k1 * (1 - b + b * length / (average or 1.0))
+            for term, tf in frequency.items():
+                df = document_frequency[term]
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                self.postings.setdefault(term, {})[doc] = idf * tf * (k1 + 1) / (tf + norm)
+
+    def search(self, query: str, limit: int, offset: int = 0) -> Tuple[List[dict], bool]:
+        """One page of hits for ``query`` and whether more follow it."""
+        scores: Dict[int, float] = {}
+        for term in dict.fromkeys(terms(query)):
+            for doc, score in self.postings.get(term, {}).items():
+                scores[doc] = scores.get(doc, 0.0) + score
+        ranked = heapq.nlargest(offset + limit + 1, scores.items(), key=lambda item: (item[1], -item[0]))
+        hits = []
+        for doc, score in ranked[offset:offset + limit]:
+            kind, record = self.documents[doc]
+            hits.append({"type": kind, "id": record["id"], "score": round(score, 4), "item": record})
+        return hits, len(ranked) > offset + limit
+
+
+async def search_submissions(collection, query: str, limit: int, offset: int, projection: dict) -> Tuple[List[dict], bool]:
+    """One page of ``collection`` documents matching ``query`` and whether more follow it.
+
+    Text matches are ranked by ``textScore`` (ties by ``id`` so pages do not
+    overlap); exact email matches are newest first and carry no score.
+    """
+    query = query.strip()
+    if _EMAIL.match(query):
+        cursor = collection.find({"email": query}, projection).sort(PAGE_SORT)
+    else:
+        cursor = collection.find(
+            {"$text": {"$search": query}},
+            {**projection, "score": {"$meta": "textScore"}},
+        ).sort([("score", {"$meta": "textScore"}), ("id", ASCENDING)])
+    # The limit lets the server keep a top-k sort instead of ordering every match.
+    docs = await cursor.skip(offset).limit(limit + 1).to_list(limit + 1)
+    hits = []
+    for doc in docs[:limit]:
+        score = doc.pop("score", None)
+        hits.append({"type": collection.name, "id": doc["id"], "score": None if score is None else round(score, 4), "item": doc})
+    return hits, len(docs) > limit
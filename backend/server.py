@@ -1,26 +1,70 @@
-from fastapi import FastAPI, APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, APIRouter, Header, HTTPException, Request, Response, Query
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
+import asyncio
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from typing import List, Optional
 import uuid
+import json
+import base64
+import binascii
+import hmac
+import csv
+import io
+import orjson
+import secrets
+import time
 from datetime import datetime, timezone
+from indexes import PAGE_SORT, ensure_indexes, verify_query_plans
+from migrations import parse_created_at, run_migrations
+from availability import AvailabilityEngine, SlotUnavailableError
+from write_behind import WriteBehindQueue, QueueFullError
+from database import STAND_IN_SCHEME, create_client, warm_pool, pool_metrics
+from content import ContentRegistry, PrecomputedPayload
+from content_store import ContentStore, ContentWatcher, load_seed, validate
+from file_delivery import file_response
+from response_cache import CacheRule, MemoryBackend, RedisBackend, ResponseCache, ResponseCacheMiddleware
+from metrics import LoopLagMonitor, MetricsMiddleware, registry as metrics_registry
+from profiling import ProfilingMiddleware
+from compression import CompressionMiddleware, negotiate
+from conditional import ConditionalGetMiddleware
+from shared_state import SharedCounters
+from rate_limit import Deduplicator, MemoryStore, RateLimit, RedisStore, retry_after
+from bulk_import import BulkImporter, BulkImportError, csv_records, ndjson_records
+from search import search_submissions
+from stats import SubmissionStats, daily_counts, known_values, report, window_start
+from notifications import Notifier, SmtpSink, WebhookSink
+from idempotency import IdempotencyInProgress, IdempotencyKeyReused, IdempotencyStore
+from submission_stream import InvalidEventId, SubmissionFeed, parse_event_id
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+CASE_STUDY_PDF_DIR = Path(os.environ.get('CASE_STUDY_PDF_DIR', ROOT_DIR / 'case_study_pdfs'))
+
+# MongoDB connection, opened by the lifespan handler rather than at import
+client = None
+db = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup_db_client()
+    yield
+    await shutdown_db_client()
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson-rendered JSON; UTC datetimes end in ``Z`` like pydantic's output."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
 
 # Create the main app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -102,266 +146,839 @@ class BlogPost(BaseModel):
     published_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     status: str = "coming_soon"
 
-# ==================== SEED DATA ====================
-
-TESTIMONIALS = [
-    {
-        "id": "1",
-        "name": "Sarah Chen",
-        "company": "TechFlow Inc.",
-        "role": "CTO",
-        "content": "Lumis transformed our operations with their AI automation solutions. We reduced manual tasks by 70% and saw ROI within 3 months.",
-        "rating": 5
-    },
-    {
-        "id": "2",
-        "name": "Michael Rodriguez",
-        "company": "ScaleUp Ventures",
-        "role": "CEO",
-        "content": "Their DevOps expertise helped us achieve 99.9% uptime. The team is incredibly responsive and technically brilliant.",
-        "rating": 5
-    },
-    {
-        "id": "3",
-        "name": "Emily Watson",
-        "company": "DataDrive Analytics",
-        "role": "VP Engineering",
-        "content": "The AI agents Lumis built for us handle customer inquiries 24/7. Support costs down 50%, customer satisfaction up 40%.",
-        "rating": 5
-    },
-    {
-        "id": "4",
-        "name": "James Park",
-        "company": "CloudFirst Solutions",
-        "role": "Director of IT",
-        "content": "Database optimization and cloud migration was seamless. Lumis delivered on time and under budget. Highly recommend!",
-        "rating": 5
-    },
-    {
-        "id": "5",
-        "name": "Lisa Thompson",
-        "company": "RetailPro",
-        "role": "COO",
-        "content": "From website redesign to backend automation, Lumis handled everything professionally. Our e-commerce conversion rate doubled.",
-        "rating": 5
-    }
-]
+class Service(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    name: str
+    description: str
+    icon: str
 
-CASE_STUDIES = [
-    {
-        "id": "cs1",
-        "title": "AI-Powered Customer Service Automation",
-        "company": "FinanceHub Global",
-        "industry": "Financial Services",
-        "challenge": "Manual customer support handling 10,000+ daily inquiries with 48-hour response times.",
-        "solution": "Deployed intelligent AI agents with natural language processing, integrated with existing CRM systems.",
-        "results": [
-            "Response time reduced to under 5 minutes",
-            "70% of inquiries resolved without human intervention",
-            "Customer satisfaction improved by 45%",
-            "$2M annual savings in support costs"
-        ],
-        "image_url": "https://images.unsplash.com/photo-1551288049-bebda4e38f71?w=600",
-        "pdf_filename": "case_study_financehub.pdf"
-    },
-    {
-        "id": "cs2",
-        "title": "Cloud Infrastructure Modernization",
-        "company": "MedTech Innovations",
-        "industry": "Healthcare Technology",
-        "challenge": "Legacy on-premise infrastructure causing reliability issues and compliance concerns.",
-        "solution": "Full cloud migration to AWS with HIPAA-compliant architecture and automated scaling.",
-        "results": [
-            "99.99% uptime achieved",
-            "40% reduction in infrastructure costs",
-            "Full HIPAA compliance maintained",
-            "Deployment time reduced from weeks to hours"
-        ],
-        "image_url": "https://images.unsplash.com/photo-1451187580459-43490279c0fa?w=600",
-        "pdf_filename": "case_study_medtech.pdf"
-    },
-    {
-        "id": "cs3",
-        "title": "E-Commerce Platform Optimization",
-        "company": "StyleNow Retail",
-        "industry": "E-Commerce",
-        "challenge": "Slow website performance and poor mobile experience affecting sales conversion.",
-        "solution": "Complete frontend rebuild with React, database optimization, and CDN implementation.",
-        "results": [
-            "Page load time reduced by 65%",
-            "Mobile conversion rate increased 120%",
-            "Black Friday traffic handled seamlessly",
-            "SEO rankings improved significantly"
-        ],
-        "image_url": "https://images.unsplash.com/photo-1563013544-824ae1b704d3?w=600",
-        "pdf_filename": "case_study_stylenow.pdf"
-    }
-]
+# ==================== BOOKING SLOTS ====================
 
-BLOG_POSTS = [
-    {
-        "id": "blog1",
-        "title": "The Future of AI Agents in Business Automation",
-        "excerpt": "Discover how intelligent AI agents are revolutionizing business operations and what it means for your company's competitive edge.",
-        "category": "AI & Automation",
-        "author": "Lumis Team",
-        "image_url": "https://images.unsplash.com/photo-1677442136019-21780ecad995?w=600",
-        "status": "coming_soon"
-    },
-    {
-        "id": "blog2",
-        "title": "DevOps Best Practices for Startups",
-        "excerpt": "Essential DevOps strategies that help startups scale efficiently while maintaining reliability and security.",
-        "category": "DevOps",
-        "author": "Lumis Team",
-        "image_url": "https://images.unsplash.com/photo-1667372393119-3d4c48d07fc9?w=600",
-        "status": "coming_soon"
-    },
-    {
-        "id": "blog3",
-        "title": "Database Optimization: A Complete Guide",
-        "excerpt": "Learn proven techniques to optimize your database performance and reduce costs without compromising data integrity.",
-        "category": "Database",
-        "author": "Lumis Team",
-        "image_url": "https://images.unsplash.com/photo-1544383835-bda2bc66a55d?w=600",
-        "status": "coming_soon"
-    }
+AVAILABLE_TIMES = [
+    "09:00 AM",
+    "10:00 AM",
+    "11:00 AM",
+    "12:00 PM",
+    "01:00 PM",
+    "02:00 PM",
+    "03:00 PM",
+    "04:00 PM",
+    "05:00 PM"
 ]
 
-SERVICES = [
-    {
-        "id": "svc1",
-        "name": "AI Agent Building",
-        "description": "Custom AI agents that automate workflows, handle customer interactions, and drive intelligent decision-making.",
-        "icon": "brain"
-    },
-    {
-        "id": "svc2",
-        "name": "Automation Software",
-        "description": "End-to-end automation solutions that eliminate repetitive tasks and streamline your business processes.",
-        "icon": "bot"
-    },
-    {
-        "id": "svc3",
-        "name": "Web Development",
-        "description": "Modern, responsive websites and web applications built with cutting-edge technologies.",
-        "icon": "globe"
-    },
-    {
-        "id": "svc4",
-        "name": "DevOps & Cloud",
-        "description": "Infrastructure automation, CI/CD pipelines, and cloud migration for scalable, reliable systems.",
-        "icon": "server"
-    },
-    {
-        "id": "svc5",
-        "name": "Database Solutions",
-        "description": "Database design, optimization, migration, and maintenance for peak performance.",
-        "icon": "database"
-    }
+# Built against the live client in startup_db_client
+availability: Optional[AvailabilityEngine] = None
+submission_stats: Optional[SubmissionStats] = None
+
+# ==================== WRITE-BEHIND ====================
+
+# Opt-in: batches submission inserts off the request path (see write_behind.py)
+WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', '').lower() in ('1', 'true', 'yes')
+write_queue: Optional[WriteBehindQueue] = None
+
+async def insert_submission(collection_name: str, doc: dict, wait: bool = False, on_error=None):
+    """Insert a submission directly, or through the write-behind queue when enabled.
+
+    ``on_error`` is awaited if a queued insert nobody waits for fails later.
+    """
+    if write_queue is None:
+        await db[collection_name].insert_one(doc)
+        await submissions_written(collection_name, [doc])
+        return
+    try:
+        future = write_queue.put(collection_name, doc, wait=wait, on_error=on_error)
+    except QueueFullError:
+        raise HTTPException(status_code=503, detail="Too many submissions, please retry shortly", headers={"Retry-After": "1"})
+    if future is not None:
+        await future
+
+async def submissions_written(collection_name: str, docs: List[dict], notify: bool = True):
+    """Bookkeeping after submissions reach MongoDB, however they were written."""
+    await response_cache.invalidate(collection_name)
+    try:
+        await submission_stats.record(collection_name, docs)
+    except Exception:
+        # The write itself succeeded; a counter that missed it is corrected
+        # by SubmissionStats.rebuild.
+        logger.exception("Updating submission_stats for %d %s failed", len(docs), collection_name)
+    # Bulk imports reach open streams through the feed's own upstream, which
+    # tells clients to reload when an import is too big to replay.
+    if notify and submission_feed is not None:
+        submission_feed.publish(collection_name, docs)
+    if notify and notifier is not None:
+        try:
+            await notifier.enqueue(collection_name, docs)
+        except Exception:
+            logger.exception("Queueing notifications for %d %s failed", len(docs), collection_name)
+
+# ==================== NOTIFICATIONS ====================
+
+# New submissions are announced to the configured sinks off the request path
+# through a MongoDB outbox (see notifications.py); off unless a sink is set.
+def build_notification_sinks() -> list:
+    sinks = []
+    if os.environ.get('NOTIFY_WEBHOOK_URL'):
+        sinks.append(WebhookSink(os.environ['NOTIFY_WEBHOOK_URL'], secret=os.environ.get('NOTIFY_WEBHOOK_SECRET')))
+    if os.environ.get('NOTIFY_SMTP_HOST'):
+        sinks.append(SmtpSink(
+            os.environ['NOTIFY_SMTP_HOST'],
+            int(os.environ.get('NOTIFY_SMTP_PORT', '1025')),
+            sender=os.environ.get('NOTIFY_EMAIL_FROM', 'lumis@localhost'),
+            recipients=[address.strip() for address in os.environ.get('NOTIFY_EMAIL_TO', 'team@localhost').split(',') if address.strip()],
+        ))
+    return sinks
+
+# Built in startup_db_client when at least one sink is configured
+notifier: Optional[Notifier] = None
+
+# ==================== SUBMISSION STREAM ====================
+
+# New submissions are pushed to dashboards as server-sent events instead of
+# being polled from /api/contacts (see submission_stream.py). Each worker
+# runs one feed; idle streams cost no queries.
+SUBMISSION_STREAM_PATH = "/api/submissions/stream"
+
+# Built in startup_db_client
+submission_feed: Optional[SubmissionFeed] = None
+
+# ==================== RATE LIMITING ====================
+
+# Token buckets per client IP and per email, plus a short memory of accepted
+# submissions so identical resubmissions never reach MongoDB (see rate_limit.py).
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory').lower()
+RATE_LIMIT_TRUST_FORWARDED = os.environ.get('RATE_LIMIT_TRUST_FORWARDED', '').lower() in ('1', 'true', 'yes')
+IP_LIMIT = RateLimit.parse("ip", os.environ.get('RATE_LIMIT_PER_IP', '30/60'))
+EMAIL_LIMIT = RateLimit.parse("email", os.environ.get('RATE_LIMIT_PER_EMAIL', '5/600'))
+
+def build_rate_limit_store():
+    if RATE_LIMIT_BACKEND == 'redis':
+        return RedisStore(os.environ.get('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0'))
+    return MemoryStore()
+
+rate_limit_store = build_rate_limit_store()
+submission_dedupe = Deduplicator(rate_limit_store, float(os.environ.get('SUBMISSION_DEDUPE_SECONDS', '300')))
+
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get('x-forwarded-for')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.client.host if request.client else 'unknown'
+
+async def enforce_rate_limit(limit: RateLimit, key: str):
+    if not RATE_LIMIT_ENABLED:
+        return
+    wait = await rate_limit_store.take(limit, key)
+    if wait:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many submissions, please retry later",
+            headers={"Retry-After": retry_after(wait)},
+        )
+
+def submission_fingerprint(kind: str, input: BaseModel) -> str:
+    return Deduplicator.fingerprint(kind, {**input.model_dump(mode="json"), "email": input.email.casefold()})
+
+async def guarded_submission(request: Request, kind: str, input: BaseModel, record: BaseModel, write):
+    """Rate-limit and de-duplicate a public submission, then ``await write(on_error)``.
+
+    With an ``Idempotency-Key`` header the submission runs once per key and
+    retries get the first response back. Either way, an identical submission
+    within the dedupe window gets the first one's response back without
+    writing again. ``write`` passes ``on_error`` on to a deferred insert, so
+    one that fails after the response frees the submission for a retry.
+    """
+    await enforce_rate_limit(IP_LIMIT, client_ip(request))
+    email = input.email.casefold()
+    fingerprint = submission_fingerprint(kind, input)
+    key = request.headers.get("idempotency-key")
+    if key is None:
+        return await deduplicated_write(fingerprint, email, record, write)
+    return await idempotent_write(kind, key, fingerprint, lambda: deduplicated_write(fingerprint, email, record, write))
+
+async def deduplicated_write(fingerprint: str, email: str, record: BaseModel, write):
+    previous = await submission_dedupe.claim(fingerprint, record.model_dump_json().encode("utf-8"))
+    if previous is not None:
+        return Response(previous, media_type="application/json", headers={"X-Duplicate-Submission": "true"})
+    async def release(error=None):
+        await submission_dedupe.release(fingerprint)
+
+    try:
+        await enforce_rate_limit(EMAIL_LIMIT, email)
+        await write(release)
+    except BaseException:
+        await release()
+        raise
+    return record
+
+# ==================== IDEMPOTENCY ====================
+
+# Submissions carrying an Idempotency-Key run once per key; retries within
+# the TTL get the stored response (see idempotency.py).
+IDEMPOTENCY_TTL = float(os.environ.get('IDEMPOTENCY_TTL', str(24 * 3600)))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# Built against the live client in startup_db_client
+idempotency: Optional[IdempotencyStore] = None
+
+async def idempotent_write(kind: str, key: str, fingerprint: str, write) -> Response:
+    if not 0 < len(key) <= IDEMPOTENCY_KEY_MAX_LENGTH or not key.isprintable():
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1 to {IDEMPOTENCY_KEY_MAX_LENGTH} printable characters")
+
+    async def outcome():
+        try:
+            result = await write()
+        except HTTPException as exc:
+            # A taken slot is the final answer for this request; anything else
+            # (rate limits, a full queue) is transient, so the key is released
+            # and the retry runs again.
+            if exc.status_code != 409:
+                raise
+            return exc.status_code, orjson.dumps({"detail": exc.detail})
+        if isinstance(result, Response):
+            return result.status_code, result.body
+        return 200, result.model_dump_json().encode("utf-8")
+
+    try:
+        status, body, replayed = await idempotency.run(kind, key, fingerprint, outcome)
+    except IdempotencyKeyReused:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different submission")
+    except IdempotencyInProgress:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress", headers={"Retry-After": "1"})
+    return Response(body, status_code=status, media_type="application/json", headers={"Idempotent-Replayed": "true"} if replayed else None)
+
+# ==================== RESPONSE CACHE ====================
+
+# Per-route TTLs; entries are tagged with the collection they were read from
+# so inserts can drop them (see response_cache.py).
+CACHE_RULES = [
+    CacheRule(r"^/api/(landing|testimonials|case-studies|blog-posts|services)(/[^/]+)?$", ttl=300, tags=["content"]),
+    CacheRule(r"^/api/contacts$", ttl=5, tags=["contacts"]),
+    CacheRule(r"^/api/appointments$", ttl=5, tags=["appointments"]),
+    CacheRule(r"^/api/available-times$", ttl=30, tags=["appointments"]),
+    CacheRule(r"^/api/search$", ttl=30, tags=["content", "contacts", "appointments"]),
+    # Deliberately untagged: dashboards tolerate this much lag, and a busy
+    # form would otherwise keep the pipeline report from ever being reused.
+    CacheRule(r"^/api/stats$", ttl=float(os.environ.get('STATS_CACHE_TTL', '30'))),
 ]
 
+RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory').lower()
+
+def build_cache_backend():
+    if RESPONSE_CACHE_BACKEND == 'redis':
+        return RedisBackend(os.environ.get('RESPONSE_CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+    return MemoryBackend(max_bytes=int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', str(32 * 1024 * 1024))))
+
+# Per-collection write counters shared by all forked workers, so one worker's
+# insert retires the cached reads of the others (see shared_state.py).
+data_versions = SharedCounters(["contacts", "appointments", "content"])
+# Names this lifetime of the counters in version ETags; picked here, before
+# workers fork, so every worker issues the same ETags (see conditional.py).
+data_versions_epoch = secrets.token_hex(4)
+response_cache = ResponseCache(build_cache_backend(), CACHE_RULES, versions=data_versions)
+
+# ==================== CONDITIONAL GET ====================
+
+# Reads whose body is fully determined by the request and the data versions
+# of these tags get version ETags, and If-None-Match is answered 304 before
+# the handler runs (see conditional.py). The content payloads carry their own
+# content-hash ETags; /api/stats also depends on the date, so it has none.
+CONDITIONAL_GET_ENABLED = os.environ.get('CONDITIONAL_GET_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+VERSIONED_READS = {
+    r"^/api/contacts(/export)?$": ["contacts"],
+    r"^/api/appointments(/export)?$": ["appointments"],
+    r"^/api/available-times$": ["appointments"],
+    r"^/api/search$": ["content", "contacts", "appointments"],
+}
+
+# ==================== CONTENT REGISTRY ====================
+
+# Indexed, pre-serialized snapshot of the site content and its landing
+# bundle (see content.py), replaced as a whole when a new content version is
+# published to MongoDB (see content_store.py). Handlers read ``content`` once
+# per request, so each request sees a single snapshot. Built at startup from
+# the live version rather than at import, so a cold start builds it once.
+content: Optional[ContentRegistry] = None
+CONTENT_MODELS = {"testimonials": Testimonial, "case_studies": CaseStudy, "blog_posts": BlogPost, "services": Service}
+CONTENT_POLL_INTERVAL = float(os.environ.get('CONTENT_POLL_INTERVAL', '5'))
+content_store: Optional[ContentStore] = None
+content_watcher: Optional[ContentWatcher] = None
+
+# ==================== COMPRESSION ====================
+
+# Negotiated gzip/brotli for responses over the threshold; the precomputed
+# content payloads carry their compressed bodies from startup, so only
+# dynamic responses (submission lists, exports, metrics) compress per request.
+COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+
+# ==================== LANDING BUNDLE ====================
+
+LANDING_CACHE_CONTROL = os.environ.get('LANDING_CACHE_CONTROL', 'public, max-age=300')
+
+# Bookable times on no particular date never change while the process runs
+AVAILABLE_TIMES_PAYLOAD = PrecomputedPayload({"times": AVAILABLE_TIMES})
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires; compressed responses carry W/ ETags."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+def build_landing_payload(registry: ContentRegistry) -> PrecomputedPayload:
+    return PrecomputedPayload({
+        "testimonials": [dict(record) for record in registry.testimonials.records],
+        "case_studies": [dict(record) for record in registry.case_studies.records],
+        "blog_posts": [dict(record) for record in registry.blog_posts.records],
+        "services": [dict(record) for record in registry.services.records],
+        "times": AVAILABLE_TIMES,
+    })
+
+def build_content(lists: dict, previous: Optional[ContentRegistry] = None) -> ContentRegistry:
+    """A snapshot of validated content lists, with every payload serialized and precompressed.
+
+    Payloads that did not change since ``previous`` keep its compressed bodies.
+    """
+    registry = ContentRegistry(lists["testimonials"], lists["case_studies"], lists["blog_posts"], lists["services"], previous=previous)
+    registry.landing = build_landing_payload(registry)
+    # Services the stats count by name; see stats.py
+    registry.stats_known = known_values(record["name"] for record in registry.services.records)
+    return registry
+
+def install_content(lists: dict):
+    """Build a snapshot from validated content lists and swap it in."""
+    global content
+    content = build_content(lists, content)
+
+async def content_published(lists: dict):
+    global content
+    # Serializing and compressing takes milliseconds; built off the event
+    # loop so reads keep being served, then swapped in on it.
+    content = await asyncio.to_thread(build_content, lists, content)
+    await response_cache.invalidate("content")
+
+def precomputed_response(request: Request, payload: PrecomputedPayload, cache_control: Optional[str] = None) -> Response:
+    body, etag, coding = payload.body, payload.etag, None
+    if COMPRESSION_ENABLED and payload.encoded and len(payload.body) >= COMPRESSION_MIN_SIZE:
+        coding = negotiate(request.headers.get("accept-encoding", ""), payload.encoded)
+        if coding:
+            body, etag = payload.encoded[coding]
+    headers = {"ETag": etag}
+    if payload.encoded:
+        headers["Vary"] = "Accept-Encoding"
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if coding:
+        headers["Content-Encoding"] = coding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# ==================== PAGINATION & EXPORT ====================
+
+EXPORT_BATCH_SIZE = 500
+
+# Stored submissions were validated by their model on write, so by default the
+# list endpoints hand them straight to orjson instead of re-validating every
+# row through response_model. Set TRUSTED_READS=false to re-validate.
+TRUSTED_READS = os.environ.get('TRUSTED_READS', 'true').lower() not in ('0', 'false', 'no')
+
+# Internal bookkeeping fields that are not part of the response models
+READ_PROJECTION = {"_id": 0, "slot_held": 0}
+
+CONTACT_EXPORT_FIELDS = ["id", "name", "email", "phone", "services", "reason", "message", "created_at"]
+APPOINTMENT_EXPORT_FIELDS = ["id", "name", "email", "phone", "date", "time", "services", "reason", "message", "status", "created_at"]
+
+def encode_cursor(doc: dict) -> str:
+    created_at = doc["created_at"]
+    if isinstance(created_at, str):
+        # Written by an older release after migration 0001 ran (rolling deploy)
+        created_at = parse_created_at(created_at)
+    raw = json.dumps([created_at.isoformat(), doc["id"]])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        created_at = datetime.fromisoformat(created_at)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": doc_id}},
+    ]}
+
+async def fetch_page(collection, limit: int, after: Optional[str]):
+    query = decode_cursor(after) if after else {}
+    # One row past the page tells whether another page exists
+    docs = await collection.find(query, READ_PROJECTION).sort(PAGE_SORT).limit(limit + 1).to_list(limit + 1)
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1])
+
+def page_response(response: Response, docs: list, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if not TRUSTED_READS:
+        return docs
+    return FastJSONResponse(docs, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        return ";".join(str(v) for v in value)
+    return "" if value is None else value
+
+async def _export_rows(collection, fmt: str, fields: List[str], after: Optional[str]):
+    query = decode_cursor(after) if after else {}
+    cursor = collection.find(query, READ_PROJECTION).sort(PAGE_SORT).batch_size(EXPORT_BATCH_SIZE)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(fields)
+    pending = 0
+    async for doc in cursor:
+        if fmt == "csv":
+            writer.writerow([_export_value(doc.get(field)) for field in fields])
+        else:
+            buffer.write(orjson.dumps(doc, option=orjson.OPT_UTC_Z | orjson.OPT_APPEND_NEWLINE).decode("utf-8"))
+        pending += 1
+        if pending >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def export_response(collection, fmt: str, fields: List[str], filename: str, after: Optional[str]) -> StreamingResponse:
+    if after:
+        decode_cursor(after)  # reject a bad cursor before the response starts
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_rows(collection, fmt, fields, after),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
+
+# ==================== SEARCH ====================
+
+# Content is ranked by the in-memory index the registry builds, submissions by
+# the MongoDB text index (see search.py). Ranked results page by offset, so
+# depth is capped: a deep page would otherwise score and skip every match
+# before it.
+SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', '1000'))
+
+def encode_offset_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([offset]).encode("utf-8")).decode("ascii")
+
+def decode_offset_cursor(cursor: str) -> int:
+    try:
+        offset, = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(offset, int) or offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset
+
+# ==================== BULK IMPORT ====================
+
+# Uploads are streamed and written in chunks (see bulk_import.py), straight
+# to MongoDB rather than through the write-behind queue.
+BULK_IMPORT_CHUNK_SIZE = int(os.environ.get('BULK_IMPORT_CHUNK_SIZE', '1000'))
+BULK_IMPORT_MAX_ROW_SIZE = int(os.environ.get('BULK_IMPORT_MAX_ROW_SIZE', str(64 * 1024)))
+BULK_IMPORT_MAX_ERRORS = 1000
+# Rows are not charged to the per-email limits, so imports are back-office
+# only: requests must send ``X-Import-Token: <BULK_IMPORT_TOKEN>``, and with no
+# token configured the endpoints are off.
+BULK_IMPORT_TOKEN = os.environ.get('BULK_IMPORT_TOKEN')
+NDJSON_MEDIA_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/json-lines')
+
+async def authorize_import(request: Request):
+    # Charged first, so guessing the token is rate-limited too
+    await enforce_rate_limit(IP_LIMIT, client_ip(request))
+    if not BULK_IMPORT_TOKEN:
+        raise HTTPException(status_code=403, detail="Bulk import is disabled")
+    token = request.headers.get('x-import-token', '')
+    if not hmac.compare_digest(token.encode('utf-8'), BULK_IMPORT_TOKEN.encode('utf-8')):
+        raise HTTPException(status_code=401, detail="Invalid import token")
+
+def bulk_records(request: Request, fmt: Optional[str]):
+    if fmt is None:
+        media_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+        if media_type == 'text/csv':
+            fmt = 'csv'
+        elif media_type in NDJSON_MEDIA_TYPES:
+            fmt = 'ndjson'
+        else:
+            raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson, or pass ?format=")
+    if fmt == 'csv':
+        return csv_records(request.stream(), BULK_IMPORT_MAX_ROW_SIZE, list_fields=['services'])
+    return ndjson_records(request.stream(), BULK_IMPORT_MAX_ROW_SIZE)
+
+def import_dedupe(kind: str):
+    """``claim``/``release`` for BulkImporter: imported rows share the dedupe window of single submissions."""
+    async def claim(input: BaseModel, doc: dict) -> bool:
+        body = orjson.dumps({field: value for field, value in doc.items() if field != "slot_held"}, option=orjson.OPT_UTC_Z)
+        return await submission_dedupe.claim(submission_fingerprint(kind, input), body) is None
+
+    async def release(input: BaseModel):
+        await submission_dedupe.release(submission_fingerprint(kind, input))
+
+    return claim, release
+
+async def run_bulk_import(request: Request, fmt: Optional[str], collection_name: str, model, build_doc, on_chunk, **options) -> dict:
+    claim, release = import_dedupe(collection_name)
+    importer = BulkImporter(
+        db[collection_name],
+        model,
+        build_doc,
+        chunk_size=BULK_IMPORT_CHUNK_SIZE,
+        max_errors=BULK_IMPORT_MAX_ERRORS,
+        claim=claim,
+        release=release,
+        **options,
+    )
+    try:
+        return await importer.run(bulk_records(request, fmt), on_chunk=on_chunk)
+    except BulkImportError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+# Rows are already validated by the *Create models; model_construct only adds
+# the id/created_at defaults instead of re-running email validation.
+def build_contact_doc(input: ContactSubmissionCreate) -> dict:
+    return ContactSubmission.model_construct(**input.model_dump()).model_dump()
+
+def build_appointment_doc(input: AppointmentRequestCreate) -> dict:
+    if input.time not in AVAILABLE_TIMES:
+        raise ValueError("Requested time is not a bookable slot")
+    doc = AppointmentRequest.model_construct(**input.model_dump()).model_dump()
+    doc["slot_held"] = True
+    return doc
+
 # ==================== ROUTES ====================
 
 @api_router.get("/")
 async def root():
     return {"message": "Lumis API - Illuminating the Future of IT"}
 
+# Readiness probe: answers from process state only, never MongoDB, so probing
+# it often costs nothing. 503 while shutting down.
+@api_router.get("/ready")
+async def readiness():
+    if not ready:
+        raise HTTPException(status_code=503, detail="Not ready", headers={"Retry-After": "1"})
+    return {"status": "ready", "content_version": content_watcher.version}
+
+# Landing page bundle (all static content in one precomputed response)
+@api_router.get("/landing")
+async def get_landing(request: Request):
+    return precomputed_response(request, content.landing, LANDING_CACHE_CONTROL)
+
 # Contact Form
 @api_router.post("/contact", response_model=ContactSubmission)
-async def submit_contact(input: ContactSubmissionCreate):
+async def submit_contact(request: Request, input: ContactSubmissionCreate):
     contact_dict = input.model_dump()
     contact_obj = ContactSubmission(**contact_dict)
     
     doc = contact_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    
-    await db.contacts.insert_one(doc)
-    return contact_obj
+    return await guarded_submission(
+        request, "contacts", input, contact_obj, lambda on_error: insert_submission("contacts", doc, on_error=on_error),
+    )
 
 @api_router.get("/contacts", response_model=List[ContactSubmission])
-async def get_contacts():
-    contacts = await db.contacts.find({}, {"_id": 0}).to_list(100)
-    for contact in contacts:
-        if isinstance(contact.get('created_at'), str):
-            contact['created_at'] = datetime.fromisoformat(contact['created_at'])
-    return contacts
+async def get_contacts(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = None,
+):
+    contacts, next_cursor = await fetch_page(db.contacts, limit, after)
+    return page_response(response, contacts, next_cursor)
+
+@api_router.post("/contacts/bulk")
+async def import_contacts(request: Request, format: Optional[str] = Query(None, pattern="^(ndjson|csv)$")):
+    await authorize_import(request)
+    async def imported(docs):
+        # Imports are back-office loads, not new enquiries to announce.
+        await submissions_written("contacts", docs, notify=False)
+    return await run_bulk_import(request, format, "contacts", ContactSubmissionCreate, build_contact_doc, imported)
+
+@api_router.get("/contacts/export")
+async def export_contacts(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    after: Optional[str] = None,
+):
+    return export_response(db.contacts, format, CONTACT_EXPORT_FIELDS, "contacts", after)
 
 # Appointments
 @api_router.post("/appointments", response_model=AppointmentRequest)
-async def create_appointment(input: AppointmentRequestCreate):
+async def create_appointment(request: Request, input: AppointmentRequestCreate):
+    if input.time not in AVAILABLE_TIMES:
+        raise HTTPException(status_code=400, detail="Requested time is not a bookable slot")
     appointment_dict = input.model_dump()
     appointment_obj = AppointmentRequest(**appointment_dict)
     
     doc = appointment_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    
-    await db.appointments.insert_one(doc)
-    return appointment_obj
+
+    async def book(on_error):
+        # Waits for the insert, so a failure is raised here instead
+        try:
+            await availability.book(doc, insert=lambda d: insert_submission("appointments", d, wait=True))
+        except SlotUnavailableError:
+            raise HTTPException(status_code=409, detail="This time slot is already booked")
+
+    return await guarded_submission(request, "appointments", input, appointment_obj, book)
 
 @api_router.get("/appointments", response_model=List[AppointmentRequest])
-async def get_appointments():
-    appointments = await db.appointments.find({}, {"_id": 0}).to_list(100)
-    for apt in appointments:
-        if isinstance(apt.get('created_at'), str):
-            apt['created_at'] = datetime.fromisoformat(apt['created_at'])
-    return appointments
+async def get_appointments(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = None,
+):
+    appointments, next_cursor = await fetch_page(db.appointments, limit, after)
+    return page_response(response, appointments, next_cursor)
+
+@api_router.post("/appointments/bulk")
+async def import_appointments(request: Request, format: Optional[str] = Query(None, pattern="^(ndjson|csv)$")):
+    await authorize_import(request)
+    async def imported(docs):
+        for date in {doc["date"] for doc in docs}:
+            availability.invalidate(date)
+        await submissions_written("appointments", docs, notify=False)
+    return await run_bulk_import(
+        request, format, "appointments", AppointmentRequestCreate, build_appointment_doc, imported,
+        duplicate_message="This time slot is already booked",
+    )
+
+@api_router.get("/appointments/export")
+async def export_appointments(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    after: Optional[str] = None,
+):
+    return export_response(db.appointments, format, APPOINTMENT_EXPORT_FIELDS, "appointments", after)
+
+# Live feed of new contacts and appointments as server-sent events
+@api_router.get("/submissions/stream")
+async def stream_submissions(last_event_id: Optional[str] = Header(None)):
+    resume_after = None
+    if last_event_id:
+        try:
+            resume_after = parse_event_id(last_event_id)
+        except InvalidEventId:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    if submission_feed.full:
+        raise HTTPException(status_code=503, detail="Too many open streams", headers={"Retry-After": "5"})
+    return StreamingResponse(
+        submission_feed.frames(resume_after),
+        media_type="text/event-stream",
+        # no-transform keeps CompressionMiddleware and proxies from holding frames back
+        headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"},
+    )
 
 # Testimonials (static data)
 @api_router.get("/testimonials", response_model=List[Testimonial])
-async def get_testimonials():
-    return TESTIMONIALS
+async def get_testimonials(request: Request):
+    return precomputed_response(request, content.testimonials.all)
+
+@api_router.get("/testimonials/{testimonial_id}", response_model=Testimonial)
+async def get_testimonial(request: Request, testimonial_id: str):
+    payload = content.testimonials.get(testimonial_id)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Testimonial not found")
+    return precomputed_response(request, payload)
 
 # Case Studies (static data)
 @api_router.get("/case-studies")
-async def get_case_studies():
-    return CASE_STUDIES
+async def get_case_studies(request: Request, industry: Optional[str] = None):
+    if industry is not None:
+        return precomputed_response(request, content.case_studies.filtered("industry", industry))
+    return precomputed_response(request, content.case_studies.all)
 
 @api_router.get("/case-studies/{case_study_id}")
-async def get_case_study(case_study_id: str):
-    for cs in CASE_STUDIES:
-        if cs["id"] == case_study_id:
-            return cs
-    raise HTTPException(status_code=404, detail="Case study not found")
+async def get_case_study(request: Request, case_study_id: str):
+    payload = content.case_studies.get(case_study_id)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Case study not found")
+    return precomputed_response(request, payload)
+
+@api_router.get("/case-studies/{case_study_id}/pdf")
+async def get_case_study_pdf(request: Request, case_study_id: str):
+    case_study = content.case_studies.by_id.get(case_study_id)
+    if case_study is None or not case_study.get("pdf_filename"):
+        raise HTTPException(status_code=404, detail="Case study not found")
+    filename = case_study["pdf_filename"]
+    path = CASE_STUDY_PDF_DIR / Path(filename).name
+    try:
+        return file_response(request, path, "application/pdf", filename=filename)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Case study PDF not available")
 
 # Blog Posts (static data)
 @api_router.get("/blog-posts")
-async def get_blog_posts():
-    return BLOG_POSTS
+async def get_blog_posts(request: Request, category: Optional[str] = None):
+    if category is not None:
+        return precomputed_response(request, content.blog_posts.filtered("category", category))
+    return precomputed_response(request, content.blog_posts.all)
+
+@api_router.get("/blog-posts/{post_id}")
+async def get_blog_post(request: Request, post_id: str):
+    payload = content.blog_posts.get(post_id)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Blog post not found")
+    return precomputed_response(request, payload)
 
 # Services (static data)
 @api_router.get("/services")
-async def get_services():
-    return SERVICES
+async def get_services(request: Request):
+    return precomputed_response(request, content.services.all)
+
+@api_router.get("/services/{service_id}")
+async def get_service(request: Request, service_id: str):
+    payload = content.services.get(service_id)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Service not found")
+    return precomputed_response(request, payload)
+
+@api_router.get("/search")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    scope: str = Query("content", pattern="^(content|contacts|appointments)$"),
+    limit: int = Query(20, ge=1, le=100),
+    after: Optional[str] = None,
+):
+    offset = decode_offset_cursor(after) if after else 0
+    limit = min(limit, SEARCH_MAX_RESULTS - offset)
+    if limit <= 0:
+        return FastJSONResponse([])
+    if scope == "content":
+        hits, more = content.search.search(q, limit, offset)
+    else:
+        hits, more = await search_submissions(db[scope], q, limit, offset, READ_PROJECTION)
+    next_offset = offset + limit
+    more = more and next_offset < SEARCH_MAX_RESULTS
+    return FastJSONResponse(hits, headers={"X-Next-Cursor": encode_offset_cursor(next_offset)} if more else None)
+
+# Daily submission counts with service/reason/status breakdowns. The default
+# reads the incremental counters (one document per day); source=pipeline
+# aggregates the submissions themselves.
+@api_router.get("/stats")
+async def get_stats(
+    days: int = Query(30, ge=1, le=366),
+    source: str = Query("counters", pattern="^(counters|pipeline)$"),
+):
+    since = window_start(days)
+    result = {"since": since.isoformat(), "days": days, "source": source}
+    for kind in ("contacts", "appointments"):
+        if source == "pipeline":
+            result[kind] = report(kind, await daily_counts(db[kind], kind, since, known=content.stats_known))
+        else:
+            result[kind] = await submission_stats.summary(kind, since)
+    return FastJSONResponse(result)
+
+# Connection pool metrics
+@api_router.get("/metrics/pool")
+async def get_pool_metrics():
+    return pool_metrics.snapshot()
+
+# Response cache metrics
+@api_router.get("/metrics/cache")
+async def get_cache_metrics():
+    return response_cache.stats()
+
+# Prometheus exposition of request, MongoDB, pool, cache and event-loop metrics
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
 # Available time slots for appointments
 @api_router.get("/available-times")
-async def get_available_times():
-    return {
-        "times": [
-            "09:00 AM",
-            "10:00 AM",
-            "11:00 AM",
-            "12:00 PM",
-            "01:00 PM",
-            "02:00 PM",
-            "03:00 PM",
-            "04:00 PM",
-            "05:00 PM"
-        ]
-    }
+async def get_available_times(request: Request, date: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$")):
+    if date is None:
+        return precomputed_response(request, AVAILABLE_TIMES_PAYLOAD)
+    return {"date": date, "times": await availability.free_slots(date)}
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Inside the response cache, so cached entries hold compressed bodies
+# (the cache key includes Accept-Encoding) and hits cost no compression.
+if COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=COMPRESSION_MIN_SIZE,
+        gzip_level=int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6')),
+        brotli_quality=int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '4')),
+    )
+if RESPONSE_CACHE_BACKEND != 'off':
+    app.add_middleware(ResponseCacheMiddleware, cache=response_cache)
+# Outside the cache, so a revalidation costs no cache lookup either
+if CONDITIONAL_GET_ENABLED:
+    # Content is installed per worker on its own poll, so its part of the
+    # validator names the snapshot this worker serves, not the shared counter.
+    app.add_middleware(ConditionalGetMiddleware, versions=data_versions, rules=VERSIONED_READS, epoch=data_versions_epoch,
+                       local={"content": lambda: content.digest})
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Age", "X-Cache", "Retry-After", "Idempotent-Replayed"],
 )
 
+# Outermost, so the timings include every other middleware
+if os.environ.get('METRICS_ENABLED', 'true').lower() not in ('0', 'false', 'no'):
+    if os.environ.get('PROFILE_TOKEN') or float(os.environ.get('PROFILE_SAMPLE_RATE', '0')) > 0:
+        app.add_middleware(
+            ProfilingMiddleware,
+            output_dir=Path(os.environ.get('PROFILE_DIR', ROOT_DIR / 'profiles')),
+            token=os.environ.get('PROFILE_TOKEN'),
+            sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', '0')),
+            slow_ms=float(os.environ.get('PROFILE_SLOW_MS', '0')),
+        )
+    # Streams stay open for minutes; their subscribers are a gauge instead.
+    app.add_middleware(MetricsMiddleware, exclude=["/api/metrics", "/api/ready", SUBMISSION_STREAM_PATH])
+
+def runtime_metrics():
+    pool = pool_metrics.snapshot()
+    cache = response_cache.stats()
+    yield "lumis_mongo_pool_connections_in_use", "gauge", "Pooled MongoDB connections checked out.", pool["in_use"]
+    yield "lumis_mongo_pool_connections_open", "gauge", "Open pooled MongoDB connections.", pool["open"]
+    yield "lumis_mongo_pool_checkouts_total", "counter", "Connection checkouts.", pool["checkouts"]
+    yield "lumis_mongo_pool_checkout_failures_total", "counter", "Failed connection checkouts.", pool["checkout_failures"]
+    yield "lumis_mongo_pool_checkout_wait_seconds_total", "counter", "Time spent waiting for a pooled connection.", pool["wait_seconds_total"]
+    yield "lumis_mongo_pool_checkout_wait_seconds_max", "gauge", "Longest wait for a pooled connection.", pool["wait_seconds_max"]
+    yield "lumis_startup_seconds", "gauge", "Time from the start of lifespan startup to ready.", startup_seconds
+    yield "lumis_response_cache_hits_total", "counter", "Response cache hits.", cache["hits"]
+    yield "lumis_response_cache_misses_total", "counter", "Response cache misses.", cache["misses"]
+    yield "lumis_response_cache_evictions_total", "counter", "Response cache LRU evictions.", cache["evictions"]
+    if idempotency is not None:
+        yield "lumis_idempotency_replays_total", "counter", "Submissions answered with the stored response for their Idempotency-Key.", idempotency.replayed
+    if write_queue is not None:
+        yield "lumis_write_behind_backlog", "gauge", "Submissions waiting in the write-behind queue.", write_queue.backlog
+    if content_watcher is not None:
+        yield "lumis_content_version", "gauge", "Content version being served.", content_watcher.version or 0
+        yield "lumis_content_reloads_total", "counter", "Content snapshots installed.", content_watcher.reloads
+        yield "lumis_content_reload_seconds", "gauge", "Time to load, validate and install the last snapshot.", content_watcher.last_reload_seconds
+    if submission_feed is not None:
+        yield "lumis_submission_streams", "gauge", "Open submission event streams.", len(submission_feed.subscribers)
+        yield "lumis_submission_stream_events_total", "counter", "Submissions fanned out to the streams.", submission_feed.events
+        yield "lumis_submission_stream_dropped_total", "counter", "Streams closed for falling too far behind.", submission_feed.dropped
+    if notifier is not None:
+        yield "lumis_notifications_backlog", "gauge", "Notification jobs waiting for a worker.", notifier.backlog
+        yield "lumis_notifications_delivered_total", "counter", "Notifications delivered.", notifier.delivered
+        yield "lumis_notifications_retried_total", "counter", "Notification attempts that failed and were rescheduled.", notifier.retried
+        yield "lumis_notifications_failed_total", "counter", "Notifications given up on after the last attempt.", notifier.failed
+
+metrics_registry.add_collector(runtime_metrics)
+loop_lag_monitor = LoopLagMonitor()
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -369,6 +986,107 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
+# ==================== STARTUP ====================
+
+# Set once startup has finished and cleared when shutdown begins (see /api/ready).
+ready = False
+startup_seconds = 0.0
+# Startup work the first request does not need, run once the app is serving
+deferred_startup: Optional[asyncio.Task] = None
+
+async def check_query_plans(mode: str):
+    try:
+        await verify_query_plans(db, mode)
+    except Exception:
+        logger.exception("Query plan check failed")
+
+async def startup_db_client():
+    global client, db, availability, write_queue, submission_stats, notifier, content_store, content_watcher, idempotency
+    global submission_feed
+    global ready, startup_seconds, deferred_startup
+    started = time.perf_counter()
+    mongo_url = os.environ['MONGO_URL']
+    client = create_client(mongo_url)
+    db = client[os.environ['DB_NAME']]
+    if not mongo_url.startswith(STAND_IN_SCHEME):
+        await warm_pool(client)
+    loop_lag_monitor.start()
+
+    await run_migrations(db)
+    await ensure_indexes(db)
+    plan_check = os.environ.get('INDEX_PLAN_CHECK', 'warn')
+    if plan_check == 'fail':
+        await verify_query_plans(db, plan_check)
+    elif plan_check != 'off':
+        # Only logs, so explaining every query shape need not delay serving
+        deferred_startup = asyncio.create_task(check_query_plans(plan_check), name="query-plan-check")
+
+    content_store = ContentStore(db, CONTENT_MODELS)
+    if await content_store.ensure_seeded(load_seed()):
+        logger.info("Published the seed content as version 1")
+    content_watcher = ContentWatcher(content_store, content_published, interval=CONTENT_POLL_INTERVAL)
+    await content_watcher.refresh()
+    if content is None:
+        # The live version was rejected; serve the seed file until a valid one is published.
+        await content_published(validate(CONTENT_MODELS, load_seed()))
+    content_watcher.start()
+
+    submission_stats = SubmissionStats(db.submission_stats, lambda: content.stats_known)
+    idempotency = IdempotencyStore(db.idempotency_keys, ttl=IDEMPOTENCY_TTL)
+    availability = AvailabilityEngine(
+        db.appointments,
+        AVAILABLE_TIMES,
+        ttl=float(os.environ.get('AVAILABILITY_CACHE_TTL', '30')),
+        version=lambda: data_versions.get("appointments"),
+    )
+    sinks = build_notification_sinks()
+    if sinks:
+        notifier = Notifier(
+            db.notification_outbox,
+            sinks,
+            workers=int(os.environ.get('NOTIFY_WORKERS', '4')),
+            max_attempts=int(os.environ.get('NOTIFY_MAX_ATTEMPTS', '8')),
+            backoff=float(os.environ.get('NOTIFY_RETRY_BACKOFF', '2')),
+        )
+        notifier.start()
+    submission_feed = SubmissionFeed(
+        db,
+        data_versions,
+        READ_PROJECTION,
+        buffer=int(os.environ.get('SUBMISSION_STREAM_BUFFER', '256')),
+        max_subscribers=int(os.environ.get('SUBMISSION_STREAM_MAX_CLIENTS', '5000')),
+        heartbeat=float(os.environ.get('SUBMISSION_STREAM_HEARTBEAT', '15')),
+        poll_interval=float(os.environ.get('SUBMISSION_STREAM_POLL_INTERVAL', '1')),
+    )
+    submission_feed.start()
+    if WRITE_BEHIND_ENABLED:
+        write_queue = WriteBehindQueue(
+            db,
+            max_batch=int(os.environ.get('WRITE_BEHIND_MAX_BATCH', '500')),
+            flush_interval=float(os.environ.get('WRITE_BEHIND_FLUSH_MS', '50')) / 1000,
+            max_backlog=int(os.environ.get('WRITE_BEHIND_MAX_BACKLOG', '10000')),
+            on_flush=submissions_written,
+        )
+        write_queue.start()
+    ready = True
+    startup_seconds = time.perf_counter() - started
+    logger.info("Ready in %.1f ms", startup_seconds * 1000)
+
 async def shutdown_db_client():
+    global ready
+    ready = False
+    if deferred_startup is not None:
+        deferred_startup.cancel()
+        await asyncio.gather(deferred_startup, return_exceptions=True)
+    if write_queue is not None:
+        await write_queue.drain()
+    if submission_feed is not None:
+        await submission_feed.stop()
+    if notifier is not None:
+        await notifier.stop()
+    if content_watcher is not None:
+        await content_watcher.stop()
+    await response_cache.backend.close()
+    await rate_limit_store.close()
+    await loop_lag_monitor.stop()
     client.close()
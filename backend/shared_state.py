@@ -0,0 +1,46 @@
+"""Version counters shared by every worker forked from one process.
+
+In-process caches are per worker, so a write served by one worker must be
+visible to the caches of the others. ``SharedCounters`` keeps one 64-bit
+counter per name in an anonymous shared memory mapping guarded by a
+process-shared lock. Create it at import time and fork the workers
+afterwards (gunicorn's ``preload_app``, see ``gunicorn.conf.py``), and a bump
+in any worker is seen by all of them. Caches record the counter value with
+each entry and treat the entry as stale once the value has moved on.
+
+Processes that import the module separately (``uvicorn --workers`` spawns
+rather than forks) each get their own mapping, and then only the cache TTLs
+bound staleness.
+"""
+import mmap
+import multiprocessing
+import struct
+from typing import Iterable, Sequence, Tuple
+
+_COUNTER = struct.Struct("=Q")
+
+
+class SharedCounters:
+    def __init__(self, names: Iterable[str]):
+        self.names = tuple(dict.fromkeys(names))
+        self._offsets = {name: index * _COUNTER.size for index, name in enumerate(self.names)}
+        self._map = mmap.mmap(-1, max(len(self.names), 1) * _COUNTER.size)
+        self._lock = multiprocessing.Lock()
+
+    def get(self, name: str) -> int:
+        """Current value of ``name``; names that were never declared read as 0."""
+        offset = self._offsets.get(name)
+        return 0 if offset is None else _COUNTER.unpack_from(self._map, offset)[0]
+
+    def snapshot(self, names: Sequence[str]) -> Tuple[int, ...]:
+        return tuple(self.get(name) for name in names)
+
+    def bump(self, name: str) -> int:
+        """Increment ``name`` for every process sharing the mapping; undeclared names are ignored."""
+        offset = self._offsets.get(name)
+        if offset is None:
+            return 0
+        with self._lock:
+            value = _COUNTER.unpack_from(self._map, offset)[0] + 1
+            _COUNTER.pack_into(self._map, offset, value)
+        return value
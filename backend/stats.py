@@ -0,0 +1,173 @@
+"""Submission analytics: incremental daily counters and aggregation pipelines.
+
+``SubmissionStats`` keeps one counter document per collection and UTC day in
+``submission_stats``: the day's total plus a count per value of each
+breakdown field (``BREAKDOWNS``). Writers call ``record`` with the documents
+they inserted, one ``$inc`` upsert per day touched, and ``summary`` reads one
+document per day of the window, so the dashboard costs the same whatever the
+size of the collections.
+
+``daily_counts`` computes the same per-day documents from the submissions
+themselves: ``$match`` on ``created_at`` (served by the ``created_at_id``
+index), then a ``$facet`` of ``$group`` stages that ``$unwind`` each
+breakdown field, so a service list counts once per service. It backs the
+``?source=pipeline`` report and ``rebuild``, which resets the counters from
+the source of truth (after a backfill, or if a process died between an
+insert and its ``record``).
+
+Breakdown values are counted by name only when they are in the ``known``
+vocabulary (``known_values``: the live service names and fixed reasons and
+statuses); anything else, empty strings included, counts as ``OTHER``. The
+values come from submitters, so counting them verbatim would let anyone add
+fields to a counter document without bound.
+"""
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Collection, Dict, Iterable, List, Mapping, Optional
+from urllib.parse import unquote
+
+from pymongo import UpdateOne
+
+# Counted values per collection; a list field counts each of its items, a
+# missing or null field counts nothing.
+BREAKDOWNS = {
+    "contacts": ("services", "reason"),
+    "appointments": ("services", "reason", "status"),
+}
+
+OTHER = "other"
+# The options the contact form offers, and the appointment lifecycle
+REASONS = frozenset(["New Project Inquiry", "Technical Consultation", "Partnership Opportunity", "General Question", "Other"])
+STATUSES = frozenset(["pending", "confirmed", "cancelled"])
+
+Known = Mapping[str, Collection[str]]
+
+_DAY = {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}
+
+
+def known_values(services: Iterable[str]) -> Dict[str, frozenset]:
+    """The values counted by name per breakdown field, given the offered service names."""
+    return {"services": frozenset(services), "reason": REASONS, "status": STATUSES}
+
+
+def _day(created_at: datetime) -> str:
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date().isoformat()
+
+
+def _key(value, known: Collection[str]) -> str:
+    if not isinstance(value, str) or value not in known:
+        return OTHER
+    # Values become field names inside the counter documents, where "." and
+    # "$" are path and operator syntax.
+    return value.replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+
+def _values(value) -> Iterable:
+    if value is None:
+        return ()
+    return value if isinstance(value, list) else (value,)
+
+
+def window_start(days: int, today: Optional[date] = None) -> date:
+    """First UTC day of a ``days``-long window ending today."""
+    return (today or datetime.now(timezone.utc).date()) - timedelta(days=days - 1)
+
+
+def report(kind: str, daily: Iterable[dict]) -> dict:
+    """Window totals plus the per-day rows, oldest first, from counter-shaped documents."""
+    fields = BREAKDOWNS[kind]
+    totals = {field: Counter() for field in fields}
+    by_day = []
+    for doc in sorted(daily, key=lambda doc: doc["day"]):
+        row = {"day": doc["day"], "total": doc.get("total", 0)}
+        for field in fields:
+            counts = {unquote(value): count for value, count in doc.get(field, {}).items() if count}
+            totals[field].update(counts)
+            row[field] = counts
+        by_day.append(row)
+    return {
+        "total": sum(row["total"] for row in by_day),
+        **{field: dict(totals[field].most_common()) for field in fields},
+        "by_day": by_day,
+    }
+
+
+async def daily_counts(collection, kind: str, since: Optional[date] = None, *, known: Known) -> List[dict]:
+    """Counter-shaped documents for every day since ``since``, aggregated from the submissions."""
+    fields = BREAKDOWNS[kind]
+    pipeline = []
+    if since is not None:
+        start = datetime.combine(since, datetime.min.time(), tzinfo=timezone.utc)
+        pipeline.append({"$match": {"created_at": {"$gte": start}}})
+    pipeline += [
+        {"$project": {"_id": 0, "day": _DAY, **{field: 1 for field in fields}}},
+        {"$facet": {
+            "total": [{"$group": {"_id": "$day", "count": {"$sum": 1}}}],
+            **{
+                field: [
+                    {"$unwind": f"${field}"},
+                    {"$group": {"_id": {"day": "$day", "value": f"${field}"}, "count": {"$sum": 1}}},
+                ]
+                for field in fields
+            },
+        }},
+    ]
+    facets = (await collection.aggregate(pipeline).to_list(1))[0]
+    days: Dict[str, dict] = {}
+    for group in facets["total"]:
+        days[group["_id"]] = {"_id": f"{kind}:{group['_id']}", "kind": kind, "day": group["_id"], "total": group["count"],
+                              **{field: {} for field in fields}}
+    for field in fields:
+        for group in facets[field]:
+            counts = days[group["_id"]["day"]][field]
+            key = _key(group["_id"]["value"], known.get(field, ()))
+            counts[key] = counts.get(key, 0) + group["count"]
+    return list(days.values())
+
+
+class SubmissionStats:
+    """Daily counters in ``collection``; ``known`` returns the current vocabulary (see ``known_values``)."""
+
+    def __init__(self, collection, known: Callable[[], Known]):
+        self.collection = collection
+        self.known = known
+
+    async def record(self, kind: str, docs: Iterable[dict]):
+        """Count freshly inserted ``docs`` of ``kind``; one upsert per day they fall on."""
+        fields = BREAKDOWNS.get(kind)
+        if fields is None:
+            return
+        known = self.known()
+        increments: Dict[str, Counter] = defaultdict(Counter)
+        for doc in docs:
+            counts = increments[_day(doc["created_at"])]
+            counts["total"] += 1
+            for field in fields:
+                for value in _values(doc.get(field)):
+                    counts[f"{field}.{_key(value, known.get(field, ()))}"] += 1
+        if not increments:
+            return
+        await self.collection.bulk_write([
+            UpdateOne(
+                {"_id": f"{kind}:{day}"},
+                {"$inc": dict(counts), "$setOnInsert": {"kind": kind, "day": day}},
+                upsert=True,
+            )
+            for day, counts in increments.items()
+        ], ordered=False)
+
+    async def summary(self, kind: str, since: date) -> dict:
+        # Counter ids sort by day within a kind, so the window is an _id range.
+        cursor = self.collection.find({"_id": {"$gte": f"{kind}:{since.isoformat()}", "$lte": f"{kind}:9999-12-31"}})
+        return report(kind, await cursor.to_list(None))
+
+    async def rebuild(self, db):
+        """Replace every counter with the totals aggregated from the submissions."""
+        known = self.known()
+        for kind in BREAKDOWNS:
+            docs = await daily_counts(db[kind], kind, known=known)
+            await self.collection.delete_many({"kind": kind})
+            if docs:
+                await self.collection.insert_many(docs)
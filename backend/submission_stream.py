@@ -0,0 +1,267 @@
+"""Live feed of new submissions for server-sent event streams.
+
+``SubmissionFeed`` follows new contacts and appointments from one upstream
+per worker and fans every submission out to all open streams as a single
+pre-rendered SSE frame, so a subscriber costs no queries. Submissions
+written by this worker are published as they are stored (``publish``, from
+the write path). Those written elsewhere arrive through a change stream on
+the database where the deployment has one (replica sets); otherwise the feed
+reads them from MongoDB every ``poll_interval`` seconds, but only after the
+shared version counters show another write, so an idle feed issues no
+queries. Repeats between the two are dropped by event id.
+
+Each subscriber has a buffer of at most ``buffer`` frames. A client that
+falls that far behind (a stalled connection holds up its sends) is
+disconnected instead of being buffered without limit. It reconnects with
+``Last-Event-ID`` and catches up from MongoDB. Event ids are
+``<created_at in ms>-<submission id>``, so a stream can resume on any worker
+and after a restart: the submissions created from ``resume_grace`` seconds
+before that id onwards are replayed. The grace covers submissions stored
+slightly out of creation order (write-behind batches, concurrent requests),
+so a resumed stream may repeat a few events; ``data.id`` identifies the
+submission. A client more than ``replay_limit`` submissions behind gets a
+``reset`` event instead, carrying the newest id, and should reload the lists.
+
+An idle subscriber is a small deque and an ``asyncio.Event``. One task sends
+every stream a comment line each ``heartbeat`` seconds, which keeps proxies
+from closing quiet connections and lets the server notice dead clients.
+"""
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+import orjson
+from pymongo import ASCENDING
+
+from indexes import PAGE_SORT
+from migrations import parse_created_at
+from notifications import EVENT_TYPES
+from shared_state import SharedCounters
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("contacts", "appointments")
+REPLAY_SORT = [("created_at", ASCENDING), ("id", ASCENDING)]
+HEARTBEAT_FRAME = b": keepalive\n\n"
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MILLISECOND = timedelta(milliseconds=1)
+
+
+class InvalidEventId(ValueError):
+    """Raised for a ``Last-Event-ID`` this feed did not issue."""
+
+
+def event_id(doc: dict) -> str:
+    created_at = doc["created_at"]
+    if isinstance(created_at, str):
+        # Written by an older release during a rolling deploy
+        created_at = parse_created_at(created_at)
+    # Integer arithmetic: MongoDB keeps milliseconds, and a float timestamp
+    # of the in-memory microsecond value can round to a different one.
+    return f"{(created_at - _EPOCH) // _MILLISECOND}-{doc['id']}"
+
+
+def parse_event_id(value: str) -> Tuple[datetime, str]:
+    millis, separator, doc_id = value.partition("-")
+    if not separator or not millis.isdigit() or not doc_id:
+        raise InvalidEventId(value)
+    return _EPOCH + int(millis) * _MILLISECOND, doc_id
+
+
+def render(key: str, kind: str, doc: dict) -> bytes:
+    data = orjson.dumps(doc, option=orjson.OPT_UTC_Z)
+    return b"id: %s\nevent: %s\ndata: %s\n\n" % (key.encode(), EVENT_TYPES.get(kind, f"{kind}.created").encode(), data)
+
+
+class Subscriber:
+    __slots__ = ("frames", "wakeup", "closed")
+
+    def __init__(self):
+        self.frames: Deque[Tuple[Optional[str], bytes]] = deque()
+        self.wakeup = asyncio.Event()
+        self.closed = False
+
+
+class SubmissionFeed:
+    def __init__(
+        self,
+        db,
+        versions: SharedCounters,
+        projection: Dict[str, int],
+        buffer: int = 256,
+        max_subscribers: int = 5000,
+        heartbeat: float = 15.0,
+        poll_interval: float = 1.0,
+        resume_grace: float = 5.0,
+        replay_limit: int = 1000,
+        retry_ms: int = 3000,
+        recent_ids: int = 10000,
+    ):
+        self.db = db
+        self.versions = versions
+        self.projection = projection
+        self.hidden = frozenset(field for field, shown in projection.items() if not shown)
+        self.buffer = buffer
+        self.max_subscribers = max_subscribers
+        self.heartbeat = heartbeat
+        self.poll_interval = poll_interval
+        self.resume_grace = timedelta(seconds=resume_grace)
+        self.replay_limit = replay_limit
+        self.retry_ms = retry_ms
+        self.recent_ids = recent_ids
+        self.mode = "polling"
+        self.subscribers: Set[Subscriber] = set()
+        self.events = 0
+        self.dropped = 0
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def full(self) -> bool:
+        return len(self.subscribers) >= self.max_subscribers
+
+    def start(self):
+        self._tasks = [
+            asyncio.create_task(self._follow(), name="submission-feed"),
+            asyncio.create_task(self._heartbeat(), name="submission-feed-heartbeat"),
+        ]
+
+    async def stop(self):
+        """Stop following submissions and end every open stream."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for subscriber in list(self.subscribers):
+            self._close(subscriber)
+
+    def publish(self, kind: str, docs: Iterable[dict]):
+        """Fan out ``kind`` submissions just stored by this worker."""
+        for doc in docs:
+            self._fanout(kind, doc)
+
+    def _fanout(self, kind: str, doc: dict):
+        key = event_id(doc)
+        if key in self._recent:
+            return
+        self._recent[key] = None
+        if len(self._recent) > self.recent_ids:
+            self._recent.popitem(last=False)
+        self.events += 1
+        if not self.subscribers:
+            return
+        self._broadcast(key, render(key, kind, {field: value for field, value in doc.items() if field not in self.hidden}))
+
+    def _offer(self, subscriber: Subscriber, key: Optional[str], frame: bytes):
+        if len(subscriber.frames) >= self.buffer:
+            self.dropped += 1
+            logger.info("Closing a submission stream %d events behind", len(subscriber.frames))
+            self._close(subscriber)
+            return
+        subscriber.frames.append((key, frame))
+        subscriber.wakeup.set()
+
+    def _close(self, subscriber: Subscriber):
+        subscriber.closed = True
+        subscriber.frames.clear()
+        subscriber.wakeup.set()
+        self.subscribers.discard(subscriber)
+
+    def _broadcast(self, key: Optional[str], frame: bytes):
+        for subscriber in list(self.subscribers):
+            self._offer(subscriber, key, frame)
+
+    async def since(self, created_at: datetime) -> Tuple[List[Tuple[str, dict]], bool]:
+        """``(kind, doc)`` of submissions created at or after ``created_at``, oldest first, and whether that is all of them."""
+        found = []
+        for kind in KINDS:
+            cursor = self.db[kind].find({"created_at": {"$gte": created_at}}, self.projection).sort(REPLAY_SORT).limit(self.replay_limit + 1)
+            found.extend((kind, doc) for doc in await cursor.to_list(self.replay_limit + 1))
+        found.sort(key=lambda item: (item[1]["created_at"], item[1]["id"]))
+        return found[:self.replay_limit], len(found) <= self.replay_limit
+
+    async def reset_frame(self) -> bytes:
+        """Tells a client it missed too much; carries the newest submission's id to resume from."""
+        newest = []
+        for kind in KINDS:
+            doc = await self.db[kind].find_one({}, {"_id": 0, "id": 1, "created_at": 1}, sort=PAGE_SORT)
+            if doc is not None:
+                newest.append(doc)
+        if not newest:
+            return b"event: reset\ndata: {}\n\n"
+        latest = max(newest, key=lambda doc: (doc["created_at"], doc["id"]))
+        return b"id: %s\nevent: reset\ndata: {}\n\n" % event_id(latest).encode()
+
+    async def frames(self, resume_after: Optional[Tuple[datetime, str]] = None) -> AsyncIterator[bytes]:
+        """The body of one stream; subscribes when iteration starts and unsubscribes when it ends."""
+        subscriber = Subscriber()
+        self.subscribers.add(subscriber)
+        replayed: Set[str] = set()
+        try:
+            yield b"retry: %d\n\n" % self.retry_ms
+            if resume_after is not None:
+                created_at, last_id = resume_after
+                missed, complete = await self.since(created_at - self.resume_grace)
+                if not complete:
+                    yield await self.reset_frame()
+                else:
+                    for kind, doc in missed:
+                        key = event_id(doc)
+                        if doc["id"] != last_id:
+                            replayed.add(key)
+                            yield render(key, kind, doc)
+            while not subscriber.closed:
+                if not subscriber.frames:
+                    subscriber.wakeup.clear()
+                    await subscriber.wakeup.wait()
+                    continue
+                key, frame = subscriber.frames.popleft()
+                if key is None or key not in replayed:
+                    yield frame
+        finally:
+            self._close(subscriber)
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            self._broadcast(None, HEARTBEAT_FRAME)
+
+    async def _follow(self):
+        pipeline = [{"$match": {"operationType": "insert", "ns.coll": {"$in": list(KINDS)}}}]
+        try:
+            async with self.db.watch(pipeline) as stream:
+                self.mode = "change_stream"
+                async for change in stream:
+                    self._fanout(change["ns"]["coll"], change["fullDocument"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            # Standalone servers (and the in-memory stand-in) have no change streams.
+            logger.info("Submission change stream unavailable (%s); polling every %.1fs after writes", exc, self.poll_interval)
+        self.mode = "polling"
+        await self._poll()
+
+    async def _poll(self):
+        seen = self.versions.snapshot(KINDS)
+        since = datetime.now(timezone.utc)
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            current = self.versions.snapshot(KINDS)
+            if current == seen:
+                continue
+            started = datetime.now(timezone.utc)
+            if self.subscribers:
+                try:
+                    found, complete = await self.since(since - self.resume_grace)
+                    if not complete:
+                        self._broadcast(None, await self.reset_frame())
+                    else:
+                        for kind, doc in found:
+                            self._fanout(kind, doc)
+                except Exception:
+                    logger.exception("Reading new submissions for the stream failed")
+                    continue
+            seen, since = current, started
@@ -0,0 +1,154 @@
+"""Optional in-process write-behind queue for submission inserts.
+
+Handlers hand documents to ``WriteBehindQueue.put`` instead of awaiting
+their own ``insert_one``; a single flusher task groups them per collection
+and writes each group with one unordered ``insert_many`` once ``max_batch``
+documents are pending or ``flush_interval`` seconds have passed. The backlog
+is bounded: when it is full ``put`` raises ``QueueFullError`` so the caller
+can shed load with a 503 instead of buffering without limit.
+
+``on_flush``, if given, is awaited with the collection name and the
+documents written after each batch that wrote at least one, e.g. to
+invalidate read caches and update counters.
+
+Callers that must observe the outcome of their write (appointment booking
+needs duplicate-slot errors) pass ``wait=True`` and await the returned
+future; they still share the batched round trip with everyone else. Callers
+that do not wait can pass ``on_error`` to undo their own bookkeeping (e.g. a
+dedupe claim) should the insert fail after they have answered.
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Optional
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the write-behind backlog is at capacity."""
+
+
+class WriteBehindQueue:
+    def __init__(self, db, max_batch: int = 500, flush_interval: float = 0.05, max_backlog: int = 10000, on_flush=None):
+        self.db = db
+        self.on_flush = on_flush
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_backlog = max_backlog
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = asyncio.Event()
+        self.flushed = 0
+        self.failed = 0
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_backlog)
+        self._task = asyncio.create_task(self._run(), name="write-behind-flusher")
+
+    @property
+    def backlog(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def put(self, collection_name: str, doc: dict, wait: bool = False, on_error=None) -> Optional[asyncio.Future]:
+        """Queue ``doc`` for insertion into ``collection_name``.
+
+        Returns a future resolved once the document is written (or failed)
+        when ``wait`` is true, otherwise ``None``; ``on_error`` is then awaited
+        with the exception if the insert fails.
+        """
+        if self._closing.is_set() or self._queue is None:
+            raise QueueFullError("write-behind queue is not accepting writes")
+        future = asyncio.get_running_loop().create_future() if wait else None
+        try:
+            self._queue.put_nowait((collection_name, doc, future, on_error))
+        except asyncio.QueueFull:
+            raise QueueFullError("write-behind backlog is full")
+        return future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._closing.is_set():
+                break
+            getter = asyncio.ensure_future(self._queue.get())
+            closing = asyncio.ensure_future(self._closing.wait())
+            done, pending = await asyncio.wait({getter, closing}, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            if getter not in done:
+                break
+            batch.append(getter.result())
+        return batch
+
+    async def _flush(self, batch):
+        groups = defaultdict(list)
+        for item in batch:
+            groups[item[0]].append(item)
+        for collection_name, items in groups.items():
+            errors = {}
+            try:
+                await self.db[collection_name].insert_many([item[1] for item in items], ordered=False)
+            except BulkWriteError as exc:
+                for error in exc.details.get("writeErrors", []):
+                    if error.get("code") == 11000:
+                        errors[error["index"]] = DuplicateKeyError(error.get("errmsg", "duplicate key"), 11000, error)
+                    else:
+                        errors[error["index"]] = exc
+            except PyMongoError as exc:
+                errors = {index: exc for index in range(len(items))}
+            self.flushed += len(items) - len(errors)
+            self.failed += len(errors)
+            if self.on_flush is not None and len(errors) < len(items):
+                await self.on_flush(collection_name, [item[1] for index, item in enumerate(items) if index not in errors])
+            for index, (_, doc, future, on_error) in enumerate(items):
+                error = errors.get(index)
+                if future is not None and not future.done():
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+                    continue
+                if error is None:
+                    continue
+                if not isinstance(error, DuplicateKeyError):
+                    logger.error("Write-behind insert into %s failed for id=%s: %s", collection_name, doc.get("id"), error)
+                if on_error is not None:
+                    try:
+                        await on_error(error)
+                    except Exception:
+                        logger.exception("Write-behind error handler failed for id=%s", doc.get("id"))
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            try:
+                await self._flush(batch)
+            except Exception:
+                logger.exception("Write-behind flush of %d documents failed", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def drain(self):
+        """Stop accepting writes, flush everything queued and stop the flusher."""
+        if self._queue is None:
+            return
+        self._closing.set()
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        logger.info("Write-behind queue drained (%d written, %d failed)", self.flushed, self.failed)
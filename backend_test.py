@@ -1,6 +1,8 @@
+import os
 import requests
 import sys
 import json
+import uuid
 from datetime import datetime, timedelta
 
 class LumisAPITester:
@@ -10,10 +12,10 @@ class LumisAPITester:
         self.tests_passed = 0
         self.test_results = []
 
-    def run_test(self, name, method, endpoint, expected_status, data=None, validate_response=None):
+    def run_test(self, name, method, endpoint, expected_status, data=None, validate_response=None, headers=None):
         """Run a single API test"""
         url = f"{self.base_url}/{endpoint}"
-        headers = {'Content-Type': 'application/json'}
+        headers = {'Content-Type': 'application/json', **(headers or {})}
 
         self.tests_run += 1
         print(f"\n🔍 Testing {name}...")
@@ -230,14 +232,27 @@ class LumisAPITester:
             data=contact_data
         )
 
-        # Test appointment booking
-        tomorrow = datetime.now() + timedelta(days=1)
+        # Test appointment booking on the first free slot in the coming weeks
+        free_date, free_time = None, None
+        for offset in range(1, 30):
+            day = (datetime.now() + timedelta(days=offset)).strftime("%Y-%m-%d")
+            success, availability = self.run_test(
+                f"Get Available Times {day}",
+                "GET",
+                f"available-times?date={day}",
+                200,
+                validate_response=lambda data: isinstance(data.get('times'), list)
+            )
+            if success and availability['times']:
+                free_date, free_time = day, availability['times'][0]
+                break
+
         appointment_data = {
             "name": "Test Appointment User",
             "email": "appointment@example.com", 
             "phone": "+1234567890",
-            "date": tomorrow.strftime("%Y-%m-%d"),
-            "time": "10:00 AM",
+            "date": free_date,
+            "time": free_time,
             "services": ["DevOps & Cloud", "Database Solutions"],
             "reason": "Technical Consultation",
             "message": "This is a test appointment booking."
@@ -251,6 +266,22 @@ class LumisAPITester:
             data=appointment_data
         )
 
+        self.run_test(
+            "Resubmit Identical Appointment",
+            "POST",
+            "appointments",
+            200,
+            data=appointment_data
+        )
+
+        self.run_test(
+            "Book Already Taken Slot",
+            "POST",
+            "appointments",
+            409,
+            data={**appointment_data, "name": "Second Appointment User", "email": "second-appointment@example.com"}
+        )
+
     def test_individual_case_study(self):
         """Test individual case study endpoint"""
         print("\n" + "=" * 50)
@@ -276,6 +307,309 @@ class LumisAPITester:
         else:
             print("❌ Cannot test individual case study - no case studies available")
 
+    def test_content_lookups(self):
+        """Test single-record and faceted content endpoints"""
+        print("\n" + "=" * 50)
+        print("TESTING CONTENT LOOKUPS")
+        print("=" * 50)
+
+        success, posts = self.run_test(
+            "Get Blog Posts for ID",
+            "GET",
+            "blog-posts",
+            200
+        )
+
+        if success and posts:
+            post = posts[0]
+            self.run_test(
+                f"Get Blog Post {post['id']}",
+                "GET",
+                f"blog-posts/{post['id']}",
+                200,
+                validate_response=lambda data: data.get('id') == post['id']
+            )
+            self.run_test(
+                f"Filter Blog Posts by {post['category']}",
+                "GET",
+                f"blog-posts?category={requests.utils.quote(post['category'])}",
+                200,
+                validate_response=lambda data: len(data) > 0 and all(p['category'] == post['category'] for p in data)
+            )
+
+        self.run_test(
+            "Filter Case Studies by Unknown Industry",
+            "GET",
+            "case-studies?industry=unknown",
+            200,
+            validate_response=lambda data: data == []
+        )
+
+        self.run_test(
+            "Get Missing Blog Post",
+            "GET",
+            "blog-posts/does-not-exist",
+            404
+        )
+
+    def test_submission_pagination(self):
+        """Test keyset-paginated submission listings"""
+        print("\n" + "=" * 50)
+        print("TESTING SUBMISSION PAGINATION")
+        print("=" * 50)
+
+        for endpoint in ("contacts", "appointments"):
+            self.run_test(
+                f"Get {endpoint.title()} Page",
+                "GET",
+                f"{endpoint}?limit=1",
+                200,
+                validate_response=lambda data: isinstance(data, list) and len(data) <= 1
+            )
+            first = requests.get(f"{self.base_url}/{endpoint}?limit=1", timeout=10)
+            cursor = first.headers.get('X-Next-Cursor')
+            if cursor:
+                self.run_test(
+                    f"Get Next {endpoint.title()} Page",
+                    "GET",
+                    f"{endpoint}?limit=1&after={cursor}",
+                    200,
+                    validate_response=lambda data, seen=first.json()[0]['id']: len(data) == 1 and data[0]['id'] != seen
+                )
+
+    def test_search(self):
+        """Test ranked search over content and submissions"""
+        print("\n" + "=" * 50)
+        print("TESTING SEARCH")
+        print("=" * 50)
+
+        self.run_test(
+            "Search Content",
+            "GET",
+            "search?q=automation",
+            200,
+            validate_response=lambda data: (
+                len(data) > 0
+                and all({'type', 'id', 'score', 'item'} <= set(hit) for hit in data)
+                and [hit['score'] for hit in data] == sorted((hit['score'] for hit in data), reverse=True)
+            )
+        )
+        self.run_test(
+            "Search Contacts by Email",
+            "GET",
+            "search?scope=contacts&q=bulk@example.com",
+            200,
+            validate_response=lambda data: all(hit['item']['email'] == 'bulk@example.com' for hit in data)
+        )
+        self.run_test(
+            "Search Appointments",
+            "GET",
+            "search?scope=appointments&q=consultation",
+            200,
+            validate_response=lambda data: isinstance(data, list)
+        )
+
+    def test_stats(self):
+        """Test the submission analytics report from counters and pipelines"""
+        print("\n" + "=" * 50)
+        print("TESTING STATS")
+        print("=" * 50)
+
+        def validate(data):
+            return (
+                data.get('days') == 7
+                and len(data['contacts']['by_day']) <= 7
+                and {'total', 'services', 'reason', 'by_day'} <= set(data['contacts'])
+                and 'status' in data['appointments']
+            )
+
+        self.run_test("Get Stats from Counters", "GET", "stats?days=7", 200, validate_response=validate)
+        self.run_test("Get Stats from Pipelines", "GET", "stats?days=7&source=pipeline", 200, validate_response=validate)
+        self.run_test("Get Stats with Bad Window", "GET", "stats?days=0", 422)
+
+    def test_idempotency(self):
+        """Test that a retried submission with the same Idempotency-Key is written once"""
+        print("\n" + "=" * 50)
+        print("TESTING IDEMPOTENCY KEYS")
+        print("=" * 50)
+
+        key = f"backend-test-{uuid.uuid4()}"
+        contact = {
+            "name": "Idempotency Test",
+            "email": f"idempotency-{uuid.uuid4().hex[:8]}@example.com",
+            "message": "Sent twice, stored once",
+        }
+        success, first = self.run_test("Submit Contact with Key", "POST", "contact", 200, data=contact, headers={"Idempotency-Key": key})
+        if success:
+            self.run_test(
+                "Retry Contact with Same Key", "POST", "contact", 200, data=contact, headers={"Idempotency-Key": key},
+                validate_response=lambda data: data.get('id') == first.get('id'),
+            )
+        self.run_test(
+            "Reuse Key for Different Contact", "POST", "contact", 422,
+            data={**contact, "message": "Something else"}, headers={"Idempotency-Key": key},
+        )
+
+    def test_conditional_get(self):
+        """Test that submission lists revalidate with 304 until a new submission arrives"""
+        print("\n" + "=" * 50)
+        print("TESTING CONDITIONAL GET")
+        print("=" * 50)
+
+        etag = requests.get(f"{self.base_url}/contacts", timeout=10).headers.get('ETag')
+        unchanged = requests.get(f"{self.base_url}/contacts", headers={'If-None-Match': etag}, timeout=10)
+        requests.post(
+            f"{self.base_url}/contact",
+            json={"name": "ETag Test", "email": "etag@example.com", "message": "Moves the contacts version"},
+            timeout=10,
+        )
+        changed = requests.get(f"{self.base_url}/contacts", headers={'If-None-Match': etag}, timeout=10)
+
+        self.tests_run += 1
+        success = bool(etag) and unchanged.status_code == 304 and changed.status_code == 200
+        if success:
+            self.tests_passed += 1
+            print("✅ Passed - Contacts revalidate with 304, and a new contact changes the ETag")
+        else:
+            print(f"❌ Failed - Expected 304 then 200, got {unchanged.status_code} then {changed.status_code}")
+        self.test_results.append({
+            "name": "Contacts ETag",
+            "method": "GET",
+            "endpoint": "contacts",
+            "expected_status": 304,
+            "actual_status": unchanged.status_code,
+            "success": success,
+            "url": f"{self.base_url}/contacts"
+        })
+
+    def test_submission_stream(self):
+        """Test that a new contact arrives on the server-sent event stream"""
+        print("\n" + "=" * 50)
+        print("TESTING SUBMISSION STREAM")
+        print("=" * 50)
+
+        email = f"stream-{uuid.uuid4().hex[:8]}@example.com"
+        self.tests_run += 1
+        arrived = False
+        try:
+            with requests.get(f"{self.base_url}/submissions/stream", stream=True, timeout=10) as stream:
+                lines = stream.iter_lines()
+                next(lines)  # "retry:", sent once the stream is subscribed
+                requests.post(
+                    f"{self.base_url}/contact",
+                    json={"name": "Stream Test", "email": email, "message": "Pushed to open streams"},
+                    timeout=10,
+                )
+                for line in lines:
+                    if line.startswith(b"data:") and email.encode() in line:
+                        arrived = True
+                        break
+        except (requests.RequestException, StopIteration) as e:
+            print(f"❌ Failed - Stream error: {str(e)}")
+
+        if arrived:
+            self.tests_passed += 1
+            print("✅ Passed - New contact delivered on the stream")
+        else:
+            print("❌ Failed - New contact not seen on the stream")
+        self.test_results.append({
+            "name": "Submission Stream",
+            "method": "GET",
+            "endpoint": "submissions/stream",
+            "expected_status": 200,
+            "actual_status": 200 if arrived else None,
+            "success": arrived,
+            "url": f"{self.base_url}/submissions/stream"
+        })
+
+    def test_readiness(self):
+        """Test the readiness probe"""
+        print("\n" + "=" * 50)
+        print("TESTING READINESS")
+        print("=" * 50)
+
+        self.run_test(
+            "Get Readiness", "GET", "ready", 200,
+            validate_response=lambda data: data.get('status') == 'ready' and isinstance(data.get('content_version'), int),
+        )
+
+    def test_landing_bundle(self):
+        """Test the aggregated landing endpoint and its ETag revalidation"""
+        print("\n" + "=" * 50)
+        print("TESTING LANDING BUNDLE")
+        print("=" * 50)
+
+        success, bundle = self.run_test(
+            "Get Landing Bundle",
+            "GET",
+            "landing",
+            200,
+            validate_response=lambda data: (
+                self.validate_testimonials(data.get('testimonials'))
+                and self.validate_case_studies(data.get('case_studies'))
+                and self.validate_blog_posts(data.get('blog_posts'))
+                and self.validate_services(data.get('services'))
+                and self.validate_available_times({'times': data.get('times')})
+            )
+        )
+
+        if success:
+            etag = requests.get(f"{self.base_url}/landing", timeout=10).headers.get('ETag')
+            self.tests_run += 1
+            response = requests.get(f"{self.base_url}/landing", headers={'If-None-Match': etag}, timeout=10)
+            if etag and response.status_code == 304:
+                self.tests_passed += 1
+                print("✅ Passed - Landing bundle revalidates with 304")
+            else:
+                print(f"❌ Failed - Expected 304 for matching ETag, got {response.status_code}")
+            self.test_results.append({
+                "name": "Landing Bundle ETag",
+                "method": "GET",
+                "endpoint": "landing",
+                "expected_status": 304,
+                "actual_status": response.status_code,
+                "success": bool(etag) and response.status_code == 304,
+                "url": f"{self.base_url}/landing"
+            })
+
+    def test_bulk_import(self):
+        """Test NDJSON bulk import with one good and one bad row"""
+        print("\n" + "=" * 50)
+        print("TESTING BULK IMPORT")
+        print("=" * 50)
+
+        body = (
+            '{"name": "Bulk Import Test", "email": "bulk@example.com", "services": ["Web Development"], "message": "Imported"}\n'
+            '{"name": "Missing Email", "message": "Rejected"}\n'
+        )
+        self.tests_run += 1
+        response = requests.post(
+            f"{self.base_url}/contacts/bulk",
+            data=body.encode("utf-8"),
+            headers={'Content-Type': 'application/x-ndjson', 'X-Import-Token': os.environ.get('BULK_IMPORT_TOKEN', '')},
+            timeout=30,
+        )
+        summary = response.json() if response.status_code == 200 else {}
+        success = (
+            summary.get('received') == 2
+            and summary.get('inserted') == 1
+            and [error.get('row') for error in summary.get('errors', [])] == [2]
+        )
+        if success:
+            self.tests_passed += 1
+            print("✅ Passed - Bulk import inserted the valid row and reported the bad one")
+        else:
+            print(f"❌ Failed - Unexpected bulk import result: {response.status_code} {summary}")
+        self.test_results.append({
+            "name": "Bulk Import Contacts",
+            "method": "POST",
+            "endpoint": "contacts/bulk",
+            "expected_status": 200,
+            "actual_status": response.status_code,
+            "success": success,
+            "url": f"{self.base_url}/contacts/bulk"
+        })
+
     def print_summary(self):
         """Print test summary"""
         print("\n" + "=" * 60)
@@ -301,9 +635,19 @@ def main():
     tester = LumisAPITester()
     
     # Run all tests
+    tester.test_readiness()
     tester.test_get_endpoints()
     tester.test_post_endpoints() 
     tester.test_individual_case_study()
+    tester.test_content_lookups()
+    tester.test_landing_bundle()
+    tester.test_submission_pagination()
+    tester.test_bulk_import()
+    tester.test_search()
+    tester.test_stats()
+    tester.test_idempotency()
+    tester.test_conditional_get()
+    tester.test_submission_stream()
     
     # Print summary
     all_passed = tester.print_summary()
@@ -1,4 +1,4 @@
-import { useState } from "react";
+import { useState, useEffect, useRef } from "react";
 import axios from "axios";
 import { Calendar as CalendarIcon, Clock, Send, CheckCircle2 } from "lucide-react";
 import { Button } from "@/components/ui/button";
@@ -14,6 +14,46 @@ import { format } from "date-fns";
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
+const RETRY_DELAYS_MS = [500, 1500];
+const IN_PROGRESS_MAX_WAIT_MS = 15000;
+const IN_PROGRESS_DETAIL = "A request with this Idempotency-Key is still in progress";
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Network errors and gateway hiccups are worth retrying; the Idempotency-Key
+// makes a retry of a request that did land return the original response
+// instead of creating a second submission.
+const isTransient = (error) =>
+  !error.response || [502, 503, 504].includes(error.response.status);
+
+// A 409 is either a taken slot (final) or, with Retry-After, an earlier
+// request with the same Idempotency-Key that has not finished yet.
+const isInProgress = (error) =>
+  error.response?.status === 409 &&
+  (Boolean(error.response.headers?.["retry-after"]) || error.response.data?.detail === IN_PROGRESS_DETAIL);
+
+const postWithRetry = async (url, payload, idempotencyKey) => {
+  const started = Date.now();
+  for (let retries = 0; ; ) {
+    try {
+      return await axios.post(url, payload, { headers: { "Idempotency-Key": idempotencyKey } });
+    } catch (error) {
+      if (isInProgress(error)) {
+        // Wait for the first request's outcome, which the next try returns
+        const wait = (Number(error.response.headers?.["retry-after"]) || 1) * 1000;
+        if (Date.now() - started + wait > IN_PROGRESS_MAX_WAIT_MS) throw error;
+        await sleep(wait);
+        continue;
+      }
+      if (retries >= RETRY_DELAYS_MS.length || !isTransient(error)) throw error;
+      await sleep(RETRY_DELAYS_MS[retries++]);
+    }
+  }
+};
+
+const newIdempotencyKey = () =>
+  window.crypto?.randomUUID?.() ?? `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+
 export const ContactSection = ({ services, availableTimes }) => {
   const [formType, setFormType] = useState("appointment"); // "appointment" or "contact"
   const [loading, setLoading] = useState(false);
@@ -25,9 +65,13 @@ export const ContactSection = ({ services, availableTimes }) => {
   const [phone, setPhone] = useState("");
   const [date, setDate] = useState(null);
   const [time, setTime] = useState("");
+  const [freeTimes, setFreeTimes] = useState(null);
   const [selectedServices, setSelectedServices] = useState([]);
   const [reason, setReason] = useState("");
   const [message, setMessage] = useState("");
+  // Key of the last submission not known to have gone through, reused when
+  // the same form is sent again so a lost response cannot cause a duplicate.
+  const pendingSubmission = useRef(null);
 
   const defaultServices = [
     { id: "svc1", name: "AI Agent Building" },
@@ -43,7 +87,27 @@ export const ContactSection = ({ services, availableTimes }) => {
   ];
 
   const displayServices = services.length > 0 ? services : defaultServices;
-  const displayTimes = availableTimes.length > 0 ? availableTimes : defaultTimes;
+  const displayTimes = freeTimes ?? (availableTimes.length > 0 ? availableTimes : defaultTimes);
+
+  useEffect(() => {
+    if (!date) {
+      setFreeTimes(null);
+      return;
+    }
+    let cancelled = false;
+    axios
+      .get(`${API}/available-times`, { params: { date: format(date, "yyyy-MM-dd") } })
+      .then(({ data }) => {
+        if (!cancelled) {
+          setFreeTimes(data.times);
+          setTime((current) => (data.times.includes(current) ? current : ""));
+        }
+      })
+      .catch((error) => console.error("Error fetching available times:", error));
+    return () => {
+      cancelled = true;
+    };
+  }, [date]);
 
   const reasonOptions = [
     "New Project Inquiry",
@@ -113,7 +177,12 @@ export const ContactSection = ({ services, availableTimes }) => {
             message
           };
 
-      await axios.post(`${API}${endpoint}`, payload);
+      const body = endpoint + JSON.stringify(payload);
+      if (pendingSubmission.current?.body !== body) {
+        pendingSubmission.current = { body, key: newIdempotencyKey() };
+      }
+      await postWithRetry(`${API}${endpoint}`, payload, pendingSubmission.current.key);
+      pendingSubmission.current = null;
       
       setSubmitted(true);
       toast.success(
@@ -129,9 +198,29 @@ export const ContactSection = ({ services, availableTimes }) => {
       setTimeout(() => setSubmitted(false), 5000);
     } catch (error) {
       console.error("Form submission error:", error);
-      toast.error("Something went wrong", {
-        description: "Please try again or contact us directly."
-      });
+      if (isInProgress(error)) {
+        // pendingSubmission keeps the key, so sending again picks up the same request
+        toast.info("Your request is still being processed", {
+          description: "Please wait a moment, then send it again to see the result."
+        });
+      } else if (error.response?.status === 409) {
+        toast.error("That time slot was just booked", {
+          description: "Please pick another time."
+        });
+        setTime("");
+        setFreeTimes((current) => current && current.filter((t) => t !== time));
+      } else if (error.response?.status === 429) {
+        const retryAfter = Number(error.response.headers?.["retry-after"]);
+        toast.error("Too many submissions", {
+          description: retryAfter
+            ? `Please try again in ${Math.ceil(retryAfter / 60)} minute(s).`
+            : "Please try again in a few minutes."
+        });
+      } else {
+        toast.error("Something went wrong", {
+          description: "Please try again or contact us directly."
+        });
+      }
     } finally {
       setLoading(false);
     }
@@ -23,19 +23,13 @@ export default function LandingPage() {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [testimonialsRes, caseStudiesRes, blogRes, servicesRes, timesRes] = await Promise.all([
-          axios.get(`${API}/testimonials`),
-          axios.get(`${API}/case-studies`),
-          axios.get(`${API}/blog-posts`),
-          axios.get(`${API}/services`),
-          axios.get(`${API}/available-times`)
-        ]);
+        const { data } = await axios.get(`${API}/landing`);
         
-        setTestimonials(testimonialsRes.data);
-        setCaseStudies(caseStudiesRes.data);
-        setBlogPosts(blogRes.data);
-        setServices(servicesRes.data);
-        setAvailableTimes(timesRes.data.times);
+        setTestimonials(data.testimonials);
+        setCaseStudies(data.case_studies);
+        setBlogPosts(data.blog_posts);
+        setServices(data.services);
+        setAvailableTimes(data.times);
       } catch (error) {
         console.error("Error fetching data:", error);
       } finally {
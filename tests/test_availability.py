@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from availability import AvailabilityEngine, SlotUnavailableError
+from indexes import ensure_indexes
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+SLOTS = ["09:00 AM", "10:00 AM", "11:00 AM"]
+
+
+def appointment(time, date="2030-01-07"):
+    return {"id": f"{date}-{time}", "date": date, "time": time, "status": "pending"}
+
+
+def test_concurrent_bookings_for_one_slot_yield_one_success():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["lumis_test"]
+        await ensure_indexes(db)
+        engine = AvailabilityEngine(db.appointments, SLOTS)
+
+        async def attempt(n):
+            doc = appointment("10:00 AM")
+            doc["id"] = f"attempt-{n}"
+            try:
+                await engine.book(doc)
+                return True
+            except SlotUnavailableError:
+                return False
+
+        results = await asyncio.gather(*(attempt(n) for n in range(20)))
+        return results, await engine.free_slots("2030-01-07")
+
+    results, free = asyncio.run(run())
+    assert results.count(True) == 1
+    assert free == ["09:00 AM", "11:00 AM"]
+
+
+def test_free_slots_are_cached_until_booking_invalidates():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["lumis_test"]
+        await ensure_indexes(db)
+        engine = AvailabilityEngine(db.appointments, SLOTS)
+        first = await engine.free_slots("2030-01-07")
+        # Written behind the engine's back, so the cached answer is served.
+        await db.appointments.insert_one(appointment("09:00 AM"))
+        cached = await engine.free_slots("2030-01-07")
+        await engine.book(appointment("11:00 AM"))
+        return first, cached, await engine.free_slots("2030-01-07")
+
+    first, cached, refreshed = asyncio.run(run())
+    assert first == cached == SLOTS
+    assert refreshed == ["10:00 AM"]
+
+
+def test_version_change_retires_cached_dates():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["lumis_test"]
+        await ensure_indexes(db)
+        version = {"appointments": 0}
+        engine = AvailabilityEngine(db.appointments, SLOTS, version=lambda: version["appointments"])
+        await engine.free_slots("2030-01-07")
+        # Booked by another worker, which bumps the shared counter.
+        await db.appointments.insert_one(appointment("09:00 AM"))
+        version["appointments"] += 1
+        return await engine.free_slots("2030-01-07")
+
+    assert asyncio.run(run()) == ["10:00 AM", "11:00 AM"]
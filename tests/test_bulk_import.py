@@ -0,0 +1,122 @@
+import asyncio
+from typing import List, Optional
+
+import pytest
+from pydantic import BaseModel, EmailStr
+
+from bulk_import import BulkImporter, BulkImportError, csv_records, ndjson_records
+from indexes import ensure_indexes
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+class Lead(BaseModel):
+    name: str
+    email: EmailStr
+    services: List[str] = []
+    date: Optional[str] = None
+    time: Optional[str] = None
+
+
+async def chunked(data: bytes, size: int = 7):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(records):
+    return [record async for record in records]
+
+
+def test_ndjson_rows_split_across_chunks_and_report_bad_lines():
+    data = b'{"name": "A\xc3\xa9"}\n\nnot json\n[1]\n' + b'{"name": "' + b"x" * 100 + b'"}\n{"name": "B"}'
+    records = asyncio.run(collect(ndjson_records(chunked(data), max_record_size=64)))
+
+    assert records[0] == (1, {"name": "Aé"}, None)
+    assert records[1][0] == 2 and records[1][2].startswith("Invalid JSON")
+    assert records[2] == (3, None, "Row is not a JSON object")
+    assert records[3] == (4, None, "Row exceeds 64 characters")
+    assert records[4] == (5, {"name": "B"}, None)
+
+
+def test_csv_rows_follow_the_export_format():
+    data = b'name,email,services,phone\r\nAda,ada@example.com,"AI Agent Building; Web Development",\r\n"Multi\nline",m@example.com,,\r\n'
+    records = asyncio.run(collect(csv_records(chunked(data), max_record_size=1024, list_fields=["services"])))
+
+    assert records == [
+        (1, {"name": "Ada", "email": "ada@example.com", "services": ["AI Agent Building", "Web Development"]}, None),
+        (2, {"name": "Multi\nline", "email": "m@example.com"}, None),
+    ]
+    with pytest.raises(BulkImportError):
+        asyncio.run(collect(csv_records(chunked(b""), max_record_size=1024)))
+
+
+def test_importer_writes_in_chunks_and_keeps_going_past_bad_rows():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["lumis_test"]
+        await ensure_indexes(db)
+        lines = [f'{{"name": "Lead {n}", "email": "lead{n}@example.com", "date": "2030-01-07", "time": "{n % 4}"}}' for n in range(10)]
+        lines[3] = '{"name": "No email"}'
+        chunks: List[int] = []
+
+        async def on_chunk(docs):
+            chunks.append(len(docs))
+
+        counter = iter(range(100))
+        importer = BulkImporter(
+            db.appointments,
+            Lead,
+            lambda lead: {**lead.model_dump(), "id": f"a{next(counter)}", "slot_held": True},
+            chunk_size=4,
+            max_errors=2,
+            duplicate_message="Slot taken",
+        )
+        summary = await importer.run(ndjson_records(chunked("\n".join(lines).encode()), 1024), on_chunk=on_chunk)
+        return summary, chunks, await db.appointments.count_documents({})
+
+    summary, chunks, stored = asyncio.run(run())
+    # Row 4 is invalid; rows 1-3 and 8 take the four slots and the rest collide.
+    assert summary["received"] == 10
+    assert summary["inserted"] == stored == 4
+    assert summary["failed"] == 6
+    assert summary["errors"][0]["row"] == 4 and "email" in summary["errors"][0]["error"]
+    assert summary["errors"][1] == {"row": 5, "error": "Slot taken"}
+    assert summary["errors_truncated"] is True
+    assert chunks == [3, 1]
+
+
+def test_claimed_rows_are_released_when_their_insert_fails():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["lumis_test"]
+        await ensure_indexes(db)
+        claimed = set()
+
+        async def claim(lead, doc):
+            if lead.email in claimed:
+                return False
+            claimed.add(lead.email)
+            return True
+
+        async def release(lead):
+            claimed.discard(lead.email)
+
+        lines = [
+            '{"name": "A", "email": "a@example.com", "date": "2030-01-07", "time": "09:00 AM"}',
+            '{"name": "A", "email": "a@example.com", "date": "2030-01-07", "time": "10:00 AM"}',
+            '{"name": "B", "email": "b@example.com", "date": "2030-01-07", "time": "09:00 AM"}',
+        ]
+        counter = iter(range(100))
+        importer = BulkImporter(
+            db.appointments, Lead, lambda lead: {**lead.model_dump(), "id": f"a{next(counter)}", "slot_held": True},
+            claim=claim, release=release,
+        )
+        summary = await importer.run(ndjson_records(chunked("\n".join(lines).encode()), 1024))
+        return summary, claimed
+
+    summary, claimed = asyncio.run(run())
+    assert summary["inserted"] == 1
+    assert summary["errors"] == [
+        {"row": 2, "error": "Duplicate of a recent submission"},
+        {"row": 3, "error": "Duplicate record"},
+    ]
+    # B was never written, so a retry of it is not turned away
+    assert claimed == {"a@example.com"}
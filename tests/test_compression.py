@@ -0,0 +1,82 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from compression import CODINGS, CompressionMiddleware, negotiate
+from content import PrecomputedPayload
+
+
+def test_negotiate_honours_q_values_and_server_preference():
+    assert negotiate("gzip, deflate, br") == CODINGS[0]
+    assert negotiate("gzip;q=1.0, br;q=0.5", ("br", "gzip")) == "gzip"
+    assert negotiate("br;q=0, *", ("br", "gzip")) == "gzip"
+    assert negotiate("identity") is None
+    assert negotiate("gzip;q=0") is None
+
+
+def build_app():
+    app = FastAPI()
+    big = "x" * 4000
+
+    @app.get("/big")
+    async def big_body():
+        return PlainTextResponse(big, headers={"ETag": '"abc"'})
+
+    @app.get("/small")
+    async def small_body():
+        return PlainTextResponse("tiny")
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse((f"line {n}\n" for n in range(500)), media_type="application/x-ndjson")
+
+    @app.get("/pdf")
+    async def pdf():
+        return Response(b"%PDF" + b"0" * 4000, media_type="application/pdf")
+
+    @app.get("/precompressed")
+    async def precompressed():
+        return Response(gzip.compress(big.encode()), media_type="text/plain", headers={"Content-Encoding": "gzip"})
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app), big
+
+
+def test_middleware_compresses_large_and_streamed_bodies_only():
+    client, big = build_app()
+
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == 'W/"abc"'
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(big)
+    assert response.text == big
+
+    streamed = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert streamed.headers["content-encoding"] == "gzip"
+    assert streamed.text.count("\n") == 500
+
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/pdf", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/big", headers={"Accept-Encoding": "identity"}).headers
+    assert client.get("/precompressed", headers={"Accept-Encoding": "gzip"}).text == big
+
+
+def test_brotli_when_available():
+    pytest.importorskip("brotli")
+    client, big = build_app()
+    response = client.get("/big", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.text == big
+
+
+def test_precomputed_payloads_carry_compressed_bodies_with_their_own_etags():
+    payload = PrecomputedPayload([{"id": str(n), "text": "repeated content " * 10} for n in range(20)])
+    assert "gzip" in payload.encoded
+    body, etag = payload.encoded["gzip"]
+    assert gzip.decompress(body) == payload.body
+    assert etag == payload.etag[:-1] + '-gzip"'
+    assert PrecomputedPayload({"id": "1"}).encoded == {}
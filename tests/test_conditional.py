@@ -0,0 +1,83 @@
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from conditional import ConditionalGetMiddleware
+from shared_state import SharedCounters
+
+
+def build(epoch="e1"):
+    calls = {"count": 0}
+    versions = SharedCounters(["items"])
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items(page: int = 1):
+        calls["count"] += 1
+        return {"page": page}
+
+    @app.get("/hashed")
+    async def hashed():
+        return Response(b"{}", media_type="application/json", headers={"ETag": '"content-hash"'})
+
+    @app.get("/other")
+    async def other():
+        return {}
+
+    app.add_middleware(ConditionalGetMiddleware, versions=versions, rules={r"^/(items|hashed)$": ["items"]}, epoch=epoch)
+    return TestClient(app), versions, calls
+
+
+def test_matching_if_none_match_is_answered_without_the_handler_until_a_write():
+    client, versions, calls = build()
+    first = client.get("/items")
+    etag = first.headers["etag"]
+    assert etag.startswith('"e1-0-') and first.headers["cache-control"] == "no-cache"
+
+    revalidated = client.get("/items", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+    assert calls["count"] == 1
+
+    # Query string and Accept-Encoding are part of the validator.
+    assert client.get("/items?page=2", headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/items", headers={"If-None-Match": etag, "Accept-Encoding": "br"}).status_code == 200
+
+    versions.bump("items")
+    refreshed = client.get("/items", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200 and refreshed.headers["etag"] != etag
+    assert calls["count"] == 4
+
+
+def test_validators_from_another_epoch_do_not_match_and_handler_etags_are_kept():
+    client, _, _ = build(epoch="e1")
+    etag = client.get("/items").headers["etag"]
+    restarted, _, _ = build(epoch="e2")
+    assert restarted.get("/items", headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/hashed").headers["etag"] == '"content-hash"'
+    assert "etag" not in client.get("/other").headers
+
+
+def test_local_tags_take_their_version_from_the_worker_not_the_shared_counters():
+    installed = {"digest": "a1"}
+    versions = SharedCounters(["items", "content"])
+    app = FastAPI()
+
+    @app.get("/search")
+    async def search():
+        return {"digest": installed["digest"]}
+
+    app.add_middleware(
+        ConditionalGetMiddleware, versions=versions, rules={r"^/search$": ["content", "items"]}, epoch="e1",
+        local={"content": lambda: installed["digest"]},
+    )
+    client = TestClient(app)
+    etag = client.get("/search").headers["etag"]
+    assert etag.startswith('"e1-a1.0-')
+
+    # Another worker installed new content; this one still serves the old snapshot.
+    versions.bump("content")
+    assert client.get("/search", headers={"If-None-Match": etag}).status_code == 304
+
+    installed["digest"] = "b2"
+    refreshed = client.get("/search", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200 and refreshed.json() == {"digest": "b2"}
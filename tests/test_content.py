@@ -0,0 +1,37 @@
+import json
+
+from content import ContentCollection, ContentRegistry
+
+POSTS = [
+    {"id": f"post{n}", "title": f"Post {n}", "category": "DevOps" if n % 2 else "AI & Automation"}
+    for n in range(2000)
+]
+
+
+def test_lookup_by_id_and_facet():
+    posts = ContentCollection(POSTS, facets=("category",))
+    assert json.loads(posts.get("post1500").body)["title"] == "Post 1500"
+    assert posts.get("missing") is None
+    devops = json.loads(posts.filtered("category", " devops ").body)
+    assert len(devops) == 1000
+    assert all(post["category"] == "DevOps" for post in devops)
+    assert json.loads(posts.filtered("category", "Nope").body) == []
+
+
+def test_payloads_are_precomputed_with_stable_etags():
+    first = ContentCollection(POSTS[:3])
+    second = ContentCollection(POSTS[:3])
+    assert first.all.etag == second.all.etag
+    assert first.get("post0").etag != first.get("post1").etag
+    assert json.loads(first.all.body) == POSTS[:3]
+
+
+def test_a_new_registry_reuses_the_compressed_bodies_that_did_not_change():
+    services = [{"id": f"s{n}", "name": f"Service {n}", "description": "repeated text " * 100} for n in range(3)]
+    first = ContentRegistry([], [], [], services)
+    edited = [dict(service) for service in services]
+    edited[0]["description"] += "edited"
+    second = ContentRegistry([], [], [], edited, previous=first)
+    assert second.services.get("s1").encoded is first.services.get("s1").encoded
+    assert second.services.get("s0").encoded is not first.services.get("s0").encoded
+    assert second.services.all.etag != first.services.all.etag
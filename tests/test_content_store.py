@@ -0,0 +1,77 @@
+import asyncio
+from typing import List
+
+import pytest
+from pydantic import BaseModel
+
+from content_store import ContentStore, ContentValidationError, ContentWatcher, validate
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+class Item(BaseModel):
+    id: str
+    title: str
+    tags: List[str] = []
+
+
+MODELS = {"items": Item}
+
+
+def lists(*titles):
+    return {"items": [{"id": str(n), "title": title} for n, title in enumerate(titles)]}
+
+
+def test_validate_reports_every_bad_record():
+    assert validate(MODELS, {"items": [{"id": "1", "title": "A", "extra": 1}]}) == {"items": [{"id": "1", "title": "A"}]}
+    with pytest.raises(ContentValidationError) as error:
+        validate(MODELS, {"items": [{"title": "no id"}, {"id": "1", "title": 5}, {"id": "2", "title": "A"}, {"id": "2", "title": "B"}]})
+    message = str(error.value)
+    assert "items[0]: missing id" in message
+    assert "items[1] (1): title" in message
+    assert "items[3]: duplicate id '2'" in message
+
+
+def test_publish_swaps_versions_and_drops_old_records():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["lumis_test"]
+        store = ContentStore(db, MODELS)
+        assert await store.ensure_seeded(lists("first", "second")) is True
+        assert await store.ensure_seeded(lists("ignored")) is False
+        version = await store.publish(lists("third"))
+        return version, await store.load(), await db.content_records.count_documents({})
+
+    version, (loaded_version, loaded), stored = asyncio.run(run())
+    assert version == loaded_version == 2
+    assert loaded == {"items": [{"id": "0", "title": "third"}]}
+    assert stored == 1
+
+
+def test_watcher_installs_new_versions_and_skips_invalid_ones():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["lumis_test"]
+        store = ContentStore(db, MODELS)
+        installed = []
+
+        async def install(content):
+            installed.append(content["items"][0]["title"])
+
+        watcher = ContentWatcher(store, install, interval=0.01)
+        await store.publish(lists("v1"))
+        await watcher.refresh()
+        watcher.start()
+        await store.publish(lists("v2"))
+        await asyncio.sleep(0.1)
+        # Versions written around publish() that break the model, or that
+        # have no records at all, are not installed.
+        await db.content_records.insert_one({"id": "0", "title": None, "kind": "items", "position": 0, "version": 3})
+        await db.content_meta.update_one({"_id": "content"}, {"$set": {"version": 3, "reserved": 3}})
+        await asyncio.sleep(0.1)
+        await db.content_meta.update_one({"_id": "content"}, {"$set": {"version": 4, "reserved": 4}})
+        await asyncio.sleep(0.1)
+        await watcher.stop()
+        return installed, watcher.version, watcher.reloads
+
+    installed, version, reloads = asyncio.run(run())
+    assert installed == ["v1", "v2"]
+    assert (version, reloads) == (2, 2)
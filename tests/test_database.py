@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from database import STAND_IN_SCHEME, PoolMetrics, create_client, pool_options_from_env
+
+
+def test_pool_options_only_include_configured_values():
+    options = pool_options_from_env({
+        "MONGO_MAX_POOL_SIZE": "50",
+        "MONGO_MIN_POOL_SIZE": "5",
+        "MONGO_WAIT_QUEUE_TIMEOUT_MS": "",
+        "MONGO_COMPRESSORS": "zstd,zlib",
+    })
+    assert options == {"maxPoolSize": 50, "minPoolSize": 5, "compressors": "zstd,zlib"}
+
+
+def test_pool_metrics_track_in_use_and_waits():
+    metrics = PoolMetrics()
+    metrics.connection_created(None)
+    metrics.connection_check_out_started(None)
+    metrics.connection_checked_out(None)
+    metrics.connection_check_out_started(None)
+    metrics.connection_check_out_failed(None)
+    snapshot = metrics.snapshot()
+    assert snapshot["in_use"] == 1
+    assert snapshot["open"] == 1
+    assert snapshot["checkouts"] == 1
+    assert snapshot["checkout_failures"] == 1
+    assert sum(snapshot["wait_buckets"].values()) == 1
+
+    metrics.connection_checked_in(None)
+    assert metrics.snapshot()["in_use"] == 0
+
+
+def test_stand_in_scheme_returns_in_memory_client():
+    pytest.importorskip("mongomock_motor")
+    client = create_client(STAND_IN_SCHEME)
+
+    async def roundtrip():
+        await client.lumis.contacts.insert_one({"id": "1"})
+        return await client.lumis.contacts.count_documents({})
+
+    assert asyncio.run(roundtrip()) == 1
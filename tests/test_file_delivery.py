@@ -0,0 +1,54 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from file_delivery import file_response
+
+BODY = bytes(range(256)) * 1024
+
+
+@pytest.fixture
+def client(tmp_path):
+    pdf = tmp_path / "report.pdf"
+    pdf.write_bytes(BODY)
+    (tmp_path / "report.pdf.gz").write_bytes(gzip.compress(BODY))
+    app = FastAPI()
+
+    @app.get("/report")
+    async def report(request: Request):
+        return file_response(request, pdf, "application/pdf", filename="report.pdf")
+
+    return TestClient(app)
+
+
+def test_full_download_and_revalidation(client):
+    response = client.get("/report", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.headers["accept-ranges"] == "bytes"
+
+    etag = response.headers["etag"]
+    assert client.get("/report", headers={"Accept-Encoding": "identity", "If-None-Match": etag}).status_code == 304
+    last_modified = response.headers["last-modified"]
+    assert client.get("/report", headers={"Accept-Encoding": "identity", "If-Modified-Since": last_modified}).status_code == 304
+
+
+def test_range_requests(client):
+    partial = client.get("/report", headers={"Range": "bytes=1000-1999"})
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == f"bytes 1000-1999/{len(BODY)}"
+    assert partial.content == BODY[1000:2000]
+
+    suffix = client.get("/report", headers={"Range": "bytes=-10"})
+    assert suffix.content == BODY[-10:]
+
+    assert client.get("/report", headers={"Range": f"bytes={len(BODY)}-"}).status_code == 416
+    assert client.get("/report", headers={"Range": "bytes=0-9", "If-Range": '"stale"'}).status_code == 200
+
+
+def test_precompressed_variant_is_negotiated(client):
+    response = client.get("/report", headers={"Accept-Encoding": "br;q=0, gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == BODY
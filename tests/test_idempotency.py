@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from idempotency import IdempotencyKeyReused, IdempotencyStore
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def keys():
+    return mongomock_motor.AsyncMongoMockClient(tz_aware=True)["lumis_test"]["idempotency_keys"]
+
+
+class Handler:
+    def __init__(self, delay=0.0, failures=0):
+        self.delay = delay
+        self.failures = failures
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("insert failed")
+        return 200, b'{"id": "%d"}' % self.calls
+
+
+def test_repeat_is_replayed_from_memory_then_from_mongo():
+    async def scenario():
+        collection = keys()
+        handler = Handler()
+        store = IdempotencyStore(collection)
+        first = await store.run("contacts", "k1", "hash", handler)
+        again = await store.run("contacts", "k1", "hash", handler)
+        # Another worker has nothing in memory and finds the stored response
+        elsewhere = await IdempotencyStore(collection).run("contacts", "k1", "hash", handler)
+        other_scope = await store.run("appointments", "k1", "hash", handler)
+        return handler.calls, first, again, elsewhere, other_scope
+
+    calls, first, again, elsewhere, other_scope = asyncio.run(scenario())
+    assert calls == 2
+    assert first == (200, b'{"id": "1"}', False)
+    assert again == elsewhere == (200, b'{"id": "1"}', True)
+    assert other_scope == (200, b'{"id": "2"}', False)
+
+
+def test_concurrent_requests_with_one_key_run_the_handler_once():
+    async def scenario():
+        collection = keys()
+        handler = Handler(delay=0.05)
+        workers = [IdempotencyStore(collection, poll_interval=0.01) for _ in range(2)]
+        results = await asyncio.gather(*(workers[n % 2].run("contacts", "k1", "hash", handler) for n in range(10)))
+        return handler.calls, results
+
+    calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert {(status, body) for status, body, _ in results} == {(200, b'{"id": "1"}')}
+    assert sum(replayed for _, _, replayed in results) == 9
+
+
+def test_key_reused_for_another_request_is_rejected_and_failures_release_the_key():
+    async def scenario():
+        store = IdempotencyStore(keys())
+        handler = Handler(failures=1)
+        with pytest.raises(ConnectionError):
+            await store.run("contacts", "k1", "hash", handler)
+        retried = await store.run("contacts", "k1", "hash", handler)
+        with pytest.raises(IdempotencyKeyReused):
+            await store.run("contacts", "k1", "other-hash", handler)
+        with pytest.raises(IdempotencyKeyReused):
+            await IdempotencyStore(store.collection).run("contacts", "k1", "other-hash", handler)
+        return handler.calls, retried
+
+    calls, retried = asyncio.run(scenario())
+    assert calls == 2
+    assert retried == (200, b'{"id": "2"}', False)
+
+
+def test_claim_left_by_a_dead_request_is_taken_over_once_its_lock_expires():
+    async def scenario():
+        collection = keys()
+        now = datetime.now(timezone.utc)
+        await collection.insert_one({
+            "_id": "contacts:k1", "request_hash": "hash", "status": "pending", "owner": "crashed",
+            "locked_until": now - timedelta(seconds=1), "expires_at": now + timedelta(hours=1),
+        })
+        handler = Handler()
+        result = await IdempotencyStore(collection).run("contacts", "k1", "hash", handler)
+        return handler.calls, result, await collection.find_one({"_id": "contacts:k1"})
+
+    calls, result, record = asyncio.run(scenario())
+    assert calls == 1
+    assert result == (200, b'{"id": "1"}', False)
+    assert record["status"] == "done" and record["response_body"] == b'{"id": "1"}'
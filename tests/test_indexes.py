@@ -0,0 +1,45 @@
+import asyncio
+import os
+
+import pytest
+
+from indexes import INDEX_SPECS, ensure_indexes, plan_stages, verify_query_plans
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def test_ensure_indexes_is_idempotent():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["lumis_test"]
+        await ensure_indexes(db)
+        await ensure_indexes(db)
+        return {name: await db[name].index_information() for name in INDEX_SPECS}
+
+    info = asyncio.run(run())
+    assert info["contacts"]["id_unique"]["unique"] is True
+    assert {"created_at_id", "email"} <= set(info["contacts"])
+    assert {"created_at_id", "email", "date_time_status"} <= set(info["appointments"])
+
+
+def test_plan_stages_walks_nested_plans():
+    classic = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}
+    sbe = {"queryPlan": {"stage": "OR", "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}]}}
+    assert plan_stages(classic) == ["FETCH", "IXSCAN"]
+    assert "COLLSCAN" in plan_stages(sbe)
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_MONGO_URL"), reason="TEST_MONGO_URL not set")
+def test_registered_query_shapes_use_indexes():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def run():
+        client = AsyncIOMotorClient(os.environ["TEST_MONGO_URL"])
+        db = client["lumis_index_test"]
+        try:
+            await ensure_indexes(db)
+            return await verify_query_plans(db, "fail")
+        finally:
+            await client.drop_database("lumis_index_test")
+            client.close()
+
+    assert asyncio.run(run()) == []
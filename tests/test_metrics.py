@@ -0,0 +1,39 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from metrics import Histogram, MetricsMiddleware, Registry, http_requests
+from profiling import ProfilingMiddleware
+
+
+def test_histogram_renders_cumulative_prometheus_buckets():
+    registry = Registry()
+    latency = registry.register(Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0)))
+    latency.observe(0.05, "/a")
+    latency.observe(0.5, "/a")
+    latency.observe(5, "/a")
+    text = registry.render()
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{route="/a"} 3' in text
+
+
+def test_middleware_labels_by_route_template_and_profiles_on_header(tmp_path):
+    app = FastAPI()
+
+    @app.get("/things/{thing_id}")
+    async def thing(thing_id: str):
+        return {"id": thing_id}
+
+    app.add_middleware(ProfilingMiddleware, output_dir=tmp_path, token="secret")
+    app.add_middleware(MetricsMiddleware)
+    client = TestClient(app)
+
+    client.get("/things/1")
+    profiled = client.get("/things/2", headers={"X-Profile": "secret"})
+    client.get("/nowhere/at/all")
+
+    assert http_requests.values[("/things/{thing_id}", "GET", "200")] >= 2
+    assert http_requests.values[("unmatched", "GET", "404")] >= 1
+    assert (tmp_path / f"{profiled.headers['x-profile-id']}.prof").exists()
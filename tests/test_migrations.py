@@ -0,0 +1,86 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import migrations
+from migrations import run_migrations
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def test_created_at_strings_become_dates_once():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["lumis_test"]
+        await db.contacts.insert_one({"id": "c1", "created_at": "2024-01-01T10:00:00+00:00"})
+        await db.appointments.insert_one({"id": "a1", "created_at": "2024-01-02T10:00:00"})
+        await run_migrations(db)
+        await db.contacts.insert_one({"id": "c2", "created_at": "2024-01-03T10:00:00+00:00"})
+        await run_migrations(db)
+        return (
+            await db.contacts.find_one({"id": "c1"}),
+            await db.appointments.find_one({"id": "a1"}),
+            await db.contacts.find_one({"id": "c2"}),
+        )
+
+    contact, appointment, late_contact = asyncio.run(run())
+    assert isinstance(contact["created_at"], datetime)
+    assert isinstance(appointment["created_at"], datetime)
+    # Already recorded as applied, so the second boot leaves new rows alone.
+    assert isinstance(late_contact["created_at"], str)
+
+
+def test_existing_bookings_hold_their_slots_and_duplicates_are_left_unflagged():
+    def appointment(id, created_at, status="pending", time="10:00 AM"):
+        return {"id": id, "date": "2030-01-07", "time": time, "status": status, "created_at": created_at}
+
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["lumis_test"]
+        await db.appointments.insert_many([
+            appointment("later", datetime(2024, 1, 2)),
+            appointment("earlier", datetime(2024, 1, 1), status="confirmed"),
+            appointment("cancelled", datetime(2023, 12, 1), status="cancelled"),
+            appointment("other-slot", datetime(2024, 1, 3), time="11:00 AM"),
+        ])
+        await run_migrations(db)
+        return sorted([doc["id"] async for doc in db.appointments.find({"slot_held": True})])
+
+    assert asyncio.run(run()) == ["earlier", "other-slot"]
+
+
+def counting_migration(calls):
+    async def migration(db):
+        calls.append(db.name)
+        await asyncio.sleep(0.05)
+    return migration
+
+
+def test_concurrent_workers_run_each_migration_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(migrations, "MIGRATIONS", [("0001_counted", counting_migration(calls))])
+
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["lumis_test"]
+        await asyncio.gather(*(run_migrations(db, poll_interval=0.01) for _ in range(5)))
+        return await db._migrations.find_one({"_id": "0001_counted"})
+
+    record = asyncio.run(run())
+    assert calls == ["lumis_test"]
+    assert record["state"] == "applied" and "owner" not in record
+
+
+def test_a_migration_whose_worker_died_is_taken_over_once_its_lease_lapses(monkeypatch):
+    calls = []
+    monkeypatch.setattr(migrations, "MIGRATIONS", [("0001_counted", counting_migration(calls)), ("0002_applied", None)])
+
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient(tz_aware=True)["lumis_test"]
+        lapsed = datetime.now(timezone.utc) - timedelta(seconds=1)
+        await db._migrations.insert_one({"_id": "0001_counted", "state": "running", "owner": "dead", "lease_until": lapsed})
+        # Recorded by a release from before claims
+        await db._migrations.insert_one({"_id": "0002_applied", "applied_at": lapsed})
+        await run_migrations(db, poll_interval=0.01)
+        return await db._migrations.find_one({"_id": "0001_counted"})
+
+    record = asyncio.run(run())
+    assert calls == ["lumis_test"] and record["state"] == "applied"
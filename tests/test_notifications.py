@@ -0,0 +1,121 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from notifications import Notifier, SmtpSink
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+CONTACT = {"_id": "oid", "id": "c1", "name": "Ada", "email": "ada@example.com", "services": ["DevOps"],
+           "message": "Hello", "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc)}
+
+
+class RecordingSink:
+    def __init__(self, name="recording", failures=0, delay=0.0):
+        self.name = name
+        self.failures = failures
+        self.delay = delay
+        self.events = []
+
+    async def send(self, event):
+        await asyncio.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("sink unavailable")
+        self.events.append(event)
+
+
+async def settle(outbox, done, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while await outbox.count_documents(done) == 0:
+        assert asyncio.get_running_loop().time() < deadline, "jobs did not settle"
+        await asyncio.sleep(0.01)
+
+
+def outbox():
+    return mongomock_motor.AsyncMongoMockClient(tz_aware=True)["lumis_test"]["notification_outbox"]
+
+
+def test_enqueue_returns_before_slow_sinks_and_delivers_once_per_sink():
+    async def run():
+        jobs = outbox()
+        slow, other = RecordingSink("slow", delay=0.3), RecordingSink("other")
+        notifier = Notifier(jobs, [slow, other], workers=2, poll_interval=0.05)
+        notifier.start()
+        start = asyncio.get_running_loop().time()
+        await notifier.enqueue("contacts", [CONTACT])
+        enqueue_seconds = asyncio.get_running_loop().time() - start
+        await settle(jobs, {"sink": "slow", "status": "delivered"})
+        await notifier.stop()
+        return enqueue_seconds, slow.events, other.events
+
+    enqueue_seconds, slow_events, other_events = asyncio.run(run())
+    assert enqueue_seconds < 0.1
+    assert len(slow_events) == len(other_events) == 1
+    event = slow_events[0]
+    assert event["type"] == "contact.created"
+    assert "_id" not in event["data"] and event["data"]["email"] == "ada@example.com"
+
+
+def test_failures_are_retried_with_backoff_then_given_up():
+    async def run():
+        jobs = outbox()
+        flaky, broken = RecordingSink("flaky", failures=2), RecordingSink("broken", failures=99)
+        notifier = Notifier(jobs, [flaky, broken], max_attempts=3, backoff=0.01, poll_interval=0.01)
+        notifier.start()
+        await notifier.enqueue("appointments", [CONTACT])
+        await settle(jobs, {"sink": "flaky", "status": "delivered"})
+        await settle(jobs, {"sink": "broken", "status": "failed"})
+        await notifier.stop()
+        return await jobs.find({}, {"sink": 1, "attempts": 1, "last_error": 1}).sort("sink").to_list(None), notifier
+
+    jobs, notifier = asyncio.run(run())
+    assert [(job["sink"], job["attempts"]) for job in jobs] == [("broken", 3), ("flaky", 3)]
+    assert "ConnectionError" in jobs[0]["last_error"]
+    assert (notifier.delivered, notifier.retried, notifier.failed) == (1, 4, 1)
+
+
+def test_jobs_left_in_the_outbox_are_delivered_after_a_restart():
+    async def run():
+        jobs = outbox()
+        # Persisted by a process that died before delivering, lease already expired.
+        await Notifier(jobs, [RecordingSink()], lease=0).enqueue("contacts", [CONTACT])
+        sink = RecordingSink()
+        notifier = Notifier(jobs, [sink], poll_interval=0.01)
+        notifier.start()
+        await settle(jobs, {"status": "delivered"})
+        await notifier.stop()
+        return sink.events
+
+    assert [event["data"]["id"] for event in asyncio.run(run())] == ["c1"]
+
+
+def test_a_job_claimed_again_while_queued_is_not_delivered_twice():
+    async def run():
+        jobs = outbox()
+        # Queued here with no free worker until after its lease lapsed
+        queued_sink, polling_sink = RecordingSink(), RecordingSink()
+        queued = Notifier(jobs, [queued_sink], workers=0, lease=0, poll_interval=3600)
+        queued.start()
+        await queued.enqueue("contacts", [CONTACT])
+        polling = Notifier(jobs, [polling_sink], poll_interval=0.01)
+        polling.start()
+        await settle(jobs, {"status": "delivered"})
+        await polling.stop()
+        worker = asyncio.create_task(queued._work())
+        await queued._queue.join()
+        worker.cancel()
+        await queued.stop()
+        return queued_sink.events, polling_sink.events, await jobs.find_one({})
+
+    queued_events, polling_events, job = asyncio.run(run())
+    assert queued_events == [] and len(polling_events) == 1
+    assert job["status"] == "delivered" and job["attempts"] == 1
+
+
+def test_smtp_message_lists_the_submission():
+    sink = SmtpSink("localhost", 1025, "lumis@localhost", ["team@example.com"])
+    message = sink.message({"id": "e1", "type": "contact.created", "data": {"name": "Ada", "services": ["A", "B"], "phone": None}})
+    assert message["Subject"] == "New contact from Ada"
+    assert message.get_content().strip() == "name: Ada\nservices: A, B"
@@ -0,0 +1,48 @@
+import asyncio
+
+from rate_limit import Deduplicator, MemoryStore, RateLimit, retry_after
+
+
+def test_token_bucket_allows_bursts_then_refills():
+    async def run():
+        store = MemoryStore()
+        limit = RateLimit.parse("ip", "3/60")
+        burst = [await store.take(limit, "1.2.3.4", now=0.0) for _ in range(4)]
+        other_key = await store.take(limit, "5.6.7.8", now=0.0)
+        refilled = await store.take(limit, "1.2.3.4", now=20.0)
+        return burst, other_key, refilled
+
+    burst, other_key, refilled = asyncio.run(run())
+    assert burst[:3] == [0.0, 0.0, 0.0]
+    assert burst[3] == 20.0
+    assert retry_after(burst[3]) == "20"
+    assert other_key == 0.0
+    # The rejected attempt does not consume a token, so 20s refill one.
+    assert refilled == 0.0
+
+
+def test_memory_store_forgets_least_recently_used_keys():
+    async def run():
+        store = MemoryStore(max_keys=2)
+        limit = RateLimit("email", 1, 3600)
+        for key in ("a", "b", "c"):
+            await store.take(limit, key, now=0.0)
+        return await store.take(limit, "a", now=0.0), await store.take(limit, "c", now=0.0)
+
+    forgotten, limited = asyncio.run(run())
+    assert forgotten == 0.0
+    assert limited > 0
+
+
+def test_deduplicator_replays_first_response_until_released():
+    async def run():
+        dedupe = Deduplicator(MemoryStore(), window=60)
+        first = Deduplicator.fingerprint("contacts", {"email": "a@example.com", "message": "hi"})
+        same = Deduplicator.fingerprint("contacts", {"message": "hi", "email": "a@example.com"})
+        assert first == same
+        results = [await dedupe.claim(first, b'{"id": "1"}'), await dedupe.claim(same, b'{"id": "2"}')]
+        await dedupe.release(first)
+        results.append(await dedupe.claim(first, b'{"id": "3"}'))
+        return results
+
+    assert asyncio.run(run()) == [None, b'{"id": "1"}', None]
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from response_cache import CacheEntry, CacheRule, MemoryBackend, ResponseCache, ResponseCacheMiddleware
+
+
+def entry(body, ttl=60, tags=()):
+    now = time.time()
+    return CacheEntry(200, [(b"content-type", b"application/json")], body, now, now + ttl, tuple(tags))
+
+
+def test_memory_backend_evicts_least_recently_used_and_expired():
+    async def run():
+        backend = MemoryBackend(max_bytes=300)
+        await backend.set("a", entry(b"x" * 100))
+        await backend.set("b", entry(b"x" * 100))
+        await backend.get("a")
+        await backend.set("c", entry(b"x" * 100))
+        await backend.set("stale", entry(b"", ttl=-1))
+        return [await backend.get(key) is not None for key in ("a", "b", "c", "stale")], backend.evictions
+
+    present, evictions = asyncio.run(run())
+    assert present == [True, False, True, False]
+    assert evictions == 1
+
+
+def test_middleware_hits_and_tag_invalidation():
+    calls = {"count": 0}
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items():
+        calls["count"] += 1
+        return {"count": calls["count"]}
+
+    cache = ResponseCache(MemoryBackend(), [CacheRule(r"^/items$", ttl=60, tags=["items"])])
+    app.add_middleware(ResponseCacheMiddleware, cache=cache)
+    client = TestClient(app)
+
+    first = client.get("/items")
+    second = client.get("/items")
+    assert first.headers["x-cache"] == "MISS"
+    assert second.headers["x-cache"] == "HIT"
+    assert second.headers["age"] == "0"
+    assert second.json() == {"count": 1}
+
+    # Accept-Encoding is part of the key.
+    assert client.get("/items", headers={"Accept-Encoding": "br"}).headers["x-cache"] == "MISS"
+
+    asyncio.run(cache.invalidate("items"))
+    assert client.get("/items").json() == {"count": 3}
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from search import ContentIndex, search_submissions, terms
+
+POSTS = [
+    {"id": "p1", "title": "AI agents for support", "body": "Agents answer tickets."},
+    {"id": "p2", "title": "Cloud migration", "body": "Moving databases and agents to the cloud."},
+    {"id": "p3", "title": "Cost reduction", "body": "Nothing about the other topics."},
+]
+SERVICES = [{"id": "s1", "name": "Agent building", "description": "Custom AI agents."}]
+
+
+def build_index():
+    return ContentIndex({
+        "blog-posts": (POSTS, {"title": 5, "body": 1}),
+        "services": (SERVICES, {"name": 5, "description": 1}),
+    })
+
+
+def test_terms_drop_stop_words_and_fold_plurals():
+    assert terms("The Agents, and their Processes!") == ["agent", "process"]
+    assert terms("stories of 24/7 support") == ["story", "24", "7", "support"]
+
+
+def test_content_index_ranks_by_weighted_fields_and_pages():
+    index = build_index()
+    hits, more = index.search("agents", limit=10)
+    assert [(hit["type"], hit["id"]) for hit in hits] == [("services", "s1"), ("blog-posts", "p1"), ("blog-posts", "p2")]
+    assert hits[0]["item"] == SERVICES[0]
+    assert more is False
+
+    first, more = index.search("agents", limit=2)
+    second, last = index.search("agents", limit=2, offset=2)
+    assert more is True and last is False
+    assert [hit["id"] for hit in first + second] == ["s1", "p1", "p2"]
+
+    assert index.search("the of and", limit=10) == ([], False)
+
+
+def test_email_queries_use_exact_match():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+
+    async def run():
+        contacts = mongomock_motor.AsyncMongoMockClient()["lumis_test"]["contacts"]
+        await contacts.insert_many([
+            {"id": str(n), "email": f"user{n % 2}@example.com", "created_at": n} for n in range(5)
+        ])
+        return await search_submissions(contacts, " user1@example.com ", 1, 0, {"_id": 0})
+
+    hits, more = asyncio.run(run())
+    assert [(hit["type"], hit["id"], hit["score"]) for hit in hits] == [("contacts", "3", None)]
+    assert more is True
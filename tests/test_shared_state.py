@@ -0,0 +1,53 @@
+import asyncio
+import multiprocessing
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from response_cache import CacheRule, MemoryBackend, ResponseCache, ResponseCacheMiddleware
+from shared_state import SharedCounters
+
+FORK = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+
+
+def _bump(counters, times):
+    for _ in range(times):
+        counters.bump("contacts")
+
+
+@pytest.mark.skipif(FORK is None, reason="needs fork()")
+def test_bumps_in_forked_workers_are_visible_to_all():
+    counters = SharedCounters(["contacts", "appointments"])
+    workers = [FORK.Process(target=_bump, args=(counters, 250)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert counters.snapshot(["contacts", "appointments", "unknown"]) == (1000, 0, 0)
+    assert counters.bump("unknown") == 0
+
+
+def test_invalidation_in_one_worker_retires_another_workers_entries():
+    versions = SharedCounters(["items"])
+    calls = {"count": 0}
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items():
+        calls["count"] += 1
+        return {"count": calls["count"]}
+
+    rules = [CacheRule(r"^/items$", ttl=60, tags=["items"])]
+    this_worker = ResponseCache(MemoryBackend(), rules, versions=versions)
+    other_worker = ResponseCache(MemoryBackend(), rules, versions=versions)
+    app.add_middleware(ResponseCacheMiddleware, cache=this_worker)
+    client = TestClient(app)
+
+    assert client.get("/items").json() == {"count": 1}
+    assert client.get("/items").headers["x-cache"] == "HIT"
+    asyncio.run(other_worker.invalidate("items"))
+    assert this_worker.generation(["items"]) == (1,)
+    response = client.get("/items")
+    assert response.headers["x-cache"] == "MISS"
+    assert response.json() == {"count": 2}
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import date, datetime, timezone
+
+import pytest
+
+from stats import OTHER, SubmissionStats, daily_counts, report, window_start
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def contact(day, services=(), reason=None):
+    return {
+        "id": f"{day}-{len(services)}-{reason}",
+        "created_at": datetime(2024, 3, day, 23, 30, tzinfo=timezone.utc),
+        "services": list(services),
+        "reason": reason,
+    }
+
+
+KNOWN = {"services": {"AI Agents", "DevOps"}, "reason": {"New Project", "Support. Urgent", "$pecial"}}
+
+CONTACTS = [
+    contact(1, ["AI Agents", "DevOps"], "New Project"),
+    contact(1, ["DevOps"]),
+    contact(2, [], "Support. Urgent"),
+    contact(5, ["AI Agents"], "$pecial"),
+]
+
+
+def test_counters_match_the_pipeline():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["lumis_test"]
+        stats = SubmissionStats(db.submission_stats, lambda: KNOWN)
+        await db.contacts.insert_many([dict(doc) for doc in CONTACTS])
+        await stats.record("contacts", CONTACTS[:2])
+        await stats.record("contacts", CONTACTS[2:])
+        since = date(2024, 3, 2)
+        return (
+            await stats.summary("contacts", since),
+            report("contacts", await daily_counts(db.contacts, "contacts", since, known=KNOWN)),
+            await db.submission_stats.count_documents({}),
+        )
+
+    counted, aggregated, counter_docs = asyncio.run(run())
+    assert counted == aggregated
+    assert counter_docs == 3
+    assert counted["total"] == 2
+    assert counted["reason"] == {"Support. Urgent": 1, "$pecial": 1}
+    assert [row["day"] for row in counted["by_day"]] == ["2024-03-02", "2024-03-05"]
+
+
+def test_rebuild_resets_counters_from_submissions():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["lumis_test"]
+        stats = SubmissionStats(db.submission_stats, lambda: KNOWN)
+        await db.contacts.insert_many([dict(doc) for doc in CONTACTS])
+        await stats.record("contacts", CONTACTS + CONTACTS)  # double-counted
+        await stats.rebuild(db)
+        return await stats.summary("contacts", date(2024, 1, 1))
+
+    summary = asyncio.run(run())
+    assert summary["total"] == 4
+    assert summary["services"] == {"AI Agents": 2, "DevOps": 2}
+
+
+def test_unknown_and_empty_values_count_as_other():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["lumis_test"]
+        stats = SubmissionStats(db.submission_stats, lambda: KNOWN)
+        docs = [contact(1, ["", "DevOps", "x" * 500]), contact(1, ["Made up"], "Made up"), contact(2, [], "")]
+        await db.contacts.insert_many([dict(doc) for doc in docs])
+        await stats.record("contacts", docs)
+        counted = await stats.summary("contacts", date(2024, 1, 1))
+        await stats.rebuild(db)
+        return counted, await stats.summary("contacts", date(2024, 1, 1)), await db.submission_stats.find_one({"_id": "contacts:2024-03-01"})
+
+    counted, rebuilt, counter = asyncio.run(run())
+    assert counted == rebuilt
+    assert counted["services"] == {OTHER: 3, "DevOps": 1}
+    assert counted["reason"] == {OTHER: 2}
+    assert set(counter["services"]) == {OTHER, "DevOps"}
+
+
+def test_window_start_includes_today():
+    assert window_start(1, today=date(2024, 3, 5)) == date(2024, 3, 5)
+    assert window_start(30, today=date(2024, 3, 5)) == date(2024, 2, 5)
@@ -0,0 +1,95 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from shared_state import SharedCounters
+from submission_stream import SubmissionFeed, event_id, parse_event_id
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+T0 = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+
+def feed(**options):
+    db = mongomock_motor.AsyncMongoMockClient(tz_aware=True)["lumis_test"]
+    return SubmissionFeed(db, SharedCounters(["contacts", "appointments"]), {"_id": 0, "slot_held": 0}, **options)
+
+
+def contact(seconds):
+    return {"id": str(uuid.uuid4()), "name": "Stream", "email": "stream@example.com", "created_at": T0 + timedelta(seconds=seconds)}
+
+
+async def next_frame(stream):
+    return await asyncio.wait_for(stream.__anext__(), 1)
+
+
+def test_submissions_fan_out_once_and_a_stalled_client_is_disconnected():
+    async def scenario():
+        submissions = feed(buffer=2)
+        fast, stalled = submissions.frames(), submissions.frames()
+        assert await next_frame(fast) == b"retry: 3000\n\n"
+        await next_frame(stalled)
+        docs = [{**contact(seconds), "_id": "internal", "slot_held": True} for seconds in range(3)]
+        received = []
+        for doc in docs:
+            submissions.publish("contacts", [doc])
+            submissions.publish("contacts", [doc])  # e.g. also seen by the change stream
+            received.append(await next_frame(fast))
+        with pytest.raises(StopAsyncIteration):
+            await next_frame(stalled)
+        return submissions, docs, received, len(submissions.subscribers)
+
+    submissions, docs, received, subscribers = asyncio.run(scenario())
+    assert submissions.events == 3 and submissions.dropped == 1 and subscribers == 1
+    assert [frame.split(b"\n")[:2] for frame in received] == [[b"id: " + event_id(doc).encode(), b"event: contact.created"] for doc in docs]
+    assert b"internal" not in received[0] and b"slot_held" not in received[0]
+
+
+def test_resume_replays_from_mongo_and_resets_a_client_too_far_behind():
+    async def scenario():
+        submissions = feed(resume_grace=0)
+        docs = [contact(seconds) for seconds in range(3)]
+        await submissions.db.contacts.insert_many([dict(doc) for doc in docs])
+        resumed = submissions.frames(parse_event_id(event_id(docs[0])))
+        frames = [await next_frame(resumed) for _ in range(3)]
+        # Already replayed, then a new one
+        submissions.publish("contacts", [docs[2], contact(3)])
+        frames.append(await next_frame(resumed))
+
+        submissions.replay_limit = 1
+        reset = submissions.frames(parse_event_id(event_id(docs[0])))
+        await next_frame(reset)
+        return docs, frames, await next_frame(reset)
+
+    docs, frames, reset = asyncio.run(scenario())
+    assert [frame.split(b"\n")[0] for frame in frames[1:3]] == [b"id: " + event_id(doc).encode() for doc in docs[1:]]
+    assert b"stream@example.com" in frames[3] and event_id(docs[2]).encode() not in frames[3]
+    assert reset == b"id: %s\nevent: reset\ndata: {}\n\n" % event_id(docs[2]).encode()
+
+
+def test_without_change_streams_writes_from_other_workers_are_polled_after_a_version_bump():
+    async def scenario():
+        submissions = feed(poll_interval=0.01, resume_grace=60)
+        submissions.start()
+        stream = submissions.frames()
+        await next_frame(stream)
+        await asyncio.sleep(0.05)
+        doc = {**contact(0), "created_at": datetime.now(timezone.utc)}
+        await submissions.db.contacts.insert_one(doc)
+        submissions.versions.bump("contacts")
+        frame = await next_frame(stream)
+        await submissions.stop()
+        with pytest.raises(StopAsyncIteration):
+            await next_frame(stream)
+        return submissions.mode, doc, frame
+
+    mode, doc, frame = asyncio.run(scenario())
+    assert mode == "polling"
+    assert frame.startswith(b"id: " + event_id(doc).encode())
+
+
+def test_submissions_with_string_created_at_still_get_event_ids():
+    doc = {**contact(0), "created_at": T0.isoformat()}
+    assert parse_event_id(event_id(doc)) == (T0, doc["id"])
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from indexes import ensure_indexes
+from write_behind import QueueFullError, WriteBehindQueue
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def test_queued_writes_are_batched_and_drained():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["lumis_test"]
+        queue = WriteBehindQueue(db, max_batch=50, flush_interval=10)
+        queue.start()
+        for n in range(120):
+            queue.put("contacts", {"id": f"c{n}"})
+        await queue.drain()
+        return await db.contacts.count_documents({}), queue
+
+    count, queue = asyncio.run(run())
+    assert count == 120
+    assert queue.flushed == 120
+    with pytest.raises(QueueFullError):
+        queue.put("contacts", {"id": "late"})
+
+
+def test_waiting_writers_see_duplicate_key_errors():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["lumis_test"]
+        await ensure_indexes(db)
+        queue = WriteBehindQueue(db, flush_interval=0.01)
+        queue.start()
+        first = queue.put("appointments", {"id": "a1", "date": "2030-01-07", "time": "09:00 AM", "slot_held": True}, wait=True)
+        second = queue.put("appointments", {"id": "a2", "date": "2030-01-07", "time": "09:00 AM", "slot_held": True}, wait=True)
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        await queue.drain()
+        return results
+
+    first, second = asyncio.run(run())
+    assert first is None
+    assert isinstance(second, DuplicateKeyError)
+
+
+def test_full_backlog_rejects_writes():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["lumis_test"]
+        queue = WriteBehindQueue(db, max_backlog=2)
+        queue.start()
+        queue.put("contacts", {"id": "c1"})
+        queue.put("contacts", {"id": "c2"})
+        with pytest.raises(QueueFullError):
+            queue.put("contacts", {"id": "c3"})
+        await queue.drain()
+
+    asyncio.run(run())
+
+
+def test_unawaited_writes_that_fail_call_their_error_handler():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["lumis_test"]
+        await ensure_indexes(db)
+        queue = WriteBehindQueue(db, flush_interval=0.01)
+        queue.start()
+        failures = []
+
+        async def on_error(error):
+            failures.append(error)
+
+        queue.put("contacts", {"id": "c1"}, on_error=on_error)
+        queue.put("contacts", {"id": "c1"}, on_error=on_error)
+        await queue.drain()
+        return failures
+
+    failures = asyncio.run(run())
+    assert len(failures) == 1 and isinstance(failures[0], DuplicateKeyError)